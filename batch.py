@@ -0,0 +1,150 @@
+import os
+import sys
+import time
+
+from incremental import FragmentCache, write_incremental, write_if_changed, serialize_compact
+from spec import load_spec, find_specs, build_config, build_variants, SpecError
+
+
+class BatchResult:
+
+    def __init__(self, spec_path, output_path=None, seconds=0.0, domains=0, error=None, changed=True, profile=None):
+        self.spec_path = spec_path
+        self.output_path = output_path
+        self.seconds = seconds
+        self.domains = domains
+        self.error = error
+        self.changed = changed
+        self.profile = profile
+
+
+def output_path_for(spec_path, spec, output_dir, variant=None):
+    if "output" in spec:
+        return os.path.join(os.path.dirname(spec_path), spec["output"])
+    name = os.path.splitext(os.path.basename(spec_path))[0]
+    if variant is not None:
+        name = f"{name}-{variant}"
+    return os.path.join(output_dir or os.path.dirname(spec_path), f"{name}.xml")
+
+
+def count_domains(domain_configs):
+    count = 0
+    pending = list(domain_configs)
+    while pending:
+        domain_config = pending.pop()
+        count += domain_config.domain_count()
+        pending.extend(domain_config.domain_configs)
+    return count
+
+
+def generate(spec_path, output_dir=None, cache_dir=None, profile=False, compact=False):
+    if not profile:
+        return _generate(spec_path, output_dir, cache_dir, compact)
+    from instrumentation import Profiler
+
+    with Profiler() as profiler:
+        result = _generate(spec_path, output_dir, cache_dir, compact)
+    result.profile = profiler.to_dict()
+    return result
+
+
+def _generate(spec_path, output_dir, cache_dir, compact):
+    start = time.perf_counter()
+    changed = True
+    try:
+        spec = load_spec(spec_path)
+        if "variants" in spec:
+            return generate_variants(spec_path, spec, output_dir, cache_dir, compact, start)
+        config = build_config(spec, os.path.dirname(spec_path))
+        output_path = output_path_for(spec_path, spec, output_dir)
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        if compact:
+            changed = write_if_changed(output_path, serialize_compact(config))
+        elif cache_dir is None:
+            config.write(output_path)
+        else:
+            changed = write_incremental(config, output_path, FragmentCache(cache_dir))
+    except (OSError, KeyError, TypeError, AttributeError, SpecError) as error:
+        return BatchResult(spec_path, seconds=time.perf_counter() - start, error=f"{type(error).__name__}: {error}")
+    return BatchResult(spec_path, output_path, time.perf_counter() - start, count_domains(config.domain_configs),
+                       changed=changed)
+
+
+def generate_variants(spec_path, spec, output_dir, cache_dir, compact, start):
+    # All variants of a spec are written in one pass, subtrees they share with the base are serialized once.
+    from variants import SharedRenderer, write_variants
+
+    variants = build_variants(spec, os.path.dirname(spec_path))
+    outputs = {output_path_for(spec_path, variant_spec, output_dir, name): variants[name]
+               for name, variant_spec in spec["variants"].items()}
+    for output_path in outputs:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    changed = write_variants(outputs, SharedRenderer(None if cache_dir is None else FragmentCache(cache_dir)), compact)
+    return BatchResult(spec_path, ", ".join(outputs), time.perf_counter() - start,
+                       sum(count_domains(config.domain_configs) for config in outputs.values()), changed=bool(changed))
+
+
+def run_batch(paths, output_dir=None, workers=None, cache_dir=None, profile=False, compact=False):
+    specs = find_specs(paths)
+    if workers == 1 or len(specs) <= 1:
+        return [generate(spec_path, output_dir, cache_dir, profile, compact) for spec_path in specs]
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        return list(executor.map(generate, specs, [output_dir] * len(specs), [cache_dir] * len(specs),
+                                 [profile] * len(specs), [compact] * len(specs), chunksize=max(1, len(specs) // 64)))
+
+
+def format_result(result):
+    if result.error is None:
+        unchanged = "" if result.changed else " (unchanged)"
+        return f"{result.seconds * 1000:9.2f} ms  {result.spec_path} -> {result.output_path}{unchanged}"
+    return f"{result.seconds * 1000:9.2f} ms  {result.spec_path} FAILED {result.error}"
+
+
+def print_report(results, elapsed, out=None):
+    # Looked up on every call, so that redirecting sys.stdout (as the tests do) also redirects the report.
+    out = sys.stdout if out is None else out
+    for result in results:
+        print(format_result(result), file=out)
+
+    succeeded = [result for result in results if result.error is None]
+    domains = sum(result.domains for result in succeeded)
+    print("", file=out)
+    print(f"Generated {len(succeeded)}/{len(results)} configs ({domains} domains) in {elapsed:.2f} s", file=out)
+    if elapsed > 0:
+        print(f"Throughput: {len(succeeded) / elapsed:.1f} configs/s, {domains / elapsed:.0f} domains/s", file=out)
+
+
+def main(argv=None):
+    # argparse imports re, which importing batch as a library (and config_generator) does not need.
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate network security configs from JSON/TOML spec files.")
+    parser.add_argument("specs", nargs="+", help="spec files or directories containing them")
+    parser.add_argument("-o", "--output-dir", help="directory for configs whose spec does not set \"output\"")
+    parser.add_argument("-j", "--workers", type=int, help="number of worker processes (default: one per core)")
+    parser.add_argument("--cache-dir", help="shared fragment cache directory, enables incremental regeneration")
+    parser.add_argument("--compact", action="store_true",
+                        help="write configs without indentation and without attributes Android fills in by default")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="record time, peak memory and node counts per phase and write them as JSON to PATH")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = run_batch(args.specs, args.output_dir, args.workers, args.cache_dir, args.profile is not None,
+                        args.compact)
+    print_report(results, time.perf_counter() - start)
+    if args.profile is not None:
+        from instrumentation import merge_profiles, format_profile, write_profile
+
+        profiles = {result.spec_path: result.profile for result in results}
+        total = merge_profiles(profiles.values())
+        print("")
+        print(format_profile(total))
+        write_profile({"total": total, "specs": profiles}, args.profile)
+    return 1 if any(result.error is not None for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,58 @@
+import argparse
+import gc
+import gzip
+import io
+import time
+import xml.etree.ElementTree as Et
+
+from benchmarks.synthetic import synthetic_config
+from loader import load
+
+
+def best_of(repeat, function):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def pull_parse(data):
+    # Event by event like Android's XmlPullParser, which reads the config at app startup.
+    parser = Et.XMLPullParser(events=("start", "end"))
+    parser.feed(data)
+    parser.close()
+    for _ in parser.read_events():
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare size and parse time of indented and compact output.")
+    parser.add_argument("--domains", type=int, default=100_000)
+    parser.add_argument("--domains-per-config", type=int, default=50)
+    parser.add_argument("--depth", type=int, default=1, help="nesting depth of domain configs")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    config = synthetic_config(args.domains, args.domains_per_config, depth=args.depth)
+    outputs = {}
+    for name, compact in (("indented", False), ("compact", True)):
+        stream = io.BytesIO()
+        config.write(stream, compact=compact)
+        outputs[name] = stream.getvalue()
+
+    print(f"{args.domains} domains, depth {args.depth}")
+    print(f"{'output':<10}{'bytes':>11}{'gzip bytes':>12}{'pull parse ms':>15}{'load ms':>10}")
+    for name, data in outputs.items():
+        parse = best_of(args.repeat, lambda: pull_parse(data))
+        loading = best_of(args.repeat, lambda: load(io.BytesIO(data)))
+        print(f"{name:<10}{len(data):>11}{len(gzip.compress(data)):>12}{parse * 1000:>15.1f}{loading * 1000:>10.1f}")
+    saved = len(outputs["indented"]) - len(outputs["compact"])
+    print(f"saved {saved} bytes ({saved / len(outputs['indented']) * 100:.1f}%)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from client import Client
+from daemon import GenerationService, create_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def write_specs(directory, count, domains):
+    # Modules of one app share most of their config, like the modules of a real build.
+    paths = []
+    for index in range(count):
+        spec = {
+            "base_config": {"trust_anchors": [{"src": "system"}]},
+            "domain_configs": [
+                {"domains": [f"host{host}.shared.example.com" for host in range(domains)],
+                 "pin_set": {"expiration": "2027-01-01", "pins": ["pindigest", "backupdigest"]}},
+                {"domains": [f"module{index}.example.com"]},
+            ],
+        }
+        path = os.path.join(directory, f"module{index}.json")
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(spec, file)
+        paths.append(path)
+    return paths
+
+
+def per_process(commands):
+    start = time.perf_counter()
+    for command in commands:
+        subprocess.run([sys.executable, *command], cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare a fresh process per config with requests to the daemon.")
+    parser.add_argument("--specs", type=int, default=20)
+    parser.add_argument("--domains", type=int, default=500, help="domains every spec shares")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        specs = write_specs(directory, args.specs, args.domains)
+        socket_path = os.path.join(directory, "daemon.sock")
+        service = GenerationService()
+        server = create_server(service, socket_path)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            timings = {
+                "batch.py process": per_process(["batch.py", spec, "-o", directory, "-j", "1"] for spec in specs),
+                "client.py process": per_process(["client.py", spec, "-o", f"{spec}.xml", "--socket", socket_path]
+                                                 for spec in specs),
+            }
+            with Client(socket_path) as client:
+                start = time.perf_counter()
+                for spec in specs:
+                    client.generate(spec_path=spec)
+                timings["in-process client"] = time.perf_counter() - start
+                metrics = client.metrics()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    print(f"{args.specs} specs, {args.domains + 1} domains each")
+    print(f"{'':<20}{'ms/config':>10}{'configs/s':>11}")
+    for name, seconds in timings.items():
+        print(f"{name:<20}{seconds / args.specs * 1000:>10.1f}{args.specs / seconds:>11.1f}")
+    latency = metrics["latency_ms"]
+    print(f"daemon latency p50 {latency['p50']:.1f} ms, p99 {latency['p99']:.1f} ms, "
+          f"fragment cache {metrics['fragment_cache']['hits']} hits / {metrics['fragment_cache']['misses']} misses")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import tracemalloc
+
+from benchmarks.synthetic import synthetic_pin
+from model import DomainConfig, Domain, PinSet, Pin, Certificates
+
+
+class DictDomain:
+
+    def __init__(self, domain, include_subdomains):
+        self.domain = domain
+        self.include_subdomains = include_subdomains
+
+
+class DictPin:
+
+    def __init__(self, pin):
+        self.pin = pin
+        self.digest = "SHA-256"
+
+
+class DictCertificates:
+
+    def __init__(self, src, override_pins=False):
+        self.src = src
+        self.override_pins = override_pins
+
+
+def bytes_per_item(build, count):
+    tracemalloc.start()
+    items = build(count)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del items
+    return size / count
+
+
+def build_domains(domain_class):
+    def build(count):
+        domain_config = DomainConfig()
+        domain_config.add_domains(domain_class(f"host{index}.example.com", index % 2 == 0) for index in range(count))
+        return domain_config
+    return build
+
+
+def build_pins(pin_class, distinct):
+    values = [synthetic_pin(index) for index in range(distinct)]
+
+    def build(count):
+        pin_set = PinSet()
+        pin_set.add_pins(pin_class(values[index % distinct]) for index in range(count))
+        return pin_set
+    return build
+
+
+def build_certificates(certificates_class):
+    def build(count):
+        return [certificates_class("@raw/ca" if index % 2 else "system", index % 3 == 0) for index in range(count)]
+    return build
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure model memory per domain, pin and certificate.")
+    parser.add_argument("--count", type=int, default=200_000)
+    parser.add_argument("--distinct-pins", type=int, default=1_000)
+    args = parser.parse_args(argv)
+
+    rows = [
+        ("domain", build_domains(DictDomain), build_domains(Domain)),
+        ("pin", build_pins(DictPin, args.distinct_pins), build_pins(Pin, args.distinct_pins)),
+        ("certificates", build_certificates(DictCertificates), build_certificates(Certificates)),
+    ]
+    print(f"{'bytes per':<14}{'__dict__':>10}{'compact':>10}")
+    for name, before, after in rows:
+        print(f"{name:<14}{bytes_per_item(before, args.count):>10.1f}{bytes_per_item(after, args.count):>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
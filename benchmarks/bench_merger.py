@@ -0,0 +1,41 @@
+import argparse
+import gc
+import time
+
+from benchmarks.synthetic import synthetic_config
+from merger import merge_configs
+
+
+def best_of(repeat, function):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure how merging scales with the number of config fragments.")
+    parser.add_argument("--domains", type=int, default=10_000, help="domains per fragment")
+    parser.add_argument("--domains-per-config", type=int, default=20)
+    parser.add_argument("--fragments", type=int, nargs="+", default=[6, 12, 24, 48])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    # Every fragment declares the same hostnames, so each merge after the first one goes through the conflict and
+    # pin-set merging paths.
+    fragment = synthetic_config(args.domains, args.domains_per_config)
+    print(f"{args.domains} domains per fragment")
+    print(f"{'fragments':>9}{'seconds':>10}{'us/domain':>11}{'conflicts':>11}")
+    for count in args.fragments:
+        fragments = [(f"fragment{index}", fragment) for index in range(count)]
+        report = merge_configs(fragments)[1]
+        seconds = best_of(args.repeat, lambda: merge_configs(fragments))
+        print(f"{count:>9}{seconds:>10.3f}{seconds / (count * args.domains) * 1e6:>11.2f}{len(report.conflicts):>11}")
+
+
+if __name__ == '__main__':
+    main()
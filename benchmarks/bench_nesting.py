@@ -0,0 +1,119 @@
+import argparse
+import gc
+import hashlib
+import sys
+import time
+import xml.etree.ElementTree as Et
+
+from benchmarks.synthetic import synthetic_config
+from model import _start_tag, _fragments
+
+
+# Recursive counterparts of DomainConfig.collect, the node fragments and DomainConfig.content_hash, kept here to
+# compare against the explicit-stack implementations in the model.
+def recursive_collect(domain_config, parent):
+    element = Et.SubElement(parent, "domain-config",
+                            cleartextTrafficPermitted=str(domain_config.cleartext_traffic_permitted).lower())
+    for domain in domain_config.domains:
+        domain.collect(element)
+    if domain_config.pin_set is not None:
+        domain_config.pin_set.collect(element)
+    if domain_config.trust_anchors is not None:
+        domain_config.trust_anchors.collect(element)
+    for inner_domain_config in domain_config.domain_configs:
+        recursive_collect(inner_domain_config, element)
+    return element
+
+
+def recursive_fragments(node, level):
+    tag, attrib, text, children = node._parts()
+    start = _start_tag(tag, attrib)
+    if text:
+        yield start + ">" + Et._escape_cdata(text) + "</" + tag + ">"
+    elif not children:
+        yield start + " />"
+    else:
+        yield start + ">"
+        indent = "\n" + "\t" * (level + 1)
+        for child in children:
+            yield indent
+            yield from recursive_fragments(child, level + 1)
+        yield "\n" + "\t" * level + "</" + tag + ">"
+
+
+def recursive_content_hash(domain_config):
+    digest = hashlib.sha256(repr(("domain-config", domain_config.cleartext_traffic_permitted)).encode("utf-8"))
+    for domain in domain_config.domains:
+        digest.update(repr((domain.domain, domain.include_subdomains)).encode("utf-8"))
+    if domain_config.pin_set is not None:
+        digest.update(domain_config.pin_set.content_hash().encode("ascii"))
+    if domain_config.trust_anchors is not None:
+        digest.update(domain_config.trust_anchors.content_hash().encode("ascii"))
+    for inner_domain_config in domain_config.domain_configs:
+        digest.update(recursive_content_hash(inner_domain_config).encode("ascii"))
+    return digest.hexdigest()
+
+
+def iterative_collect(domain_config, parent):
+    return domain_config.collect(parent)
+
+
+def iterative_content_hash(domain_config):
+    return domain_config.content_hash()
+
+
+def best_of(repeat, function):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def run(config, approach, repeat):
+    collect, fragments, content_hash = approach
+    timings = {}
+    try:
+        timings["collect"] = best_of(repeat, lambda: [collect(domain_config, Et.Element("network-security-config"))
+                                                      for domain_config in config.domain_configs])
+        timings["fragments"] = best_of(repeat, lambda: ["".join(fragments(domain_config, 1))
+                                                        for domain_config in config.domain_configs])
+        timings["content_hash"] = best_of(repeat, lambda: [content_hash(domain_config)
+                                                           for domain_config in config.domain_configs])
+    except RecursionError:
+        return None
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare recursive and explicit-stack traversal of the model.")
+    parser.add_argument("--domains", type=int, default=50_000)
+    parser.add_argument("--domains-per-config", type=int, default=5)
+    parser.add_argument("--depths", type=int, nargs="+", default=[1, 500, 10_000],
+                        help="nesting depths of domain-config chains to measure")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    approaches = {
+        "recursive": (recursive_collect, recursive_fragments, recursive_content_hash),
+        "iterative": (iterative_collect, _fragments, iterative_content_hash),
+    }
+    print(f"recursion limit {sys.getrecursionlimit()}, {args.domains} domains, "
+          f"{args.domains_per_config} per domain-config")
+    print(f"{'depth':>6} {'approach':<10}{'collect':>10}{'fragments':>11}{'hash':>10}")
+    for depth in args.depths:
+        config = synthetic_config(args.domains, args.domains_per_config, depth=depth)
+        for name, approach in approaches.items():
+            timings = run(config, approach, args.repeat)
+            if timings is None:
+                print(f"{depth:>6} {name:<10}{'RecursionError':>31}")
+            else:
+                print(f"{depth:>6} {name:<10}{timings['collect']:>10.3f}{timings['fragments']:>11.3f}"
+                      f"{timings['content_hash']:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
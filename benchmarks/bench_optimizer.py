@@ -0,0 +1,27 @@
+import argparse
+import time
+
+from benchmarks.synthetic import synthetic_config
+from model import Domain
+from optimizer import optimize
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the config optimizer.")
+    parser.add_argument("--domains", type=int, nargs="+", default=[25_000, 50_000, 100_000, 200_000])
+    args = parser.parse_args(argv)
+
+    for domains in args.domains:
+        config = synthetic_config(domains, pins_per_set=2)
+        # Cover some hosts a second time, as machine-assembled configs do.
+        for domain_config in list(config.domain_configs[::2]):
+            domain_config.add_domain(Domain(f"www.{domain_config.domains[0].domain}", False))
+
+        start = time.perf_counter()
+        report = optimize(config)
+        seconds = time.perf_counter() - start
+        print(f"{domains:>8} domains: {seconds:.3f} s ({domains / seconds:.0f} domains/s) - {report}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import gc
+import io
+import time
+import tracemalloc
+
+from model import NetworkSecConfig, DomainConfig, Domain, DomainPattern
+
+REGIONS = ("eu", "us", "ap", "sa", "af")
+
+
+def explicit_config(hosts, regions):
+    config = NetworkSecConfig()
+    domain_config = DomainConfig()
+    domain_config.add_domains(Domain(f"edge{index}.{region}.cdn.example.com", False)
+                              for index in range(1, hosts + 1) for region in regions)
+    config.add_domain_config(domain_config)
+    return config
+
+
+def pattern_config(hosts, regions):
+    config = NetworkSecConfig()
+    domain_config = DomainConfig()
+    domain_config.add_domain(DomainPattern(f"edge{{1..{hosts}}}.{{{','.join(regions)}}}.cdn.example.com", False))
+    config.add_domain_config(domain_config)
+    return config
+
+
+class Discard(io.TextIOBase):
+
+    def write(self, text):
+        return len(text)
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    config = build()
+    model_bytes = tracemalloc.get_traced_memory()[0]
+    config.write(Discard())
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    # Timed again without tracing, which slows allocation heavy code down.
+    gc.collect()
+    start = time.perf_counter()
+    config.write(Discard())
+    return model_bytes, peak_bytes, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare explicit domains with lazily expanded domain patterns.")
+    parser.add_argument("--hosts", type=int, default=20_000, help="hosts per region")
+    parser.add_argument("--regions", type=int, default=len(REGIONS), choices=range(1, len(REGIONS) + 1))
+    args = parser.parse_args(argv)
+
+    regions = REGIONS[:args.regions]
+    print(f"{args.hosts * len(regions)} domains ({args.hosts} hosts x {len(regions)} regions)")
+    print(f"{'model':<10}{'model KiB':>11}{'peak KiB':>10}{'write s':>9}")
+    for name, build in (("explicit", explicit_config), ("pattern", pattern_config)):
+        model_bytes, peak_bytes, seconds = measure(lambda: build(args.hosts, regions))
+        print(f"{name:<10}{model_bytes / 1024:>11.0f}{peak_bytes / 1024:>10.0f}{seconds:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+import argparse
+import os
+import tempfile
+
+from benchmarks.synthetic import synthetic_config
+from scanner import scan
+
+
+def make_tree(directory, files, domains):
+    config = synthetic_config(domains, max(1, domains // 10))
+    for index in range(files):
+        xml = os.path.join(directory, f"module{index // 50}", f"feature{index}", "src", "main", "res", "xml")
+        os.makedirs(xml)
+        config.write(os.path.join(xml, "network_security_config.xml"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure fleet scanning throughput with and without worker "
+                                                 "processes.")
+    parser.add_argument("--files", type=int, default=2_000)
+    parser.add_argument("--domains", type=int, default=200, help="domains per config file")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count()])
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        make_tree(directory, args.files, args.domains)
+        print(f"{args.files} files with {args.domains} domains each")
+        print(f"{'workers':>7}{'discovery s':>13}{'scan s':>9}{'files/s':>9}{'MB/s':>7}")
+        for workers in args.workers:
+            summary = scan([directory], workers=workers).summary()
+            print(f"{workers:>7}{summary['discovery_seconds']:>13.3f}{summary['scan_seconds']:>9.3f}"
+                  f"{summary['files_per_second']:>9.0f}{summary['megabytes_per_second']:>7.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+import argparse
+import gc
+import io
+import time
+
+from benchmarks.synthetic import synthetic_config
+from serializers import SERIALIZERS, available_serializers, get_serializer
+
+
+def best_of(repeat, function):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the throughput of the serializers on large configs.")
+    parser.add_argument("--domains", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--domains-per-config", type=int, default=50)
+    parser.add_argument("--depth", type=int, default=1, help="nesting depth of domain configs")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    serializers = available_serializers()
+    missing = [name for name in SERIALIZERS if name not in serializers]
+    print(f"automatic choice: {get_serializer('auto').name}", end="")
+    print(f", not installed: {', '.join(missing)}" if missing else "")
+    print(f"{'domains':>8}  {'serializer':<11}{'seconds':>9}{'domains/s':>12}{'MB/s':>8}")
+    for domains in args.domains:
+        config = synthetic_config(domains, args.domains_per_config, depth=args.depth)
+        for name in serializers:
+            stream = io.BytesIO()
+            config.write(stream, serializer=name)
+            size = len(stream.getvalue())
+            seconds = best_of(args.repeat, lambda: config.write(io.BytesIO(), serializer=name))
+            print(f"{domains:>8}  {name:<11}{seconds:>9.3f}{domains / seconds:>12.0f}{size / seconds / 1e6:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
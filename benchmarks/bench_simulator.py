@@ -0,0 +1,76 @@
+import argparse
+import datetime
+import os
+import tempfile
+import time
+
+from model import NetworkSecConfig, DomainConfig, DomainPattern, PinSet, Pin
+from pins import certificates_in, spki_pin
+from simulator import discover_chains, simulate
+from test_pins import OPENSSL, make_certificate, expected_pin
+
+
+def make_corpus(directory, chains, hosts, leaves):
+    # Every host is captured many times and leaves are reused across hosts, like traffic recorded by a proxy.
+    certificates = os.path.join(directory, "certificates")
+    os.makedirs(certificates)
+    ca = make_certificate(certificates, "ca", "/CN=Benchmark CA")
+    chain_data = []
+    for index in range(leaves):
+        _, leaf = make_certificate(certificates, f"leaf{index}", f"/CN=host{index}.example.com", ca)
+        with open(leaf, "rb") as file:
+            data = file.read()
+        with open(ca[1], "rb") as file:
+            chain_data.append(data + file.read())
+
+    corpus = os.path.join(directory, "corpus")
+    for host in range(hosts):
+        os.makedirs(os.path.join(corpus, f"host{host}.example.com"))
+    for index in range(chains):
+        host = index % hosts
+        with open(os.path.join(corpus, f"host{host}.example.com", f"{index}.pem"), "wb") as file:
+            file.write(chain_data[host % leaves])
+    return corpus, expected_pin(ca[1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure pin failure simulation throughput on a recorded corpus.")
+    parser.add_argument("--chains", type=int, default=50_000)
+    parser.add_argument("--hosts", type=int, default=1_000)
+    parser.add_argument("--leaves", type=int, default=20, help="distinct leaf certificates in the corpus")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count()])
+    args = parser.parse_args(argv)
+    if OPENSSL is None:
+        parser.error("openssl is required to generate certificates")
+
+    with tempfile.TemporaryDirectory() as directory:
+        corpus, ca_pin = make_corpus(directory, args.chains, args.hosts, args.leaves)
+        config = NetworkSecConfig()
+        domain_config = DomainConfig()
+        domain_config.add_domain(DomainPattern(f"host{{0..{args.hosts - 1}}}.example.com", False))
+        pin_set = PinSet()
+        pin_set.add_pin(Pin(ca_pin))
+        domain_config.add_pin_set(pin_set)
+        config.add_domain_config(domain_config)
+
+        # Reading and pinning every chain without the per-certificate cache, in one process.
+        paths = [path for _, path in discover_chains(corpus)]
+        start = time.perf_counter()
+        for path in paths:
+            with open(path, "rb") as file:
+                [spki_pin(certificate) for certificate in certificates_in(file.read())]
+        uncached = len(paths) / (time.perf_counter() - start)
+
+        print(f"{args.chains} chains of {args.hosts} hosts, {args.leaves} distinct leaves")
+        print(f"{'workers':>7}{'discovery s':>13}{'hash s':>8}{'check s':>9}{'chains/s':>10}")
+        for workers in args.workers:
+            report = simulate(config, corpus, datetime.date.today(), workers)
+            summary = report.summary()
+            assert summary["chains"] == args.chains and not report.failing
+            print(f"{workers:>7}{summary['discovery_seconds']:>13.3f}{summary['hash_seconds']:>8.3f}"
+                  f"{summary['check_seconds']:>9.3f}{summary['chains_per_second']:>10.0f}")
+        print(f"pinning every chain without the certificate cache: {uncached:.0f} chains/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import gc
+import io
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import synthetic_config
+from loader import load
+from snapshot import Snapshot, save
+
+
+def best_of(repeat, function):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare reloading configs from XML and from binary snapshots.")
+    parser.add_argument("--domains", type=int, default=100_000)
+    parser.add_argument("--domains-per-config", type=int, default=50)
+    parser.add_argument("--pins", type=int, default=2, help="pins per pin-set")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    config = synthetic_config(args.domains, args.domains_per_config, args.pins)
+    hostname = f"www.host{args.domains // 2}.example{args.domains // 2 % 97}.com"
+    with tempfile.TemporaryDirectory() as directory:
+        xml_path = os.path.join(directory, "network_security_config.xml")
+        snapshot_path = os.path.join(directory, "config.snapshot")
+        config.write(xml_path)
+        save(config, snapshot_path)
+        print(f"{args.domains} domains: XML {os.path.getsize(xml_path) / 1024:.0f} KiB, "
+              f"snapshot {os.path.getsize(snapshot_path) / 1024:.0f} KiB")
+
+        def open_and_resolve():
+            with Snapshot.open(snapshot_path) as snapshot:
+                snapshot.resolve(hostname)
+
+        def open_and_rebuild():
+            with Snapshot.open(snapshot_path) as snapshot:
+                snapshot.to_config()
+
+        def open_and_write():
+            with Snapshot.open(snapshot_path) as snapshot:
+                snapshot.write(io.StringIO())
+
+        timings = {
+            "XML load": best_of(args.repeat, lambda: load(xml_path)),
+            "XML load + write": best_of(args.repeat, lambda: load(xml_path).write(io.StringIO())),
+            "snapshot open + resolve": best_of(args.repeat, open_and_resolve),
+            "snapshot to_config": best_of(args.repeat, open_and_rebuild),
+            "snapshot write": best_of(args.repeat, open_and_write),
+        }
+    for name, seconds in timings.items():
+        print(f"{name:<26}{seconds * 1000:>10.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Modules the import-only paths must not load, they are only needed for colored prompts or serialization.
+HEAVY_MODULES = ("colorama", "xml.etree.ElementTree", "hashlib", "concurrent.futures", "tomllib", "re")
+IMPORTS = ("model", "spec", "batch", "config_generator")
+
+
+def best_of(repeat, function):
+    return min(function() for _ in range(repeat))
+
+
+def run_seconds(python, args):
+    start = time.perf_counter()
+    subprocess.run([python, *args], cwd=ROOT, check=True, stdout=subprocess.DEVNULL, stdin=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def first_output_seconds(python, args):
+    start = time.perf_counter()
+    process = subprocess.Popen([python, *args], cwd=ROOT, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    process.stdout.readline()
+    seconds = time.perf_counter() - start
+    process.kill()
+    process.communicate()
+    return seconds
+
+
+def loaded_heavy_modules(python, module):
+    script = f"import sys, {module}; print(' '.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))"
+    result = subprocess.run([python, "-c", script], cwd=ROOT, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+    return result.stdout.split()
+
+
+def measure(python, repeat):
+    interpreter = best_of(repeat, lambda: run_seconds(python, ["-c", "pass"]))
+    timings = {}
+    for module in IMPORTS:
+        timings[f"import {module}"] = best_of(
+            repeat, lambda: run_seconds(python, ["-c", f"import {module}"])) - interpreter
+    timings["first prompt"] = best_of(repeat, lambda: first_output_seconds(
+        python, ["config_generator.py", "--no-color"])) - interpreter
+
+    with tempfile.TemporaryDirectory() as directory:
+        spec_path = os.path.join(directory, "app.json")
+        with open(spec_path, "w", encoding="utf-8") as file:
+            json.dump({"domain_configs": [{"domains": ["example.com"], "pin_set": {"pins": ["pindigest"]}}]}, file)
+        timings["batch run"] = best_of(repeat, lambda: first_output_seconds(
+            python, ["config_generator.py", "batch", spec_path, "-o", directory, "-j", "1"])) - interpreter
+    return interpreter, timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure CLI import time and time to first output.")
+    parser.add_argument("--python", default=sys.executable, help="interpreter to benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement, the fastest is reported")
+    parser.add_argument("--budget-ms", type=float, default=50.0,
+                        help="fail when any measurement exceeds the bare interpreter startup by more than this")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module in IMPORTS:
+        heavy = loaded_heavy_modules(args.python, module)
+        if heavy:
+            print(f"FAIL import {module} loads {', '.join(heavy)}", file=sys.stderr)
+            failed = True
+
+    interpreter, timings = measure(args.python, args.repeat)
+    print(f"interpreter startup: {interpreter * 1000:.1f} ms")
+    print(f"{'measurement':<26}{'ms':>8}")
+    for name, seconds in timings.items():
+        print(f"{name:<26}{seconds * 1000:>8.1f}")
+        if seconds * 1000 > args.budget_ms:
+            print(f"OVER BUDGET {name}: {seconds * 1000:.1f} ms > {args.budget_ms} ms", file=sys.stderr)
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
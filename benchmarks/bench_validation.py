@@ -0,0 +1,52 @@
+import argparse
+import gc
+import io
+import time
+import xml.etree.ElementTree as Et
+
+from benchmarks.synthetic import synthetic_config
+from validation import Validator
+
+
+def best_of(repeat, function):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def serialize(config, validator=None):
+    tree = Et.ElementTree(config.collect(validator))
+    Et.indent(tree, space='\t')
+    tree.write(io.BytesIO(), encoding="utf-8", xml_declaration=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the overhead of validating during collect().")
+    parser.add_argument("--domains", type=int, default=40_000)
+    parser.add_argument("--domains-per-config", type=int, default=2)
+    parser.add_argument("--pins", type=int, default=10, help="pins per pin-set")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    config = synthetic_config(args.domains, args.domains_per_config, args.pins)
+    pins = -(-args.domains // args.domains_per_config) * args.pins
+    print(f"{args.domains} domains, {pins} pins")
+
+    plain = best_of(args.repeat, config.collect)
+    validated = best_of(args.repeat, lambda: config.collect(Validator()))
+    print(f"collect():                          {plain:.3f} s")
+    print(f"collect(Validator()):               {validated:.3f} s ({(validated - plain) / plain * 100:+.1f}%)")
+
+    plain = best_of(args.repeat, lambda: serialize(config))
+    validated = best_of(args.repeat, lambda: serialize(config, Validator()))
+    print(f"collect + indent + write:           {plain:.3f} s")
+    print(f"validated collect + indent + write: {validated:.3f} s ({(validated - plain) / plain * 100:+.1f}%)")
+
+
+if __name__ == '__main__':
+    main()
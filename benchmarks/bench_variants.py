@@ -0,0 +1,70 @@
+import argparse
+import copy
+import gc
+import io
+import time
+
+from benchmarks.synthetic import synthetic_config
+from incremental import serialize
+from model import Certificates, DebugOverrides
+from variants import Overlay, SharedRenderer, build_variants
+
+
+def best_of(repeat, function):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def overlays(config, count):
+    # Each variant flips the cleartext flag of one domain-config and some also change the debug overrides, the
+    # typical difference between debug, staging and release flavors.
+    result = {}
+    for index in range(count):
+        debug_overrides = DebugOverrides()
+        debug_overrides.add_certificate(Certificates("user" if index % 2 else "system"))
+        overlay = Overlay(cleartext_traffic_permitted=index % 2 == 1, debug_overrides=debug_overrides)
+        domain_config = config.domain_configs[index * 7 % len(config.domain_configs)]
+        overlay.patch_domain_config(domain_config.domains[0].domain, cleartext_traffic_permitted=True)
+        result[f"variant{index}"] = overlay
+    return result
+
+
+def full_builds(config, overlays):
+    # What building every flavor as its own config costs: a complete copy per variant, serialized on its own.
+    for overlay in overlays.values():
+        variant = overlay.apply(copy.deepcopy(config))
+        variant.write(io.StringIO())
+
+
+def shared_builds(config, overlays):
+    renderer = SharedRenderer()
+    for variant in build_variants(config, overlays).values():
+        serialize(variant, renderer)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare building variants separately and with shared subtrees.")
+    parser.add_argument("--domains", type=int, default=20_000)
+    parser.add_argument("--domains-per-config", type=int, default=20)
+    parser.add_argument("--variants", type=int, nargs="+", default=[1, 3, 10])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    config = synthetic_config(args.domains, args.domains_per_config)
+    print(f"{args.domains} domains, {len(config.domain_configs)} domain-configs")
+    print(f"{'variants':>8}{'separate s':>12}{'shared s':>10}{'speedup':>9}")
+    for count in args.variants:
+        variant_overlays = overlays(config, count)
+        separate = best_of(args.repeat, lambda: full_builds(config, variant_overlays))
+        shared = best_of(args.repeat, lambda: shared_builds(config, variant_overlays))
+        print(f"{count:>8}{separate:>12.3f}{shared:>10.3f}{separate / shared:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import io
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as Et
+
+from benchmarks.synthetic import synthetic_config
+
+PHASES = ("build", "collect", "indent", "write", "stream")
+
+
+def run_phases(parameters, timings, traced=False):
+    def phase(name, function):
+        if traced:
+            tracemalloc.start()
+        start = time.perf_counter()
+        result = function()
+        seconds = time.perf_counter() - start
+        if traced:
+            timings[name]["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            timings[name]["seconds"] = min(timings[name].get("seconds", seconds), seconds)
+        return result
+
+    config = phase("build", lambda: synthetic_config(**parameters))
+    tree = Et.ElementTree(phase("collect", config.collect))
+    phase("indent", lambda: Et.indent(tree, space='\t'))
+    phase("write", lambda: tree.write(io.BytesIO(), encoding="utf-8", xml_declaration=True))
+    phase("stream", lambda: config.write(io.BytesIO()))
+
+
+def run_suite(parameters, repeat=3):
+    timings = {name: {} for name in PHASES}
+    for _ in range(repeat):
+        run_phases(parameters, timings)
+    run_phases(parameters, timings, traced=True)
+    return {
+        "parameters": parameters,
+        "repeat": repeat,
+        "python": platform.python_version(),
+        "phases": timings,
+    }
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, timing in results["phases"].items():
+        reference = baseline.get("phases", {}).get(name)
+        if not reference or not reference.get("seconds"):
+            continue
+        change = (timing["seconds"] - reference["seconds"]) / reference["seconds"] * 100
+        if change > threshold:
+            regressions.append((name, reference["seconds"], timing["seconds"], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark config serialization phases on synthetic configs.")
+    parser.add_argument("--domains", type=int, default=100_000)
+    parser.add_argument("--domains-per-config", type=int, default=50)
+    parser.add_argument("--depth", type=int, default=1, help="nesting depth of domain configs")
+    parser.add_argument("--pins", type=int, default=2, help="pins per pin-set")
+    parser.add_argument("--trust-anchors", type=int, default=1, help="certificates per domain config")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per phase, the fastest is reported")
+    parser.add_argument("-o", "--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="allowed slowdown per phase against the baseline, in percent")
+    args = parser.parse_args(argv)
+
+    parameters = {
+        "domains": args.domains,
+        "domains_per_config": args.domains_per_config,
+        "depth": args.depth,
+        "pins_per_set": args.pins,
+        "trust_anchors": args.trust_anchors,
+    }
+    results = run_suite(parameters, args.repeat)
+
+    print(f"{'phase':<10}{'seconds':>10}{'peak MiB':>10}")
+    for name, timing in results["phases"].items():
+        print(f"{name:<10}{timing['seconds']:>10.3f}{timing['peak_bytes'] / 1024 / 1024:>10.1f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+        if baseline.get("parameters") != parameters:
+            print("warning: baseline was recorded with different parameters", file=sys.stderr)
+        regressions = compare(results, baseline, args.threshold)
+        for name, before, after, change in regressions:
+            print(f"REGRESSION {name}: {before:.3f} s -> {after:.3f} s (+{change:.1f}% > {args.threshold}%)",
+                  file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
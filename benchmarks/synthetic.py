@@ -0,0 +1,45 @@
+import base64
+import hashlib
+
+from model import NetworkSecConfig, BaseConfig, Certificates, DomainConfig, Domain, PinSet, Pin, TrustAnchors, \
+    DebugOverrides
+
+
+def synthetic_pin(seed):
+    return base64.b64encode(hashlib.sha256(f"pin-{seed}".encode()).digest()).decode("ascii")
+
+
+def synthetic_config(domains=10_000, domains_per_config=50, pins_per_set=2, trust_anchors=1, depth=1):
+    config = NetworkSecConfig()
+
+    base_config = BaseConfig()
+    base_config.add_certificate(Certificates("system"))
+    config.add_base_config(base_config)
+
+    domain_config = None
+    parent = None
+    for index in range(domains):
+        if index % domains_per_config == 0:
+            config_index = index // domains_per_config
+            domain_config = DomainConfig(cleartext_traffic_permitted=config_index % 10 == 0)
+            pin_set = PinSet(expiration="2030-01-01" if config_index % 2 else None)
+            for pin in range(pins_per_set):
+                pin_set.add_pin(Pin(synthetic_pin(config_index * pins_per_set + pin)))
+            domain_config.add_pin_set(pin_set)
+            if trust_anchors:
+                anchors = TrustAnchors()
+                for anchor in range(trust_anchors):
+                    anchors.add_certificate(Certificates(f"@raw/ca_{anchor}", override_pins=anchor == 0))
+                domain_config.add_trust_anchors(anchors)
+            # Every `depth` consecutive domain configs form one chain of nested configs.
+            if depth > 1 and config_index % depth:
+                parent.add_domain_config(domain_config)
+            else:
+                config.add_domain_config(domain_config)
+            parent = domain_config
+        domain_config.add_domain(Domain(f"host{index}.example{index % 97}.com", index % 3 == 0))
+
+    overrides = DebugOverrides()
+    overrides.add_certificate(Certificates("user"))
+    config.add_debug_overrides(overrides)
+    return config
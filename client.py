@@ -0,0 +1,160 @@
+import argparse
+import json
+import os
+import socket
+import sys
+
+# Kept free of the generator's own modules and of http.client (which pulls in the email package), so that starting a
+# client costs little more than the interpreter. The daemon only needs requests with a Content-Length.
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+class DaemonError(Exception):
+    pass
+
+
+class Client:
+
+    def __init__(self, socket_path=None, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=60.0):
+        self.socket_path = socket_path
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.connection = None
+        self.reader = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def connect(self):
+        if self.socket_path is not None:
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.settimeout(self.timeout)
+            try:
+                connection.connect(self.socket_path)
+            except OSError:
+                connection.close()
+                raise
+        else:
+            connection = socket.create_connection((self.host, self.port), self.timeout)
+        self.connection = connection
+        self.reader = connection.makefile("rb")
+
+    def close(self):
+        if self.connection is not None:
+            self.reader.close()
+            self.connection.close()
+            self.connection = self.reader = None
+
+    def exchange(self, method, path, body):
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(body)}\r\n"
+        if body:
+            head += "Content-Type: application/json\r\n"
+        self.connection.sendall(head.encode("ascii") + b"\r\n" + body)
+        status_line = self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("the daemon closed the connection")
+        length = 0
+        while True:
+            line = self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.partition(b":")
+            if name.strip().lower() == b"content-length":
+                length = int(value)
+        return int(status_line.split()[1]), self.reader.read(length)
+
+    def request(self, method, path, body=b""):
+        # One connection is kept open between requests; a connection the daemon closed in the meantime is reopened.
+        for attempt in range(2):
+            if self.connection is None:
+                self.connect()
+            try:
+                status, payload = self.exchange(method, path, body)
+                break
+            except (BrokenPipeError, ConnectionResetError):
+                self.close()
+                if attempt:
+                    raise
+        if status != 200:
+            try:
+                message = json.loads(payload)["error"]
+            except (ValueError, KeyError, TypeError):
+                message = payload.decode("utf-8", "replace")
+            raise DaemonError(f"{status}: {message}")
+        return payload
+
+    def generate(self, spec=None, spec_path=None, base_dir=None, compact=False, serializer=None, variant=None):
+        # Either a spec or the path of a spec file the daemon reads itself, relative certificate paths are resolved
+        # against base_dir (default: the spec file's directory).
+        request = {"compact": compact, "serializer": serializer, "variant": variant}
+        if spec is not None:
+            request["spec"] = spec
+        else:
+            request["spec_path"] = os.path.abspath(spec_path)
+        if base_dir is not None:
+            request["base_dir"] = os.path.abspath(base_dir)
+        return self.request("POST", "/generate", json.dumps(request).encode("utf-8"))
+
+    def metrics(self):
+        return json.loads(self.request("GET", "/metrics"))
+
+
+def generate_locally(spec_path, compact=False, serializer=None, variant=None):
+    import io
+    from spec import load_spec, build_config, build_variants
+
+    spec = load_spec(spec_path)
+    base_dir = os.path.dirname(os.path.abspath(spec_path))
+    config = build_variants(spec, base_dir)[variant] if variant is not None else build_config(spec, base_dir)
+    stream = io.BytesIO()
+    config.write(stream, compact=compact, serializer=None if compact else serializer)
+    return stream.getvalue()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a network security config through a running daemon.")
+    parser.add_argument("spec", nargs="?", help="JSON/TOML spec file")
+    parser.add_argument("-o", "--output", help="where to write the config (default: standard output)")
+    parser.add_argument("--socket", help="Unix socket of the daemon (default: localhost HTTP)")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--variant", help="build this variant of a spec with \"variants\"")
+    parser.add_argument("--compact", action="store_true", help="write the config without indentation and defaults")
+    parser.add_argument("--serializer", help="serializer the daemon writes the config with")
+    parser.add_argument("--fallback", action="store_true", help="generate in this process when no daemon is running")
+    parser.add_argument("--metrics", action="store_true", help="print the daemon's metrics as JSON")
+    args = parser.parse_args(argv)
+    if args.spec is None and not args.metrics:
+        parser.error("a spec is required unless --metrics is given")
+
+    with Client(args.socket, args.host, args.port) as client:
+        try:
+            if args.metrics:
+                print(json.dumps(client.metrics(), indent=2))
+                return 0
+            content = client.generate(spec_path=args.spec, compact=args.compact, serializer=args.serializer,
+                                      variant=args.variant)
+        except DaemonError as error:
+            print(f"{args.spec}: {error}", file=sys.stderr)
+            return 1
+        except (ConnectionRefusedError, FileNotFoundError) as error:
+            if not args.fallback or args.metrics:
+                print(f"no daemon running: {error}", file=sys.stderr)
+                return 1
+            content = generate_locally(args.spec, args.compact, args.serializer, args.variant)
+
+    if args.output is None:
+        sys.stdout.buffer.write(content)
+    else:
+        with open(args.output, "wb") as file:
+            file.write(content)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
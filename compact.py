@@ -0,0 +1,46 @@
+import argparse
+import sys
+
+from loader import load
+from model import XML_DECLARATION
+
+
+class SizeReport:
+
+    def __init__(self, bytes_before, bytes_after):
+        self.bytes_before = bytes_before
+        self.bytes_after = bytes_after
+
+    @property
+    def bytes_saved(self):
+        return self.bytes_before - self.bytes_after
+
+    def __str__(self):
+        ratio = self.bytes_saved / self.bytes_before * 100 if self.bytes_before else 0.0
+        return f"{self.bytes_before} -> {self.bytes_after} bytes, saved {self.bytes_saved} ({ratio:.1f}% smaller)"
+
+
+def _size(fragments):
+    return len(XML_DECLARATION) + sum(len(fragment.encode("utf-8")) for fragment in fragments)
+
+
+def size_report(config):
+    return SizeReport(_size(config.fragments()), _size(config.compact_fragments()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a network security config without indentation and without "
+                                                 "attributes Android fills in by default or inherits.")
+    parser.add_argument("config", help="network_security_config.xml to compact")
+    parser.add_argument("-o", "--output", help="where to write the compact config (default: in place)")
+    args = parser.parse_args(argv)
+
+    config = load(args.config)
+    report = size_report(config)
+    config.write(args.output or args.config, compact=True)
+    print(report)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+import argparse
+import json
+import sys
+
+from loader import load
+from resolver import base_effective_config, walk_effective_configs, normalize_hostname, trust_anchors_key
+
+
+def _settings(effective):
+    pin_set = effective.pin_set
+    pins = sorted({pin.pin for pin in pin_set.pins}) if pin_set is not None and pin_set.pins else None
+    anchors = trust_anchors_key(effective.trust_anchors)
+    return {
+        "cleartext_traffic_permitted": effective.cleartext_traffic_permitted,
+        "pins": pins,
+        "expiration": pin_set.expiration if pins is not None else None,
+        "trust_anchors": [{"src": src, "override_pins": override_pins} for src, override_pins in anchors]
+        if anchors is not None else None,
+    }
+
+
+def domain_settings(config):
+    settings = {}
+    for effective in walk_effective_configs(config):
+        shared = _settings(effective)
+        for domain in effective.domain_config.expanded_domains():
+            hostname = normalize_hostname(domain.domain)
+            # Android rejects duplicate domains, the first declaration is kept here as in the resolver.
+            if hostname not in settings:
+                settings[hostname] = dict(shared, include_subdomains=domain.include_subdomains)
+    return settings
+
+
+def _changes(before, after):
+    return {field: {"before": before[field], "after": after[field]}
+            for field in before if before[field] != after[field]}
+
+
+class ConfigDiff:
+
+    def __init__(self, added, removed, changed, base_config):
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+        self.base_config = base_config
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed or self.base_config)
+
+    def to_dict(self):
+        return {
+            "added": self.added,
+            "removed": self.removed,
+            "changed": self.changed,
+            "base_config": self.base_config,
+        }
+
+
+def diff_configs(old, new):
+    before = domain_settings(old)
+    after = domain_settings(new)
+
+    added = {hostname: after[hostname] for hostname in sorted(after.keys() - before.keys())}
+    removed = {hostname: before[hostname] for hostname in sorted(before.keys() - after.keys())}
+    changed = {}
+    for hostname in sorted(before.keys() & after.keys()):
+        if before[hostname] != after[hostname]:
+            changed[hostname] = _changes(before[hostname], after[hostname])
+
+    return ConfigDiff(added, removed, changed,
+                      _changes(_settings(base_effective_config(old)), _settings(base_effective_config(new))))
+
+
+def format_diff(diff):
+    lines = []
+    for hostname in diff.added:
+        lines.append(f"+ {hostname}")
+    for hostname in diff.removed:
+        lines.append(f"- {hostname}")
+    for hostname, changes in diff.changed.items():
+        for field, change in changes.items():
+            lines.append(f"~ {hostname} {field}: {change['before']} -> {change['after']}")
+    for field, change in diff.base_config.items():
+        lines.append(f"~ base-config {field}: {change['before']} -> {change['after']}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Semantic diff between two network security configs.")
+    parser.add_argument("old", help="original network_security_config.xml")
+    parser.add_argument("new", help="changed network_security_config.xml")
+    parser.add_argument("--json", action="store_true", help="print the diff as JSON")
+    args = parser.parse_args(argv)
+
+    diff = diff_configs(load(args.old), load(args.new))
+    if args.json:
+        print(json.dumps(diff.to_dict(), indent=2))
+    elif diff:
+        print(format_diff(diff))
+    return 1 if diff else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
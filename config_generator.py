@@ -1,27 +1,45 @@
 import os
 import sys
 
-from colorama import Fore
-
 from model import NetworkSecConfig, BaseConfig, Certificates, DomainConfig, Domain, PinSet, Pin, TrustAnchors, \
     DebugOverrides
-import xml.etree.cElementTree as Et
 
-BOLD = '\033[1m'
-END = '\033[0m'
+BOLD = ''
+END = ''
+
+
+class NoColor:
+    GREEN = ''
+    CYAN = ''
+    RESET = ''
+
+
+Fore = NoColor
+
+
+def use_colors(enabled=True):
+    global Fore, BOLD, END
+    if enabled:
+        from colorama import Fore
+
+        BOLD = '\033[1m'
+        END = '\033[0m'
+    else:
+        Fore = NoColor
+        BOLD = ''
+        END = ''
 
 
 def hook(exception, *args):
     if exception is KeyboardInterrupt:
         print(Fore.RESET)
         exit()
+    sys.__excepthook__(exception, *args)
 
 
 def colored_input(text: str, color):
-    sys.excepthook = hook
     user_input = input(text + color)
     print(Fore.RESET, end="", flush=True)
-    sys.excepthook = sys.__excepthook__
     return user_input
 
 
@@ -49,7 +67,7 @@ def generate_trust_anchors():
     return colored_input("Enter trust anchors for secure connections: ", Fore.CYAN).replace(",", "")
 
 
-def generate_domain_config():
+def prompt_domain_config():
     cleartext_traffic_on_domain = cleartext_traffic("DomainConfig")
     domain_config = DomainConfig(cleartext_traffic_on_domain)
 
@@ -102,28 +120,47 @@ def generate_domain_config():
                 Fore.CYAN).strip().lower() == "y"
         domain_config.add_pin_set(pin_set)
 
-    print("")
-    adding_inner_domains = True
-    inner_domain_decision = colored_input(
-        f"{question_mark()} {boldize("Do you want to add nested domain config?")} (y/{boldize("N")}) ", Fore.CYAN)
+    return domain_config
+
 
-    if inner_domain_decision.strip().lower() == "y":
-        while adding_inner_domains:
+def generate_domain_config():
+    # Nested domain configs are asked for with an explicit stack of parents instead of recursion, the questions
+    # come in the same order.
+    parents = []
+    domain_config = prompt_domain_config()
+    while True:
+        print("")
+        inner_domain_decision = colored_input(
+            f"{question_mark()} {boldize("Do you want to add nested domain config?")} (y/{boldize("N")}) ", Fore.CYAN)
+        if inner_domain_decision.strip().lower() == "y":
+            parents.append(domain_config)
             print("")
             print("Adding inner domain config...")
-            inner_domain = generate_domain_config()
-            domain_config.add_domain_config(inner_domain)
+            domain_config = prompt_domain_config()
+            continue
 
+        while parents:
+            parents[-1].add_domain_config(domain_config)
             adding_inner_domains = colored_input(
                 f"{question_mark()} {boldize("Do you want to add another nested domain config?")} y/{boldize("N")} ",
                 Fore.CYAN).strip().lower() == "y"
-            if not adding_inner_domains:
-                print("Leaving inner domain config...")
+            if adding_inner_domains:
+                print("")
+                print("Adding inner domain config...")
+                domain_config = prompt_domain_config()
+                break
+            print("Leaving inner domain config...")
+            domain_config = parents.pop()
+        else:
+            return domain_config
 
-    return domain_config
 
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # Plain argv handling keeps argparse (and the re module) off the path to the first prompt.
+    use_colors("--no-color" not in argv and "NO_COLOR" not in os.environ)
+    sys.excepthook = hook
 
-def main():
     print("Welcome to the NetworkConfigGenerator!")
     print("")
     print("I will guide you through NetworkSecurityConfiguration generation.")
@@ -207,13 +244,18 @@ def main():
         colored_input(f"{boldize("Without filepath config cannot be saved, provide one: ")}", Fore.CYAN)
 
     # section generate
-    root_base = config.collect()
-    tree = Et.ElementTree(root_base)
-    Et.indent(tree, space='\t')
-    tree.write(file_path, encoding="utf-8", xml_declaration=True)
+    config.write(file_path)
 
 
 if __name__ == '__main__':
+    if sys.argv[1:2] == ["batch"]:
+        from batch import main as batch_main
+
+        sys.exit(batch_main(sys.argv[2:]))
+    if sys.argv[1:2] == ["watch"]:
+        from watch import main as watch_main
+
+        sys.exit(watch_main(sys.argv[2:]))
     try:
         main()
     except KeyboardInterrupt:
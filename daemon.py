@@ -0,0 +1,227 @@
+import argparse
+import http.server
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+
+from client import DEFAULT_HOST, DEFAULT_PORT
+from incremental import FragmentCache, serialize, serialize_compact
+from serializers import SerializerError
+from spec import load_spec, build_config, build_variants, SpecError
+
+DEFAULT_CACHE_LIMIT = 100_000
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Metrics:
+
+    def __init__(self, window=60.0, samples=10_000):
+        self.window = window
+        self.started = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.bytes_written = 0
+        self.latencies = deque(maxlen=samples)
+        self.lock = threading.Lock()
+
+    def begin(self):
+        with self.lock:
+            self.in_flight += 1
+        return time.perf_counter()
+
+    def end(self, start, size=0, failed=False):
+        seconds = time.perf_counter() - start
+        with self.lock:
+            self.in_flight -= 1
+            self.requests += 1
+            self.errors += failed
+            self.bytes_written += size
+            self.latencies.append((time.monotonic(), seconds))
+        return seconds
+
+    def to_dict(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            recent = sorted(seconds for finished, seconds in self.latencies if now - finished <= self.window)
+            uptime = now - self.started
+            return {
+                "uptime_s": uptime,
+                "requests": self.requests,
+                "errors": self.errors,
+                "in_flight": self.in_flight,
+                "bytes_written": self.bytes_written,
+                # Over the last `window` seconds (or the uptime, when shorter).
+                "requests_per_s": len(recent) / min(self.window, uptime) if uptime > 0 else 0.0,
+                "latency_ms": {name: percentile(recent, fraction) * 1000
+                               for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0))},
+            }
+
+
+class GenerationService:
+    # Everything a fresh process pays for on every config stays warm here: imports, the bounded in-memory pin cache of
+    # pins.compute_pins, interned pins and certificates of the configs in flight and a bounded fragment cache.
+
+    def __init__(self, cache_dir=None, cache_limit=DEFAULT_CACHE_LIMIT):
+        self.cache = FragmentCache(cache_dir, cache_limit)
+        self.metrics = Metrics()
+        # Building and serializing hold the GIL anyway, the lock keeps the fragment cache consistent while requests
+        # are read and answered concurrently.
+        self.cache_lock = threading.Lock()
+
+    def generate(self, request):
+        spec = request.get("spec")
+        base_dir = request.get("base_dir")
+        if spec is None:
+            spec = load_spec(request["spec_path"])
+            base_dir = base_dir or os.path.dirname(request["spec_path"])
+        if request.get("variant") is not None:
+            config = build_variants(spec, base_dir)[request["variant"]]
+        else:
+            config = build_config(spec, base_dir)
+
+        if request.get("compact", False):
+            return serialize_compact(config)
+        if request.get("serializer") is not None:
+            stream = io.BytesIO()
+            config.write(stream, serializer=request["serializer"])
+            return stream.getvalue()
+        with self.cache_lock:
+            return serialize(config, self.cache)
+
+    def handle(self, body):
+        # (status, content type, payload) for a JSON request body.
+        start = self.metrics.begin()
+        content = None
+        try:
+            content = self.generate(json.loads(body))
+        except (OSError, KeyError, TypeError, AttributeError, ValueError, SpecError, SerializerError) as error:
+            message = json.dumps({"error": f"{type(error).__name__}: {error}"}).encode("utf-8")
+            return 400, "application/json", message
+        finally:
+            # Also for errors that are not answered with a 400, which the server reports and survives.
+            self.metrics.end(start, 0 if content is None else len(content), failed=content is None)
+        return 200, "application/xml", content
+
+    def to_dict(self):
+        metrics = self.metrics.to_dict()
+        metrics["fragment_cache"] = {"hits": self.cache.hits, "misses": self.cache.misses,
+                                     "size": len(self.cache.fragments)}
+        return metrics
+
+
+class RequestHandler(http.server.BaseHTTPRequestHandler):
+    # Keep-alive, so a build script sending many specs reuses one connection.
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        if self.path != "/generate":
+            self.respond(404, "application/json", b'{"error": "not found"}')
+            return
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.respond(*self.server.service.handle(body))
+
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.respond(404, "application/json", b'{"error": "not found"}')
+            return
+        self.respond(200, "application/json", json.dumps(self.server.service.to_dict()).encode("utf-8"))
+
+    def respond(self, status, content_type, payload):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TCPServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service):
+        super().__init__(address, RequestHandler)
+        self.service = service
+
+
+class UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, service):
+        remove_stale_socket(path)
+        super().__init__(path, RequestHandler)
+        self.service = service
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except FileNotFoundError:
+            pass
+
+
+def remove_stale_socket(path):
+    # A socket file left behind by a daemon that was killed is removed, one that still answers is not.
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except ConnectionRefusedError:
+        os.unlink(path)
+    else:
+        raise OSError(f"a daemon is already listening on {path}")
+    finally:
+        probe.close()
+
+
+def create_server(service, socket_path=None, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    if socket_path is not None:
+        return UnixServer(socket_path, service)
+    return TCPServer((host, port), service)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve network security config generation to build scripts from "
+                                                 "one long-running process with warm caches.")
+    parser.add_argument("--socket", help="listen on this Unix socket instead of localhost HTTP")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--cache-dir", help="shared fragment cache directory, also used by batch")
+    parser.add_argument("--cache-limit", type=int, default=DEFAULT_CACHE_LIMIT,
+                        help="fragments kept in memory")
+    args = parser.parse_args(argv)
+
+    service = GenerationService(args.cache_dir, args.cache_limit)
+    server = create_server(service, args.socket, args.host, args.port)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    address = args.socket or f"http://{args.host}:{server.server_address[1]}"
+    print(f"Listening on {address}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        metrics = service.to_dict()
+        print(f"{metrics['requests']} requests ({metrics['errors']} failed), "
+              f"p50 {metrics['latency_ms']['p50']:.1f} ms, p99 {metrics['latency_ms']['p99']:.1f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
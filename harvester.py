@@ -0,0 +1,187 @@
+import argparse
+import _ssl
+import asyncio
+import json
+import ssl
+import sys
+import time
+
+from model import Pin, PinSet
+from pins import spki_pin, PinError
+
+DEFAULT_PORT = 443
+
+
+class HarvestResult:
+
+    def __init__(self, hostname, port=DEFAULT_PORT, pins=None, error=None, attempts=0, seconds=0.0):
+        self.hostname = hostname
+        self.port = port
+        self.pins = pins or []
+        self.error = error
+        self.attempts = attempts
+        self.seconds = seconds
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def to_dict(self):
+        return {
+            "hostname": self.hostname,
+            "port": self.port,
+            "pins": self.pins,
+            "error": self.error,
+            "attempts": self.attempts,
+            "seconds": self.seconds,
+        }
+
+
+def parse_host(host, port=DEFAULT_PORT):
+    hostname, separator, host_port = host.strip().rpartition(":")
+    if separator and host_port.isdigit() and (":" not in hostname or hostname.endswith("]")):
+        return hostname.strip("[]"), int(host_port)
+    return host.strip().strip("[]"), port
+
+
+def peer_chain(ssl_object):
+    # The chain as sent by the server, leaf first. It is public API from Python 3.13 on.
+    if hasattr(ssl_object, "get_unverified_chain"):
+        return [bytes(certificate) for certificate in ssl_object.get_unverified_chain()]
+    sslobj = getattr(ssl_object, "_sslobj", None)
+    if sslobj is not None and hasattr(sslobj, "get_unverified_chain"):
+        return [certificate.public_bytes(_ssl.ENCODING_DER) for certificate in sslobj.get_unverified_chain()]
+    return [ssl_object.getpeercert(binary_form=True)]
+
+
+async def fetch_chain(hostname, port=DEFAULT_PORT, ssl_context=None, timeout=10.0):
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection(hostname, port, ssl=ssl_context or ssl.create_default_context(),
+                                server_hostname=hostname, ssl_handshake_timeout=timeout), timeout)
+    try:
+        return peer_chain(writer.get_extra_info("ssl_object"))
+    finally:
+        writer.close()
+        try:
+            await asyncio.wait_for(writer.wait_closed(), timeout)
+        except (OSError, ssl.SSLError, asyncio.TimeoutError):
+            pass
+
+
+async def harvest_host(hostname, port=DEFAULT_PORT, ssl_context=None, timeout=10.0, retries=2, retry_delay=0.5):
+    start = time.perf_counter()
+    result = HarvestResult(hostname, port)
+    for attempt in range(retries + 1):
+        result.attempts = attempt + 1
+        try:
+            chain = await fetch_chain(hostname, port, ssl_context, timeout)
+            result.pins = list(dict.fromkeys(spki_pin(certificate) for certificate in chain))
+            result.error = None
+            break
+        except ssl.SSLCertVerificationError as error:
+            # Retrying cannot fix an untrusted or mismatching certificate.
+            result.error = f"certificate verification failed: {error.verify_message}"
+            break
+        except PinError as error:
+            result.error = f"unreadable certificate: {error}"
+            break
+        except asyncio.TimeoutError:
+            result.error = f"timed out after {timeout} s"
+        except (OSError, ssl.SSLError, EOFError) as error:
+            result.error = f"{type(error).__name__}: {error}"
+        if attempt < retries:
+            await asyncio.sleep(retry_delay * 2 ** attempt)
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+async def harvest_hosts(hosts, concurrency=100, port=DEFAULT_PORT, ssl_context=None, timeout=10.0, retries=2,
+                        retry_delay=0.5):
+    ssl_context = ssl_context or ssl.create_default_context()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(host):
+        hostname, host_port = parse_host(host, port)
+        async with semaphore:
+            return await harvest_host(hostname, host_port, ssl_context, timeout, retries, retry_delay)
+
+    return await asyncio.gather(*(bounded(host) for host in hosts))
+
+
+def harvest(hosts, concurrency=100, port=DEFAULT_PORT, ssl_context=None, timeout=10.0, retries=2, retry_delay=0.5):
+    return asyncio.run(harvest_hosts(hosts, concurrency, port, ssl_context, timeout, retries, retry_delay))
+
+
+def suggested_pin_set(results, expiration=None):
+    # Leaf pins come first, intermediates of the same chains follow as backup pins.
+    pins = []
+    for position in range(max((len(result.pins) for result in results), default=0)):
+        pins.extend(result.pins[position] for result in results if position < len(result.pins))
+    pin_set = PinSet(expiration=expiration)
+    pin_set.add_pins(Pin(pin) for pin in dict.fromkeys(pins))
+    return pin_set
+
+
+def pin_domain_configs(domain_configs, expiration=None, **options):
+    domain_configs = [domain_config for domain_config in domain_configs if domain_config.domains]
+    hostnames = list(dict.fromkeys(domain.domain for domain_config in domain_configs
+                                   for domain in domain_config.expanded_domains()))
+    results = dict(zip(hostnames, harvest(hostnames, **options)))
+    for domain_config in domain_configs:
+        harvested = [results[domain.domain] for domain in domain_config.expanded_domains()
+                     if results[domain.domain].ok]
+        if harvested:
+            domain_config.add_pin_set(suggested_pin_set(harvested, expiration))
+    return list(results.values())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Harvest SPKI pins from live TLS endpoints.")
+    parser.add_argument("hosts", nargs="*", help="host or host:port to connect to")
+    parser.add_argument("-f", "--file", help="file with one host per line")
+    parser.add_argument("--config", help="network_security_config.xml whose domain-configs without pins get pin-sets")
+    parser.add_argument("-o", "--output", help="where to write the pinned config (default: in place)")
+    parser.add_argument("--expiration", help="expiration date for generated pin-sets")
+    parser.add_argument("-c", "--concurrency", type=int, default=100, help="maximum simultaneous connections")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds per connection attempt")
+    parser.add_argument("--retries", type=int, default=2, help="retries after timeouts and connection errors")
+    parser.add_argument("--cafile", help="trust these CA certificates instead of the system store")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    options = {
+        "concurrency": args.concurrency,
+        "port": args.port,
+        "ssl_context": ssl.create_default_context(cafile=args.cafile),
+        "timeout": args.timeout,
+        "retries": args.retries,
+    }
+    if args.config:
+        from loader import load
+        from optimizer import all_domain_configs
+
+        config = load(args.config)
+        results = pin_domain_configs([domain_config for domain_config in all_domain_configs(config)
+                                      if domain_config.pin_set is None], args.expiration, **options)
+        config.write(args.output or args.config)
+    else:
+        hosts = list(args.hosts)
+        if args.file:
+            with open(args.file, "r", encoding="utf-8") as file:
+                hosts.extend(line.strip() for line in file if line.strip() and not line.startswith("#"))
+        results = harvest(hosts, **options)
+
+    if args.json:
+        print(json.dumps([result.to_dict() for result in results], indent=2))
+    else:
+        for result in results:
+            if result.ok:
+                print(f"{result.hostname}:{result.port} {' '.join(result.pins)}")
+            else:
+                print(f"{result.hostname}:{result.port} ERROR {result.error}", file=sys.stderr)
+    return 0 if all(result.ok for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
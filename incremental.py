@@ -0,0 +1,88 @@
+import os
+
+from instrumentation import phase
+from model import XML_DECLARATION
+
+
+class FragmentCache:
+
+    def __init__(self, directory=None, limit=None):
+        self.directory = directory
+        self.limit = limit
+        self.fragments = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.xml")
+
+    def get(self, key):
+        fragment = self.fragments.get(key)
+        if fragment is None and self.directory is not None:
+            try:
+                with open(self._path(key), "r", encoding="utf-8", newline="") as file:
+                    fragment = file.read()
+            except FileNotFoundError:
+                return None
+            self._remember(key, fragment)
+        return fragment
+
+    def _remember(self, key, fragment):
+        if self.limit is not None and len(self.fragments) >= self.limit:
+            # Long-running processes keep at most `limit` fragments in memory, the oldest are dropped first.
+            del self.fragments[next(iter(self.fragments))]
+        self.fragments[key] = fragment
+
+    def put(self, key, fragment):
+        self._remember(key, fragment)
+        if self.directory is None:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Entries are content addressed, so concurrent writers on a shared directory always agree on the content.
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8", newline="") as file:
+            file.write(fragment)
+        os.replace(temporary, path)
+
+    def render(self, node, level, fragments=None):
+        key = f"{node.content_hash()}-{level}"
+        fragment = self.get(key)
+        if fragment is None:
+            self.misses += 1
+            fragment = "".join(node.fragments(level) if fragments is None else fragments(node, level))
+            self.put(key, fragment)
+        else:
+            self.hits += 1
+        if fragment:
+            yield fragment
+
+
+def serialize(config, cache):
+    with phase("write", config):
+        return (XML_DECLARATION + "".join(config.fragments(render=cache.render))).encode("utf-8", "xmlcharrefreplace")
+
+
+def serialize_compact(config):
+    # Compact output has no indentation levels to key fragments by, it is always rendered in full.
+    with phase("write", config):
+        return (XML_DECLARATION + "".join(config.compact_fragments())).encode("utf-8", "xmlcharrefreplace")
+
+
+def write_if_changed(path, content):
+    try:
+        if os.path.getsize(path) == len(content):
+            with open(path, "rb") as file:
+                if file.read() == content:
+                    return False
+    except FileNotFoundError:
+        pass
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(content)
+    os.replace(temporary, path)
+    return True
+
+
+def write_incremental(config, path, cache):
+    return write_if_changed(path, serialize(config, cache))
@@ -0,0 +1,220 @@
+import sys
+import time
+
+# Hooks are called as hook(phase name, subject) and return a context manager that is entered for the duration of the
+# phase, e.g. `lambda name, subject: tracer.start_as_current_span(name)`. Phases are "load", "build", "collect",
+# "indent", "tree.write" and "write", the subject is the config being processed or the source being loaded. Inside
+# "write" the tree serializers report "collect", "indent" and "tree.write", the string serializer "fragments" and
+# "stream.write" per chunk of fragments.
+_hooks = []
+
+
+def add_hook(hook):
+    _hooks.append(hook)
+
+
+def remove_hook(hook):
+    _hooks.remove(hook)
+
+
+class _NoPhase:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_PHASE = _NoPhase()
+
+
+class _Phase:
+
+    def __init__(self, name, subject):
+        self.name = name
+        self.subject = subject
+        self.contexts = []
+
+    def __enter__(self):
+        for hook in list(_hooks):
+            context = hook(self.name, self.subject)
+            context.__enter__()
+            self.contexts.append(context)
+        return self
+
+    def __exit__(self, *exc_info):
+        while self.contexts:
+            self.contexts.pop().__exit__(*exc_info)
+        return False
+
+
+def phase(name, subject=None):
+    # Costs one list check when nobody listens, so the model can mark its phases unconditionally.
+    if not _hooks:
+        return _NO_PHASE
+    return _Phase(name, subject)
+
+
+def count_nodes(config):
+    counts = {"domain-config": 0, "nested domain-config": 0, "domain": 0, "domain pattern": 0, "pin-set": 0, "pin": 0,
+              "trust-anchors": 0, "certificates": 0}
+    for trust_anchor in (getattr(config.base_config, "trust_anchor", None),
+                         getattr(config.debug_overrides, "trust_anchor", None)):
+        if trust_anchor is not None:
+            counts["trust-anchors"] += 1
+            counts["certificates"] += len(trust_anchor.certificates)
+    pending = [(domain_config, False) for domain_config in config.domain_configs]
+    while pending:
+        domain_config, nested = pending.pop()
+        counts["nested domain-config" if nested else "domain-config"] += 1
+        counts["domain"] += domain_config.domain_count()
+        counts["domain pattern"] += sum(1 for domain in domain_config.domains if hasattr(domain, "pattern"))
+        if domain_config.pin_set is not None and domain_config.pin_set.pins:
+            counts["pin-set"] += 1
+            counts["pin"] += len(domain_config.pin_set.pins)
+        if domain_config.trust_anchors is not None:
+            counts["trust-anchors"] += 1
+            counts["certificates"] += len(domain_config.trust_anchors.certificates)
+        pending.extend((inner, True) for inner in domain_config.domain_configs)
+    return counts
+
+
+class _Measurement:
+
+    def __init__(self, profiler, name, subject):
+        self.profiler = profiler
+        self.name = name
+        self.subject = subject
+
+    def __enter__(self):
+        profiler = self.profiler
+        if profiler.memory:
+            import tracemalloc
+
+            # Peaks are tracked per phase, the enclosing phase keeps the highest peak seen so far.
+            current, peak = tracemalloc.get_traced_memory()
+            if profiler.stack:
+                profiler.stack[-1][1] = max(profiler.stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            profiler.stack.append([current, 0])
+        if self.name in ("collect", "write") and hasattr(self.subject, "domain_configs"):
+            profiler.nodes = count_nodes(self.subject)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.start
+        profiler = self.profiler
+        entry = profiler.phases.setdefault(self.name, {"calls": 0, "seconds": 0.0, "peak_bytes": 0})
+        entry["calls"] += 1
+        entry["seconds"] += seconds
+        if profiler.memory:
+            import tracemalloc
+
+            start, inner_peak = profiler.stack.pop()
+            peak = max(tracemalloc.get_traced_memory()[1], inner_peak)
+            if profiler.stack:
+                profiler.stack[-1][1] = max(profiler.stack[-1][1], peak)
+            entry["peak_bytes"] = max(entry["peak_bytes"], peak - start)
+        return False
+
+
+class Profiler:
+    # Hook recording wall time, calls and peak traced memory per phase plus the node counts of the last config
+    # written. Memory tracing slows the traced code down, pass memory=False for plain timings.
+
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.phases = {}
+        self.nodes = {}
+        self.stack = []
+        self.started_tracing = False
+
+    def __call__(self, name, subject=None):
+        return _Measurement(self, name, subject)
+
+    def __enter__(self):
+        if self.memory:
+            import tracemalloc
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.started_tracing = True
+        add_hook(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        remove_hook(self)
+        if self.started_tracing:
+            import tracemalloc
+
+            tracemalloc.stop()
+            self.started_tracing = False
+        return False
+
+    def to_dict(self):
+        return {"phases": self.phases, "nodes": self.nodes}
+
+
+def merge_profiles(profiles):
+    total = {"phases": {}, "nodes": {}}
+    for profile in profiles:
+        for name, timing in profile["phases"].items():
+            entry = total["phases"].setdefault(name, {"calls": 0, "seconds": 0.0, "peak_bytes": 0})
+            entry["calls"] += timing["calls"]
+            entry["seconds"] += timing["seconds"]
+            entry["peak_bytes"] = max(entry["peak_bytes"], timing["peak_bytes"])
+        for name, count in profile["nodes"].items():
+            total["nodes"][name] = total["nodes"].get(name, 0) + count
+    return total
+
+
+def format_profile(profile):
+    lines = [f"{'phase':<12}{'calls':>7}{'seconds':>10}{'peak MiB':>10}"]
+    for name, timing in profile["phases"].items():
+        lines.append(f"{name:<12}{timing['calls']:>7}{timing['seconds']:>10.3f}"
+                     f"{timing['peak_bytes'] / 1024 / 1024:>10.1f}")
+    if profile["nodes"]:
+        lines.append(", ".join(f"{count} {name}" for name, count in profile["nodes"].items()))
+    return "\n".join(lines)
+
+
+def write_profile(profile, path):
+    import json
+
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(profile, file, indent=2)
+
+
+def profile_pipeline(source, memory=True):
+    # Every phase of loading a config and writing it both through ElementTree and with the streaming writer.
+    import io
+    from loader import load
+
+    with Profiler(memory) as profiler:
+        config = load(source)
+        config.write(io.BytesIO(), serializer="etree")
+        config.write(io.BytesIO(), serializer="string")
+    return profiler.to_dict()
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Profile loading and writing a network security config phase by "
+                                                 "phase.")
+    parser.add_argument("config", help="network_security_config.xml to profile")
+    parser.add_argument("-o", "--output", help="write the profile as JSON to this file")
+    parser.add_argument("--no-memory", action="store_true", help="skip memory tracing for undisturbed timings")
+    args = parser.parse_args(argv)
+
+    profile = profile_pipeline(args.config, memory=not args.no_memory)
+    print(format_profile(profile))
+    if args.output:
+        write_profile(profile, args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
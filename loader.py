@@ -0,0 +1,115 @@
+import xml.etree.ElementTree as Et
+
+from instrumentation import phase
+from model import NetworkSecConfig, BaseConfig, Certificates, DomainConfig, Domain, PinSet, Pin, TrustAnchors, \
+    DebugOverrides
+
+
+class LoadError(Exception):
+    pass
+
+
+def _flag(element, name, default=False):
+    value = element.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() == "true"
+
+
+def _text(element):
+    return (element.text or "").strip()
+
+
+def _start(element, parent, config, inheriting):
+    tag = element.tag
+    if tag == "network-security-config":
+        if config is not None:
+            raise LoadError("nested <network-security-config> element")
+        return NetworkSecConfig(_flag(element, "cleartextTrafficPermitted"))
+    if tag == "base-config" and isinstance(parent, NetworkSecConfig):
+        base_config = BaseConfig(_flag(element, "cleartextTrafficPermitted"))
+        parent.add_base_config(base_config)
+        return base_config
+    if tag == "domain-config" and isinstance(parent, (NetworkSecConfig, DomainConfig)):
+        # Without the attribute a domain-config inherits the setting of its parent or the base-config. The base-config
+        # may come after the domain-configs, so those inheriting its setting are left at None and collected until the
+        # end of the document.
+        inherited = parent.cleartext_traffic_permitted if isinstance(parent, DomainConfig) else None
+        domain_config = DomainConfig(_flag(element, "cleartextTrafficPermitted", inherited))
+        if domain_config.cleartext_traffic_permitted is None:
+            inheriting.append(domain_config)
+        parent.add_domain_config(domain_config)
+        return domain_config
+    if tag == "debug-overrides" and isinstance(parent, NetworkSecConfig):
+        overrides = DebugOverrides()
+        parent.add_debug_overrides(overrides)
+        return overrides
+    if tag == "trust-anchors":
+        if isinstance(parent, (BaseConfig, DebugOverrides)):
+            return parent.trust_anchor
+        if isinstance(parent, DomainConfig):
+            trust_anchors = TrustAnchors()
+            parent.add_trust_anchors(trust_anchors)
+            return trust_anchors
+    if tag == "pin-set" and isinstance(parent, DomainConfig):
+        pin_set = PinSet(expiration=element.get("expiration"))
+        parent.add_pin_set(pin_set)
+        return pin_set
+    if tag == "certificates" and isinstance(parent, TrustAnchors):
+        if "src" not in element.attrib:
+            raise LoadError("<certificates> without src attribute")
+        parent.add_certificate(Certificates(element.get("src"), _flag(element, "overridePins")))
+        return parent
+    if tag == "domain" and isinstance(parent, DomainConfig):
+        return parent
+    if tag == "pin" and isinstance(parent, PinSet):
+        return parent
+    raise LoadError(f"unexpected <{tag}> element inside {type(parent).__name__ if parent else 'document'}")
+
+
+def _end(element, parent):
+    if element.tag == "domain":
+        parent.add_domain(Domain(_text(element), _flag(element, "includeSubdomains")))
+    elif element.tag == "pin":
+        parent.add_pin(Pin(_text(element)))
+
+
+def _inherit_base_config(config, inheriting):
+    cleartext = config.base_config is not None and config.base_config.cleartext_traffic
+    for domain_config in inheriting:
+        domain_config.cleartext_traffic_permitted = cleartext
+
+
+def load(source):
+    with phase("load", source):
+        return _load(source)
+
+
+def _load(source):
+    config = None
+    nodes = []
+    elements = []
+    inheriting = []
+    try:
+        for event, element in Et.iterparse(source, events=("start", "end")):
+            if event == "start":
+                node = _start(element, nodes[-1] if nodes else None, config, inheriting)
+                if config is None:
+                    config = node
+                nodes.append(node)
+                elements.append(element)
+            else:
+                node = nodes.pop()
+                elements.pop()
+                _end(element, nodes[-1] if nodes else None)
+                if node is config:
+                    _inherit_base_config(config, inheriting)
+                element.clear()
+                # The finished element is always the last child of its parent, so dropping it keeps memory flat.
+                if elements:
+                    del elements[-1][-1]
+    except Et.ParseError as error:
+        raise LoadError(f"malformed XML: {error}") from error
+    if config is None:
+        raise LoadError("no <network-security-config> element found")
+    return config
@@ -0,0 +1,291 @@
+import argparse
+import json
+import sys
+
+from loader import load
+from model import NetworkSecConfig, BaseConfig, DomainConfig, Domain, PinSet, TrustAnchors, DebugOverrides
+from resolver import normalize_hostname
+
+
+class MergeConflict:
+
+    def __init__(self, kind, where, kept, discarded, kept_by, discarded_by):
+        self.kind = kind
+        self.where = where
+        self.kept = kept
+        self.discarded = discarded
+        self.kept_by = kept_by
+        self.discarded_by = discarded_by
+
+    def __str__(self):
+        return (f"{self.where} {self.kind}: kept {self.kept!r} from {self.kept_by}, "
+                f"discarded {self.discarded!r} from {self.discarded_by}")
+
+    def to_dict(self):
+        return {
+            "kind": self.kind,
+            "where": self.where,
+            "kept": self.kept,
+            "discarded": self.discarded,
+            "kept_by": self.kept_by,
+            "discarded_by": self.discarded_by,
+        }
+
+
+class MergeReport:
+
+    def __init__(self):
+        self.conflicts = []
+        self.fragments = 0
+        self.domains = 0
+        self.merged_domains = 0
+
+    def __str__(self):
+        return (f"Merged {self.fragments} configs: {self.domains} domains, {self.merged_domains} declared by more than "
+                f"one config, {len(self.conflicts)} conflicts")
+
+    def to_dict(self):
+        return {
+            "fragments": self.fragments,
+            "domains": self.domains,
+            "merged_domains": self.merged_domains,
+            "conflicts": [conflict.to_dict() for conflict in self.conflicts],
+        }
+
+
+def earliest_expiration(first, second):
+    # A pin-set without expiration never expires, dates are ISO formatted and compare as strings.
+    if first is None or second is None:
+        return first if second is None else second
+    return min(first, second)
+
+
+class _Target:
+    # A domain-config of the merged config together with the hash indexes used to merge more declarations into it.
+
+    def __init__(self, domain_config, source):
+        self.domain_config = domain_config
+        self.source = source
+        self.domains = {}
+        self.pins = set()
+        self.anchors = {}
+
+
+class Merger:
+    # Fragments are merged in priority order: whatever the first (highest priority) fragment declares wins a
+    # conflict, later fragments only add what is not declared yet.
+
+    def __init__(self):
+        self.config = NetworkSecConfig()
+        self.report = MergeReport()
+        self.targets = {}
+        self.root_source = None
+        self.base_config = None
+        self.debug_overrides = None
+
+    def conflict(self, kind, where, kept, discarded, kept_by, discarded_by):
+        self.report.conflicts.append(MergeConflict(kind, where, kept, discarded, kept_by, discarded_by))
+
+    def merge_certificates(self, target, certificates, where, source, anchors):
+        # Trust anchors are a union keyed by src, anchors maps each src to the certificate kept and its source.
+        for certificate in certificates:
+            existing = anchors.get(certificate.src)
+            if existing is None:
+                anchors[certificate.src] = (certificate, source)
+                target.add_certificate(certificate)
+            elif existing[0].override_pins != certificate.override_pins:
+                self.conflict("overridePins", f"{where} {certificate.src}", existing[0].override_pins,
+                              certificate.override_pins, existing[1], source)
+
+    def merge_anchors(self, target, trust_anchors, where, source):
+        if trust_anchors is None:
+            return
+        if target.domain_config.trust_anchors is None:
+            target.domain_config.trust_anchors = TrustAnchors()
+        self.merge_certificates(target.domain_config.trust_anchors, trust_anchors.certificates, where, source,
+                                target.anchors)
+
+    def merge_pin_set(self, target, pin_set):
+        if pin_set is None or not pin_set.pins:
+            return
+        merged = target.domain_config.pin_set
+        if merged is None:
+            merged = target.domain_config.pin_set = PinSet(expiration=pin_set.expiration)
+        else:
+            merged.expiration = earliest_expiration(merged.expiration, pin_set.expiration)
+        for pin in pin_set.pins:
+            if pin.pin not in target.pins:
+                target.pins.add(pin.pin)
+                merged.add_pin(pin)
+
+    def new_target(self, domain_config, parent, source):
+        merged = DomainConfig(domain_config.cleartext_traffic_permitted)
+        parent.add_domain_config(merged)
+        target = _Target(merged, source)
+        self.merge_pin_set(target, domain_config.pin_set)
+        self.merge_anchors(target, domain_config.trust_anchors, "domain-config", source)
+        return target
+
+    def widens(self, target, domain_config):
+        # Whether merging domain_config adds pins, an earlier expiration or trust anchors to target.
+        pin_set = domain_config.pin_set
+        if pin_set is not None and pin_set.pins:
+            merged = target.domain_config.pin_set
+            if (merged is None or any(pin.pin not in target.pins for pin in pin_set.pins)
+                    or earliest_expiration(merged.expiration, pin_set.expiration) != merged.expiration):
+                return True
+        trust_anchors = domain_config.trust_anchors
+        return trust_anchors is not None and (target.domain_config.trust_anchors is None or any(
+            certificate.src not in target.anchors for certificate in trust_anchors.certificates))
+
+    def split(self, target, hostnames):
+        # Moves hostnames out of target into a nested domain-config starting with target's settings, so that pins and
+        # trust anchors merged for them are not accepted by target's other hostnames as well.
+        merged = target.domain_config
+        split = DomainConfig(merged.cleartext_traffic_permitted)
+        split_target = _Target(split, target.source)
+        kept = []
+        for domain in merged.domains:
+            hostname = normalize_hostname(domain.domain)
+            if hostname in hostnames:
+                split.add_domain(domain)
+                split_target.domains[hostname] = target.domains.pop(hostname)
+                self.targets[hostname] = split_target
+            else:
+                kept.append(domain)
+        merged.domains = kept
+        if merged.pin_set is not None:
+            split.pin_set = PinSet(expiration=merged.pin_set.expiration)
+            split.pin_set.add_pins(merged.pin_set.pins)
+            split_target.pins = set(target.pins)
+        if merged.trust_anchors is not None:
+            split.trust_anchors = TrustAnchors()
+            for certificate in merged.trust_anchors.certificates:
+                split.trust_anchors.add_certificate(certificate)
+            split_target.anchors = dict(target.anchors)
+        merged.add_domain_config(split)
+        return split_target
+
+    def merge_into(self, target, domain_config, hostname, source, merge_settings=True):
+        merged = target.domain_config
+        if merged.cleartext_traffic_permitted != domain_config.cleartext_traffic_permitted:
+            self.conflict("cleartextTrafficPermitted", hostname, merged.cleartext_traffic_permitted,
+                          domain_config.cleartext_traffic_permitted, target.source, source)
+        if merge_settings:
+            self.merge_pin_set(target, domain_config.pin_set)
+            self.merge_anchors(target, domain_config.trust_anchors, hostname, source)
+        else:
+            pin_set = domain_config.pin_set
+            self.conflict("pin-set", hostname, sorted(target.pins),
+                          sorted(pin.pin for pin in pin_set.pins) if pin_set is not None else [], target.source,
+                          source)
+
+    def merge_domain_configs(self, domain_configs, source):
+        pending = [(domain_config, self.config) for domain_config in reversed(domain_configs)]
+        while pending:
+            domain_config, parent = pending.pop()
+            new_target = None
+            first_target = None
+            merged_into = set()
+            declared = None
+            for domain in domain_config.expanded_domains():
+                hostname = normalize_hostname(domain.domain)
+                self.report.domains += 1
+                target = self.targets.get(hostname)
+                if target is None:
+                    if new_target is None:
+                        new_target = self.new_target(domain_config, parent, source)
+                    target = self.targets[hostname] = new_target
+                    target.domain_config.add_domain(Domain(domain.domain, domain.include_subdomains))
+                    target.domains[hostname] = (domain, source)
+                else:
+                    self.report.merged_domains += 1
+                    existing = target.domains[hostname][0]
+                    if existing.include_subdomains != domain.include_subdomains:
+                        self.conflict("includeSubdomains", hostname, existing.include_subdomains,
+                                      domain.include_subdomains, target.domains[hostname][1], source)
+                    if id(target) not in merged_into and target is not new_target:
+                        merged_into.add(id(target))
+                        merge_settings = True
+                        if self.widens(target, domain_config):
+                            if declared is None:
+                                declared = {normalize_hostname(declared_domain.domain)
+                                            for declared_domain in domain_config.expanded_domains()}
+                            moved = {name for name in target.domains if name in declared}
+                            if len(moved) < len(target.domains):
+                                target = self.split(target, moved)
+                                merged_into.add(id(target))
+                            elif target.domain_config.domain_configs:
+                                # Splitting would leave target without domains, and its nested domain-configs
+                                # inherit its pins, so the higher priority settings are kept.
+                                merge_settings = False
+                        self.merge_into(target, domain_config, hostname, source, merge_settings)
+                first_target = first_target or target
+
+            # Nested domain-configs stay below the merged counterpart of their parent.
+            if first_target is None:
+                first_target = self.new_target(domain_config, parent, source)
+            for inner_domain_config in reversed(domain_config.domain_configs):
+                pending.append((inner_domain_config, first_target.domain_config))
+
+    def add(self, config, source):
+        self.report.fragments += 1
+        if self.root_source is None:
+            self.root_source = source
+            self.config.cleartext_traffic_permitted = config.cleartext_traffic_permitted
+        elif self.config.cleartext_traffic_permitted != config.cleartext_traffic_permitted:
+            self.conflict("cleartextTrafficPermitted", "network-security-config",
+                          self.config.cleartext_traffic_permitted, config.cleartext_traffic_permitted,
+                          self.root_source, source)
+
+        if config.base_config is not None:
+            if self.base_config is None:
+                self.base_config = (source, {})
+                self.config.add_base_config(BaseConfig(config.base_config.cleartext_traffic))
+            elif self.config.base_config.cleartext_traffic != config.base_config.cleartext_traffic:
+                self.conflict("cleartextTrafficPermitted", "base-config", self.config.base_config.cleartext_traffic,
+                              config.base_config.cleartext_traffic, self.base_config[0], source)
+            if config.base_config.trust_anchor is not None:
+                self.merge_certificates(self.config.base_config, config.base_config.trust_anchor.certificates,
+                                        "base-config", source, self.base_config[1])
+
+        if config.debug_overrides is not None:
+            if self.debug_overrides is None:
+                self.debug_overrides = {}
+                self.config.add_debug_overrides(DebugOverrides())
+            if config.debug_overrides.trust_anchor is not None:
+                self.merge_certificates(self.config.debug_overrides, config.debug_overrides.trust_anchor.certificates,
+                                        "debug-overrides", source, self.debug_overrides)
+
+        self.merge_domain_configs(config.domain_configs, source)
+
+
+def merge_configs(configs):
+    # configs: (source name, NetworkSecConfig) pairs, highest priority first. The inputs are not modified.
+    merger = Merger()
+    for source, config in configs:
+        merger.add(config, source)
+    return merger.config, merger.report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge network security configs contributed by several modules.")
+    parser.add_argument("configs", nargs="+", help="network_security_config.xml files, highest priority first")
+    parser.add_argument("-o", "--output", required=True, help="where to write the merged config")
+    parser.add_argument("--report", help="write the conflict report as JSON to this file")
+    parser.add_argument("--strict", action="store_true", help="exit with status 1 when there are conflicts")
+    args = parser.parse_args(argv)
+
+    config, report = merge_configs((path, load(path)) for path in args.configs)
+    config.write(args.output)
+    for conflict in report.conflicts:
+        print(f"CONFLICT {conflict}", file=sys.stderr)
+    print(report)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as file:
+            json.dump(report.to_dict(), file, indent=2)
+    return 1 if args.strict and report.conflicts else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
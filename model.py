@@ -1,7 +1,167 @@
-import xml.etree.cElementTree as Et
+import io
+import sys
+import weakref
+
+from instrumentation import phase
+from serializers import get_serializer, SerializerError
+
+
+class _LazyModule:
+    # Imports the module on first attribute access and rebinds the global name to it, so importing the model (and
+    # the CLIs built on it) does not pay for the XML and hashing machinery until a config is actually serialized.
+    def __init__(self, name, alias):
+        self._name = name
+        self._alias = alias
+
+    def __getattr__(self, attribute):
+        __import__(self._name)
+        module = sys.modules[self._name]
+        globals()[self._alias] = module
+        return getattr(module, attribute)
+
+
+Et = _LazyModule("xml.etree.ElementTree", "Et")
+hashlib = _LazyModule("hashlib", "hashlib")
+
+XML_DECLARATION = "<?xml version='1.0' encoding='utf-8'?>\n"
+
+
+def _start_tag(tag, attrib):
+    return "<" + tag + "".join(f' {key}="{Et._escape_attrib(value)}"' for key, value in attrib)
+
+
+def _element(tag, attrib, children, level):
+    # Mirrors Et.indent(space="\t") + ElementTree.write: children that yield nothing are skipped and an
+    # element without children is written as a short empty element.
+    start = _start_tag(tag, attrib)
+    indent = "\n" + "\t" * (level + 1)
+    empty = True
+    for child in children:
+        head = next(child, None)
+        if head is None:
+            continue
+        if empty:
+            yield start + ">"
+            empty = False
+        yield indent
+        yield head
+        yield from child
+    if empty:
+        yield start + " />"
+    else:
+        yield "\n" + "\t" * level + "</" + tag + ">"
+
+
+def _render(node, level):
+    return node.fragments(level)
+
+
+def _fragments(node, level):
+    # Same output as _element, but the subtree is walked with an explicit stack of nodes and closing tags instead of
+    # nested generators, so deeply nested domain-configs neither hit the recursion limit nor pay a frame per level.
+    # Nodes describe themselves through _parts(): (tag, attrib, text, children), children never render empty.
+    escape_attrib = Et._escape_attrib
+    escape_cdata = Et._escape_cdata
+    stack = [(node, level)]
+    pop = stack.pop
+    push = stack.append
+    while stack:
+        item = pop()
+        if item.__class__ is str:
+            yield item
+            continue
+        node, level = item
+        if node.__class__ is DomainPattern:
+            # Expanded one domain at a time, domains are leaves so nothing goes on the stack.
+            start = f'<domain includeSubdomains="{str(node.include_subdomains).lower()}">'
+            separator = "\n" + "\t" * level + start
+            for name in node.expand():
+                yield start + escape_cdata(name) + "</domain>"
+                start = separator
+            continue
+        tag, attrib, text, children = node._parts()
+        start = "<" + tag
+        for key, value in attrib:
+            start += " " + key + '="' + escape_attrib(value) + '"'
+        if text:
+            yield start + ">" + escape_cdata(text) + "</" + tag + ">"
+        elif not children:
+            yield start + " />"
+        else:
+            yield start + ">"
+            push("\n" + "\t" * level + "</" + tag + ">")
+            indent = "\n" + "\t" * (level + 1)
+            for child in reversed(children):
+                push((child, level + 1))
+                push(indent)
+
+
+def _pin_set_key(pin_set):
+    if pin_set is None or not pin_set.pins:
+        return None
+    return pin_set.expiration, tuple(pin.pin for pin in pin_set.pins)
+
+
+def _trust_anchors_key(trust_anchors):
+    if trust_anchors is None:
+        return None
+    return tuple((certificate.src, certificate.override_pins) for certificate in trust_anchors.certificates)
+
+
+def _compact_fragments(config):
+    # Like _fragments without indentation, and leaving out what Android fills in anyway: includeSubdomains="false",
+    # cleartextTrafficPermitted equal to the inherited value and pin-sets or trust-anchors equal to the ones a
+    # domain-config inherits. Inherited values are (cleartext, pin-set key, trust-anchors key) of the parent, the
+    # base-config for top-level domain-configs. A base-config without cleartextTrafficPermitted="true" leaves cleartext
+    # to the platform default (which depends on targetSdkVersion), so top-level domain-configs then always write it.
+    escape_attrib = Et._escape_attrib
+    escape_cdata = Et._escape_cdata
+    base_config = config.base_config
+    stack = [(config, (True if base_config is not None and base_config.cleartext_traffic else None, None,
+                       None if base_config is None else _trust_anchors_key(base_config.trust_anchor)))]
+    pop = stack.pop
+    push = stack.append
+    while stack:
+        item = pop()
+        if item.__class__ is str:
+            yield item
+            continue
+        node, inherited = item
+        if node.__class__ is DomainPattern:
+            start = '<domain includeSubdomains="true">' if node.include_subdomains else "<domain>"
+            for name in node.expand():
+                yield start + escape_cdata(name) + "</domain>"
+            continue
+        tag, attrib, text, children = node._parts()
+        if node.__class__ is DomainConfig:
+            pin_set_key = _pin_set_key(node.pin_set)
+            trust_anchors_key = _trust_anchors_key(node.trust_anchors)
+            if node.cleartext_traffic_permitted == inherited[0]:
+                attrib = ()
+            if pin_set_key is not None and pin_set_key == inherited[1]:
+                children = [child for child in children if child is not node.pin_set]
+            if trust_anchors_key is not None and trust_anchors_key == inherited[2]:
+                children = [child for child in children if child is not node.trust_anchors]
+            inherited = (node.cleartext_traffic_permitted, pin_set_key or inherited[1],
+                         inherited[2] if trust_anchors_key is None else trust_anchors_key)
+        elif node.__class__ is Domain and not node.include_subdomains:
+            attrib = ()
+        start = "<" + tag
+        for key, value in attrib:
+            start += " " + key + '="' + escape_attrib(value) + '"'
+        if text:
+            yield start + ">" + escape_cdata(text) + "</" + tag + ">"
+        elif not children:
+            yield start + "/>"
+        else:
+            yield start + ">"
+            push("</" + tag + ">")
+            for child in reversed(children):
+                push((child, inherited))
 
 
 class NetworkSecConfig:
+    __slots__ = ("cleartext_traffic_permitted", "base_config", "domain_configs", "debug_overrides")
 
     def __init__(self, cleartext_traffic_permitted=False):
         self.cleartext_traffic_permitted = cleartext_traffic_permitted
@@ -18,23 +178,81 @@ class NetworkSecConfig:
     def add_debug_overrides(self, overrides):
         self.debug_overrides = overrides
 
-    def collect(self):
+    def collect(self, validator=None, serializer=None):
+        with phase("collect", self):
+            return self._collect(validator, serializer)
+
+    def _collect(self, validator, serializer):
+        # An ElementTree tree unless a serializer that builds trees (such as "lxml") is given.
+        if serializer is None:
+            element = Et.Element
+        else:
+            serializer = get_serializer(serializer)
+            if not hasattr(serializer, "element"):
+                raise SerializerError(f"the {serializer.name} serializer does not build element trees")
+            element = serializer.element
         if self.cleartext_traffic_permitted:
-            root = Et.Element("network-security-config", cleartextTrafficPermitted="true")
+            root = element("network-security-config", cleartextTrafficPermitted="true")
         else:
-            root = Et.Element("network-security-config")
+            root = element("network-security-config")
 
         if self.base_config is not None:
-            self.base_config.collect(root)
-        for domain in self.domain_configs:
-            domain.collect(root)
+            self.base_config.collect(root, validator, "network-security-config/base-config", serializer)
+        for index, domain in enumerate(self.domain_configs):
+            domain.collect(root, validator, f"network-security-config/domain-config[{index}]", serializer)
         if self.debug_overrides is not None:
-            self.debug_overrides.collect(root)
+            self.debug_overrides.collect(root, validator, "network-security-config/debug-overrides", serializer)
+        if validator is not None:
+            validator.finish()
 
         return root
 
+    def children(self):
+        children = []
+        if self.base_config is not None:
+            children.append(self.base_config)
+        children.extend(self.domain_configs)
+        if self.debug_overrides is not None:
+            children.append(self.debug_overrides)
+        return children
+
+    def _parts(self):
+        attrib = [("cleartextTrafficPermitted", "true")] if self.cleartext_traffic_permitted else []
+        return "network-security-config", attrib, None, self.children()
+
+    def compact_fragments(self):
+        return _compact_fragments(self)
+
+    def fragments(self, level=0, render=_render):
+        attrib = [("cleartextTrafficPermitted", "true")] if self.cleartext_traffic_permitted else []
+        return _element("network-security-config", attrib, (render(child, level + 1) for child in self.children()),
+                        level)
+
+    def write(self, file, compact=False, serializer=None):
+        with phase("write", self):
+            self._write(file, compact, get_serializer(serializer))
+
+    def _write(self, file, compact, serializer):
+        if hasattr(file, "write"):
+            if isinstance(file, (io.RawIOBase, io.BufferedIOBase)):
+                file = io.TextIOWrapper(file, encoding="utf-8", errors="xmlcharrefreplace", write_through=True)
+                try:
+                    self._write_to(file, compact, serializer)
+                finally:
+                    file.detach()
+            else:
+                self._write_to(file, compact, serializer)
+        else:
+            with open(file, "w", encoding="utf-8", errors="xmlcharrefreplace") as stream:
+                self._write_to(stream, compact, serializer)
+
+    def _write_to(self, stream, compact=False, serializer=None):
+        stream.write(XML_DECLARATION)
+        get_serializer(serializer).write(self, stream, compact)
+
 
 class BaseConfig:
+    __slots__ = ("cleartext_traffic", "trust_anchor")
 
     def __init__(self, cleartext_traffic_permitted=False):
         self.cleartext_traffic = cleartext_traffic_permitted
@@ -43,29 +261,59 @@ class BaseConfig:
     def add_certificate(self, certificate):
         self.trust_anchor.add_certificate(certificate)
 
-    def collect(self, parent):
+    def collect(self, parent, validator=None, path="base-config", serializer=None):
+        sub_element = Et.SubElement if serializer is None else serializer.sub_element
         if self.cleartext_traffic:
-            base_config = Et.SubElement(parent, "base-config", cleartextTrafficPermitted="true")
+            base_config = sub_element(parent, "base-config", cleartextTrafficPermitted="true")
         else:
-            base_config = Et.SubElement(parent, "base-config")
-        self.trust_anchor.collect(base_config)
+            base_config = sub_element(parent, "base-config")
+        self.trust_anchor.collect(base_config, validator, (path, "trust-anchors") if validator is not None else None,
+                                  serializer)
         return base_config
 
+    def fragments(self, level):
+        return _fragments(self, level)
+
+    def _parts(self):
+        attrib = [("cleartextTrafficPermitted", "true")] if self.cleartext_traffic else []
+        return "base-config", attrib, None, [self.trust_anchor]
+
+    def content_hash(self):
+        digest = hashlib.sha256(repr(("base-config", self.cleartext_traffic)).encode("utf-8"))
+        digest.update(self.trust_anchor.content_hash().encode("ascii"))
+        return digest.hexdigest()
+
 
 class DebugOverrides:
+    __slots__ = ("trust_anchor",)
+
     def __init__(self):
         self.trust_anchor = TrustAnchors()
 
     def add_certificate(self, certificate):
         self.trust_anchor.add_certificate(certificate)
 
-    def collect(self, parent):
-        debug_overrides = Et.SubElement(parent, "debug-overrides")
-        self.trust_anchor.collect(debug_overrides)
+    def collect(self, parent, validator=None, path="debug-overrides", serializer=None):
+        sub_element = Et.SubElement if serializer is None else serializer.sub_element
+        debug_overrides = sub_element(parent, "debug-overrides")
+        self.trust_anchor.collect(debug_overrides, validator,
+                                  (path, "trust-anchors") if validator is not None else None, serializer)
         return debug_overrides
 
+    def fragments(self, level):
+        return _fragments(self, level)
+
+    def _parts(self):
+        return "debug-overrides", (), None, [self.trust_anchor]
+
+    def content_hash(self):
+        digest = hashlib.sha256(b"debug-overrides")
+        digest.update(self.trust_anchor.content_hash().encode("ascii"))
+        return digest.hexdigest()
+
 
 class DomainConfig:
+    __slots__ = ("cleartext_traffic_permitted", "domains", "trust_anchors", "pin_set", "domain_configs")
 
     def __init__(self, cleartext_traffic_permitted=False):
         self.cleartext_traffic_permitted = cleartext_traffic_permitted
@@ -77,6 +325,20 @@ class DomainConfig:
     def add_domain(self, domain):
         self.domains.append(domain)
 
+    def add_domains(self, domains):
+        self.domains.extend(domains)
+
+    def expanded_domains(self):
+        # The domains as written, with patterns expanded lazily.
+        for domain in self.domains:
+            if domain.__class__ is DomainPattern:
+                yield from domain.domains()
+            else:
+                yield domain
+
+    def domain_count(self):
+        return sum(len(domain) if domain.__class__ is DomainPattern else 1 for domain in self.domains)
+
     def add_trust_anchors(self, trust_anchors):
         self.trust_anchors = trust_anchors
 
@@ -86,25 +348,78 @@ class DomainConfig:
     def add_domain_config(self, domain_config):
         self.domain_configs.append(domain_config)
 
-    def collect(self, parent):
-        domain_config = Et.SubElement(parent, "domain-config",
-                                      cleartextTrafficPermitted=f"{str(self.cleartext_traffic_permitted).lower()}")
+    def collect(self, parent, validator=None, path="domain-config", serializer=None):
+        # Nested domain-configs are collected with an explicit stack in the same order as a recursive walk.
+        # Validation paths are (parent path, segment) pairs, only built when validating.
+        sub_element = Et.SubElement if serializer is None else serializer.sub_element
+        root = None
+        pending = [(self, parent, path)]
+        while pending:
+            config, parent, path = pending.pop()
+            if validator is not None:
+                validator.check_domain_config(config, path)
+            domain_config = sub_element(parent, "domain-config",
+                                        cleartextTrafficPermitted=str(config.cleartext_traffic_permitted).lower())
+            if root is None:
+                root = domain_config
+
+            for domain in config.domains:
+                domain.collect(domain_config, serializer)
+
+            if config.pin_set is not None:
+                config.pin_set.collect(domain_config, validator, (path, "pin-set") if validator is not None else None,
+                                       serializer)
+            if config.trust_anchors is not None:
+                config.trust_anchors.collect(domain_config, validator,
+                                             (path, "trust-anchors") if validator is not None else None, serializer)
+
+            for index in range(len(config.domain_configs) - 1, -1, -1):
+                pending.append((config.domain_configs[index], domain_config,
+                                (path, f"domain-config[{index}]") if validator is not None else None))
 
-        for domain in self.domains:
-            domain.collect(domain_config)
-
-        if self.pin_set is not None:
-            self.pin_set.collect(domain_config)
-        if self.trust_anchors is not None:
-            self.trust_anchors.collect(domain_config)
+        return root
 
-        for inner_domain_config in self.domain_configs:
-            inner_domain_config.collect(domain_config)
+    def fragments(self, level):
+        return _fragments(self, level)
 
-        return domain_config
+    def _parts(self):
+        children = list(self.domains)
+        if self.pin_set is not None and self.pin_set.pins:
+            children.append(self.pin_set)
+        if self.trust_anchors is not None:
+            children.append(self.trust_anchors)
+        children.extend(self.domain_configs)
+        return ("domain-config", [("cleartextTrafficPermitted", f"{str(self.cleartext_traffic_permitted).lower()}")],
+                None, children)
+
+    def content_hash(self):
+        # Inner domain-configs are hashed first (post-order) with an explicit stack instead of recursion.
+        hashes = {}
+        pending = [(self, False)]
+        while pending:
+            config, expanded = pending.pop()
+            if not expanded:
+                pending.append((config, True))
+                pending.extend((inner_domain_config, False) for inner_domain_config in config.domain_configs)
+                continue
+            digest = hashlib.sha256(repr(("domain-config", config.cleartext_traffic_permitted)).encode("utf-8"))
+            for domain in config.domains:
+                if domain.__class__ is DomainPattern:
+                    digest.update(repr(("pattern", domain.pattern, domain.include_subdomains)).encode("utf-8"))
+                else:
+                    digest.update(repr((domain.domain, domain.include_subdomains)).encode("utf-8"))
+            if config.pin_set is not None:
+                digest.update(config.pin_set.content_hash().encode("ascii"))
+            if config.trust_anchors is not None:
+                digest.update(config.trust_anchors.content_hash().encode("ascii"))
+            for inner_domain_config in config.domain_configs:
+                digest.update(hashes[id(inner_domain_config)].encode("ascii"))
+            hashes[id(config)] = digest.hexdigest()
+        return hashes[id(self)]
 
 
 class PinSet:
+    __slots__ = ("pins", "expiration")
 
     def __init__(self, expiration=None):
         self.pins = []
@@ -113,32 +428,145 @@ class PinSet:
     def add_pin(self, pin):
         self.pins.append(pin)
 
-    def collect(self, parent):
+    def add_pins(self, pins):
+        self.pins.extend(pins)
+
+    def collect(self, parent, validator=None, path="pin-set", serializer=None):
         if not self.pins:
             return None
+        if validator is not None:
+            validator.check_pin_set(self, path)
 
+        sub_element = Et.SubElement if serializer is None else serializer.sub_element
         if self.expiration is None:
-            pin_set = Et.SubElement(parent, "pin-set")
+            pin_set = sub_element(parent, "pin-set")
         else:
-            pin_set = Et.SubElement(parent, "pin-set", expiration=f"{self.expiration}")
+            pin_set = sub_element(parent, "pin-set", expiration=f"{self.expiration}")
         for pin in self.pins:
-            pin.collect(pin_set)
+            pin.collect(pin_set, serializer)
         return pin_set
 
+    def fragments(self, level):
+        if not self.pins:
+            return iter(())
+        return _fragments(self, level)
+
+    def _parts(self):
+        attrib = () if self.expiration is None else [("expiration", f"{self.expiration}")]
+        return "pin-set", attrib, None, self.pins
+
+    def content_hash(self):
+        digest = hashlib.sha256(repr(("pin-set", self.expiration)).encode("utf-8"))
+        for pin in self.pins:
+            digest.update(repr(pin.pin).encode("utf-8"))
+        return digest.hexdigest()
+
 
 class Domain:
+    __slots__ = ("domain", "include_subdomains")
 
     def __init__(self, domain, include_subdomains):
         self.domain = domain
         self.include_subdomains = include_subdomains
 
-    def collect(self, parent):
-        domain = Et.SubElement(parent, "domain",
-                               includeSubdomains=f"{str(self.include_subdomains).lower()}").text = f"{self.domain}"
+    def collect(self, parent, serializer=None):
+        sub_element = Et.SubElement if serializer is None else serializer.sub_element
+        domain = sub_element(parent, "domain",
+                             includeSubdomains=f"{str(self.include_subdomains).lower()}").text = f"{self.domain}"
         return domain
 
+    def fragments(self, level):
+        return _fragments(self, level)
+
+    def _parts(self):
+        return "domain", [("includeSubdomains", f"{str(self.include_subdomains).lower()}")], f"{self.domain}", ()
+
+
+def _is_integer(text):
+    return (text[1:] if text.startswith("-") else text).isdecimal()
+
+
+class DomainPattern:
+    __slots__ = ("pattern", "include_subdomains", "groups")
+
+    # Stands for all domains matching a brace pattern such as "edge{1..2000}.cdn.example.com" (numeric range,
+    # "{01..16}" keeps the zero padding) or "api.{eu,us,ap}.example.com" (list). Several groups expand to every
+    # combination with the first group varying slowest. Only the pattern is stored, domains are generated on demand.
+    def __init__(self, pattern, include_subdomains=True):
+        self.pattern = pattern
+        self.include_subdomains = include_subdomains
+        self.groups = []
+        # Groups are the innermost {...} without braces inside, other braces are literal text. Plain string searches,
+        # importing re would double the import time of the model.
+        position = search = 0
+        while True:
+            end = pattern.find("}", search)
+            if end < 0:
+                break
+            start = pattern.rfind("{", position, end)
+            search = end + 1
+            if start < 0:
+                continue
+            if start > position:
+                self.groups.append([pattern[position:start]])
+            position = search
+            body = pattern[start + 1:end]
+            first, separator, last = body.partition("..")
+            if separator and _is_integer(first) and _is_integer(last):
+                width = len(first) if first.lstrip("-").startswith("0") and len(first) > 1 else 0
+                step = 1 if int(last) >= int(first) else -1
+                self.groups.append((range(int(first), int(last) + step, step), width))
+            elif "," in body:
+                self.groups.append(body.split(","))
+            else:
+                raise ValueError(f"invalid domain pattern group {{{body}}} in {pattern!r}")
+        if position < len(pattern) or not self.groups:
+            self.groups.append([pattern[position:]])
+
+    def __len__(self):
+        count = 1
+        for group in self.groups:
+            count *= len(group[0]) if group.__class__ is tuple else len(group)
+        return count
+
+    def expand(self):
+        # Odometer over the groups, so not even a single group is materialized.
+        groups = self.groups
+        sizes = [len(group[0]) if group.__class__ is tuple else len(group) for group in groups]
+        indexes = [0] * len(groups)
+        while True:
+            name = ""
+            for group, index in zip(groups, indexes):
+                if group.__class__ is tuple:
+                    numbers, width = group
+                    name += f"{numbers[index]:0{width}d}" if width else f"{numbers[index]}"
+                else:
+                    name += group[index]
+            yield name
+            position = len(indexes) - 1
+            while position >= 0:
+                indexes[position] += 1
+                if indexes[position] < sizes[position]:
+                    break
+                indexes[position] = 0
+                position -= 1
+            if position < 0:
+                return
+
+    def domains(self):
+        include_subdomains = self.include_subdomains
+        return (Domain(name, include_subdomains) for name in self.expand())
+
+    def collect(self, parent, serializer=None):
+        for domain in self.domains():
+            domain.collect(parent, serializer)
+
+    def fragments(self, level):
+        return _fragments(self, level)
+
 
 class TrustAnchors:
+    __slots__ = ("certificates",)
 
     def __init__(self):
         self.certificates = []
@@ -146,34 +574,94 @@ class TrustAnchors:
     def add_certificate(self, certificate):
         self.certificates.append(certificate)
 
-    def collect(self, parent):
-        anchors = Et.SubElement(parent, "trust-anchors")
+    def collect(self, parent, validator=None, path="trust-anchors", serializer=None):
+        if validator is not None:
+            validator.check_trust_anchors(self, path)
+        anchors = (Et.SubElement if serializer is None else serializer.sub_element)(parent, "trust-anchors")
         for cert in self.certificates:
-            cert.collect(anchors)
+            cert.collect(anchors, serializer)
         return anchors
 
+    def fragments(self, level):
+        return _fragments(self, level)
+
+    def _parts(self):
+        return "trust-anchors", (), None, self.certificates
+
+    def content_hash(self):
+        digest = hashlib.sha256(b"trust-anchors")
+        for cert in self.certificates:
+            digest.update(repr((cert.src, cert.override_pins)).encode("utf-8"))
+        return digest.hexdigest()
+
 
 class Certificates:
+    __slots__ = ("src", "override_pins", "__weakref__")
+    _interned = weakref.WeakValueDictionary()
+
+    # Certificates are shared flyweights: identical values return the same instance and must not be mutated.
+    def __new__(cls, src, override_pins=False):
+        key = (src, override_pins)
+        certificates = cls._interned.get(key)
+        if certificates is None:
+            certificates = super().__new__(cls)
+            certificates.src = src
+            certificates.override_pins = override_pins
+            cls._interned[key] = certificates
+        return certificates
 
     def __init__(self, src, override_pins=False):
-        self.src = src
-        self.override_pins = override_pins
+        pass
+
+    def __getnewargs__(self):
+        return self.src, self.override_pins
 
-    def collect(self, parent):
+    def collect(self, parent, serializer=None):
+        sub_element = Et.SubElement if serializer is None else serializer.sub_element
         if self.override_pins:
-            certificates = Et.SubElement(parent, "certificates", src=f"{self.src}",
-                                         overridePins=f"{str(self.override_pins).lower()}")
+            certificates = sub_element(parent, "certificates", src=f"{self.src}",
+                                       overridePins=f"{str(self.override_pins).lower()}")
         else:
-            certificates = Et.SubElement(parent, "certificates", src=f"{self.src}")
+            certificates = sub_element(parent, "certificates", src=f"{self.src}")
         return certificates
 
+    def fragments(self, level):
+        return _fragments(self, level)
+
+    def _parts(self):
+        attrib = [("src", f"{self.src}")]
+        if self.override_pins:
+            attrib.append(("overridePins", f"{str(self.override_pins).lower()}"))
+        return "certificates", attrib, None, ()
+
 
 class Pin:
+    __slots__ = ("pin", "__weakref__")
+    _interned = weakref.WeakValueDictionary()
+    digest = "SHA-256"
+
+    # Pins are shared flyweights: identical values return the same instance and must not be mutated.
+    def __new__(cls, pin):
+        instance = cls._interned.get(pin)
+        if instance is None:
+            instance = super().__new__(cls)
+            instance.pin = pin
+            cls._interned[pin] = instance
+        return instance
 
     def __init__(self, pin):
-        self.pin = pin
-        self.digest = "SHA-256"
+        pass
 
-    def collect(self, parent):
-        pin = Et.SubElement(parent, "pin", digest=f"{self.digest}").text = f"{self.pin}"
+    def __getnewargs__(self):
+        return self.pin,
+
+    def collect(self, parent, serializer=None):
+        sub_element = Et.SubElement if serializer is None else serializer.sub_element
+        pin = sub_element(parent, "pin", digest=f"{self.digest}").text = f"{self.pin}"
         return pin
+
+    def fragments(self, level):
+        return _fragments(self, level)
+
+    def _parts(self):
+        return "pin", [("digest", f"{self.digest}")], f"{self.pin}", ()
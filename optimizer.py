@@ -0,0 +1,133 @@
+import argparse
+from collections import Counter
+
+from loader import load
+from model import DomainPattern
+from resolver import DomainIndex, walk_effective_configs, normalize_hostname, pin_set_key, trust_anchors_key
+
+
+class OptimizationReport:
+
+    def __init__(self, domains_removed=0, domain_configs_merged=0, domain_configs_removed=0, bytes_before=0,
+                 bytes_after=0):
+        self.domains_removed = domains_removed
+        self.domain_configs_merged = domain_configs_merged
+        self.domain_configs_removed = domain_configs_removed
+        self.bytes_before = bytes_before
+        self.bytes_after = bytes_after
+
+    def __str__(self):
+        saved = self.bytes_before - self.bytes_after
+        ratio = saved / self.bytes_before * 100 if self.bytes_before else 0.0
+        return (f"Removed {self.domains_removed} redundant domains, merged {self.domain_configs_merged} and removed "
+                f"{self.domain_configs_removed} empty domain configs: {self.bytes_before} -> {self.bytes_after} bytes "
+                f"({ratio:.1f}% smaller)")
+
+
+def serialized_size(config):
+    return sum(len(fragment.encode("utf-8")) for fragment in config.fragments())
+
+
+def all_domain_configs(config):
+    pending = list(reversed(config.domain_configs))
+    while pending:
+        domain_config = pending.pop()
+        yield domain_config
+        pending.extend(reversed(domain_config.domain_configs))
+
+
+def remove_redundant_domains(config):
+    index = DomainIndex(config)
+    effectives = list(walk_effective_configs(config))
+    keys = {id(None): index.fallback.key()}
+    keys.update((id(effective.domain_config), effective.key()) for effective in effectives)
+    occurrences = Counter(normalize_hostname(domain.domain)
+                          for effective in effectives for domain in effective.domain_config.expanded_domains())
+
+    # base-config only writes cleartextTrafficPermitted when it is true. Otherwise the platform default applies
+    # (true up to targetSdkVersion 27), so a domain left to base-config or the root could change its cleartext policy.
+    fallback_defined = config.base_config is not None and config.base_config.cleartext_traffic
+
+    removed = 0
+    for effective in effectives:
+        domain_config = effective.domain_config
+        key = keys[id(domain_config)]
+        kept = []
+        for domain in domain_config.domains:
+            # Patterns are kept whole, they cost one entry in the model however many hosts they cover.
+            if domain.__class__ is DomainPattern:
+                kept.append(domain)
+                continue
+            hostname = normalize_hostname(domain.domain)
+            # A domain is redundant when removing it hands its hosts to an entry with the same effective settings.
+            covering = index.resolve_parent(hostname).domain_config
+            if (occurrences[hostname] == 1 and (covering is not None or fallback_defined)
+                    and keys[id(covering)] == key):
+                removed += 1
+            else:
+                kept.append(domain)
+        if not kept and domain_config.domain_configs:
+            # Android rejects a domain-config without domains, and its nested domain-configs inherit its settings,
+            # so one of its (covered) domains stays.
+            kept.append(domain_config.domains[0])
+            removed -= 1
+        if len(kept) != len(domain_config.domains):
+            domain_config.domains = kept
+    return removed
+
+
+def merge_domain_configs(domain_configs):
+    merged = []
+    targets = {}
+    merged_count = 0
+    removed_count = 0
+    for domain_config in domain_configs:
+        if domain_config.domain_configs:
+            merged.append(domain_config)
+            continue
+        if not domain_config.domains:
+            removed_count += 1
+            continue
+        key = (domain_config.cleartext_traffic_permitted, pin_set_key(domain_config.pin_set),
+               trust_anchors_key(domain_config.trust_anchors))
+        target = targets.get(key)
+        if target is None:
+            targets[key] = domain_config
+            merged.append(domain_config)
+        else:
+            target.domains.extend(domain_config.domains)
+            merged_count += 1
+    return merged, merged_count, removed_count
+
+
+def optimize(config):
+    report = OptimizationReport(bytes_before=serialized_size(config))
+    report.domains_removed = remove_redundant_domains(config)
+
+    # Children are merged before their parents so that parents left without children can be merged too.
+    for domain_config in reversed(list(all_domain_configs(config))):
+        domain_config.domain_configs, merged_count, removed_count = merge_domain_configs(domain_config.domain_configs)
+        report.domain_configs_merged += merged_count
+        report.domain_configs_removed += removed_count
+    config.domain_configs, merged_count, removed_count = merge_domain_configs(config.domain_configs)
+    report.domain_configs_merged += merged_count
+    report.domain_configs_removed += removed_count
+
+    report.bytes_after = serialized_size(config)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Remove redundant domains and merge identical domain configs.")
+    parser.add_argument("config", help="network_security_config.xml to optimize")
+    parser.add_argument("-o", "--output", help="where to write the optimized config (default: in place)")
+    args = parser.parse_args(argv)
+
+    config = load(args.config)
+    report = optimize(config)
+    config.write(args.output or args.config)
+    print(report)
+
+
+if __name__ == '__main__':
+    main()
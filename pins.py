@@ -0,0 +1,225 @@
+import argparse
+import base64
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from model import Pin, PinSet
+
+CERTIFICATE_EXTENSIONS = (".pem", ".crt", ".cer", ".der")
+PLATFORM_SOURCES = ("system", "user")
+CACHE_FILE = "pins.json"
+MEMORY_CACHE_LIMIT = 10_000
+
+_PEM_BEGIN = b"-----BEGIN CERTIFICATE-----"
+_PEM_END = b"-----END CERTIFICATE-----"
+
+
+class PinError(Exception):
+    pass
+
+
+def _read_tlv(data, offset):
+    if offset + 2 > len(data):
+        raise PinError("truncated DER structure")
+    tag = data[offset]
+    length = data[offset + 1]
+    header = 2
+    if length & 0x80:
+        size = length & 0x7F
+        if size == 0 or offset + 2 + size > len(data):
+            raise PinError("unsupported DER length")
+        length = int.from_bytes(data[offset + 2:offset + 2 + size], "big")
+        header += size
+    end = offset + header + length
+    if end > len(data):
+        raise PinError("truncated DER structure")
+    return tag, offset + header, end
+
+
+def extract_spki(certificate_der):
+    tag, certificate_start, _ = _read_tlv(certificate_der, 0)
+    if tag != 0x30:
+        raise PinError("certificate is not a DER SEQUENCE")
+    tag, offset, _ = _read_tlv(certificate_der, certificate_start)
+    if tag != 0x30:
+        raise PinError("tbsCertificate is not a DER SEQUENCE")
+    tag, _, end = _read_tlv(certificate_der, offset)
+    if tag == 0xA0:
+        offset = end
+    # serialNumber, signature, issuer, validity and subject precede subjectPublicKeyInfo.
+    for _ in range(5):
+        _, _, offset = _read_tlv(certificate_der, offset)
+    tag, _, end = _read_tlv(certificate_der, offset)
+    if tag != 0x30:
+        raise PinError("subjectPublicKeyInfo is not a DER SEQUENCE")
+    return certificate_der[offset:end]
+
+
+def spki_pin(certificate_der):
+    return base64.b64encode(hashlib.sha256(extract_spki(certificate_der)).digest()).decode("ascii")
+
+
+def pem_blocks(data):
+    # The base64 bodies of the PEM certificates in data. Plain searches, a lazy DOTALL regex costs a third of the
+    # time of pinning a recorded chain.
+    blocks = []
+    start = data.find(_PEM_BEGIN)
+    while start >= 0:
+        end = data.find(_PEM_END, start)
+        if end < 0:
+            break
+        blocks.append(data[start + len(_PEM_BEGIN):end])
+        start = data.find(_PEM_BEGIN, end)
+    return blocks
+
+
+def decode_pem_block(block):
+    return base64.b64decode(b"".join(block.split()))
+
+
+def certificates_in(data):
+    blocks = pem_blocks(data)
+    if blocks:
+        return [decode_pem_block(block) for block in blocks]
+    return [data]
+
+
+def file_pins(path):
+    with open(path, "rb") as file:
+        data = file.read()
+    try:
+        pins = [spki_pin(certificate) for certificate in certificates_in(data)]
+    except (PinError, ValueError) as error:
+        raise PinError(f"{path}: {error}") from error
+    return hashlib.sha256(data).hexdigest(), pins
+
+
+def content_hash(path):
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def resolve_source(source, raw_dir=None):
+    if source in PLATFORM_SOURCES:
+        return []
+    if source.startswith("@raw/"):
+        if raw_dir is None:
+            raise PinError(f"{source}: no res/raw directory given")
+        name = source[len("@raw/"):]
+        matches = [os.path.join(raw_dir, file) for file in sorted(os.listdir(raw_dir))
+                   if os.path.splitext(file)[0] == name]
+        if not matches:
+            raise PinError(f"{source}: no matching file in {raw_dir}")
+        return matches[:1]
+    if os.path.isdir(source):
+        paths = []
+        for directory, _, files in os.walk(source):
+            paths.extend(os.path.join(directory, file) for file in files
+                         if os.path.splitext(file)[1].lower() in CERTIFICATE_EXTENSIONS)
+        return sorted(paths)
+    return [source]
+
+
+class PinCache:
+    # Pins keyed by the SHA-256 of the certificate file, so a file replaced in place is never answered from the cache
+    # and identical certificates at different paths are parsed once.
+
+    def __init__(self, directory=None, limit=None):
+        self.directory = directory
+        self.limit = limit
+        self.pins = {}
+        # The process-wide cache is shared by the daemon's request threads.
+        self.lock = threading.Lock()
+        if directory is not None and os.path.exists(os.path.join(directory, CACHE_FILE)):
+            with open(os.path.join(directory, CACHE_FILE), "r", encoding="utf-8") as file:
+                self.pins = json.load(file).get("pins", {})
+
+    def lookup(self, path):
+        return self.get(content_hash(path))
+
+    def get(self, digest):
+        with self.lock:
+            return self.pins.get(digest)
+
+    def store(self, digest, pins):
+        with self.lock:
+            if self.limit is not None and len(self.pins) >= self.limit:
+                # Long-running processes keep at most `limit` certificates in memory, the oldest are dropped first.
+                del self.pins[next(iter(self.pins))]
+            self.pins[digest] = pins
+
+    def save(self):
+        if self.directory is None:
+            return
+        import tempfile
+
+        os.makedirs(self.directory, exist_ok=True)
+        # A temporary file of its own, batch workers, the daemon and watch may share the cache directory.
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=self.directory, prefix=CACHE_FILE,
+                                         suffix=".tmp", delete=False) as file:
+            with self.lock:
+                json.dump({"pins": self.pins}, file)
+        os.replace(file.name, os.path.join(self.directory, CACHE_FILE))
+
+
+_memory_cache = PinCache(limit=MEMORY_CACHE_LIMIT)
+
+
+def _compute(paths, workers):
+    if workers == 1 or len(paths) <= 1:
+        yield from map(file_pins, paths)
+        return
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        yield from executor.map(file_pins, paths, chunksize=max(1, len(paths) // 256))
+
+
+def compute_pins(sources, raw_dir=None, cache_dir=None, workers=None):
+    # Without a cache directory the pins of the last MEMORY_CACHE_LIMIT certificates are remembered for the life of
+    # the process, which keeps long-running processes such as the daemon warm. Every file is read and hashed, only
+    # certificates not seen before are parsed.
+    cache = _memory_cache if cache_dir is None else PinCache(cache_dir)
+    paths = list(dict.fromkeys(path for source in sources for path in resolve_source(source, raw_dir)))
+
+    hashes = {path: content_hash(path) for path in paths}
+    results = {}
+    misses = {}
+    for path, digest in hashes.items():
+        pins = cache.get(digest)
+        if pins is None:
+            misses.setdefault(digest, path)
+        else:
+            results[digest] = pins
+
+    # A file replaced between hashing and parsing is cached under the hash of the content that was parsed.
+    for digest, (parsed_digest, pins) in zip(misses, _compute(list(misses.values()), workers)):
+        cache.store(parsed_digest, pins)
+        results[digest] = pins
+    if misses:
+        cache.save()
+
+    return [Pin(pin) for pin in dict.fromkeys(pin for path in paths for pin in results[hashes[path]])]
+
+
+def compute_pin_set(sources, expiration=None, raw_dir=None, cache_dir=None, workers=None):
+    pin_set = PinSet(expiration=expiration)
+    pin_set.add_pins(compute_pins(sources, raw_dir, cache_dir, workers))
+    return pin_set
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute SPKI SHA-256 pins from certificate files.")
+    parser.add_argument("sources", nargs="+", help="PEM/DER files, directories or @raw/... resources")
+    parser.add_argument("--raw-dir", help="Android res/raw directory used to resolve @raw/... sources")
+    parser.add_argument("--cache-dir", help="directory for the on-disk pin cache")
+    parser.add_argument("-j", "--workers", type=int, help="number of worker processes (default: one per core)")
+    args = parser.parse_args(argv)
+
+    for pin in compute_pins(args.sources, args.raw_dir, args.cache_dir, args.workers):
+        print(pin.pin)
+
+
+if __name__ == '__main__':
+    main()
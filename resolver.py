@@ -0,0 +1,148 @@
+import argparse
+import sys
+
+from loader import load
+
+
+class EffectiveConfig:
+
+    def __init__(self, domain_config, cleartext_traffic_permitted, pin_set, trust_anchors, domain=None):
+        self.domain_config = domain_config
+        self.cleartext_traffic_permitted = cleartext_traffic_permitted
+        self.pin_set = pin_set
+        self.trust_anchors = trust_anchors
+        self.domain = domain
+
+    def key(self):
+        return self.cleartext_traffic_permitted, pin_set_key(self.pin_set), trust_anchors_key(self.trust_anchors)
+
+    def with_domain(self, domain):
+        return EffectiveConfig(self.domain_config, self.cleartext_traffic_permitted, self.pin_set,
+                               self.trust_anchors, domain)
+
+
+class _Node:
+    __slots__ = ("children", "exact", "subdomains")
+
+    def __init__(self):
+        self.children = {}
+        self.exact = None
+        self.subdomains = None
+
+
+def pin_set_key(pin_set):
+    if pin_set is None or not pin_set.pins:
+        return None
+    return pin_set.expiration, tuple(sorted({pin.pin for pin in pin_set.pins}))
+
+
+def trust_anchors_key(trust_anchors):
+    if trust_anchors is None:
+        return None
+    return tuple(sorted({(certificate.src, certificate.override_pins) for certificate in trust_anchors.certificates}))
+
+
+def normalize_hostname(hostname):
+    return hostname.strip().rstrip(".").lower()
+
+
+def base_effective_config(config):
+    if config.base_config is not None:
+        return EffectiveConfig(None, config.base_config.cleartext_traffic, None, config.base_config.trust_anchor)
+    return EffectiveConfig(None, config.cleartext_traffic_permitted, None, None)
+
+
+def walk_effective_configs(config):
+    base = base_effective_config(config)
+    pending = [(domain_config, base) for domain_config in reversed(config.domain_configs)]
+    while pending:
+        domain_config, parent = pending.pop()
+        effective = EffectiveConfig(domain_config,
+                                    domain_config.cleartext_traffic_permitted,
+                                    domain_config.pin_set if pin_set_key(domain_config.pin_set) is not None
+                                    else parent.pin_set,
+                                    domain_config.trust_anchors if domain_config.trust_anchors is not None
+                                    else parent.trust_anchors)
+        yield effective
+        pending.extend((inner, effective) for inner in reversed(domain_config.domain_configs))
+
+
+class DomainIndex:
+
+    def __init__(self, config):
+        self.fallback = base_effective_config(config)
+        self._root = _Node()
+        for effective in walk_effective_configs(config):
+            for domain in effective.domain_config.expanded_domains():
+                self._insert(domain, effective.with_domain(domain))
+
+    def _insert(self, domain, effective):
+        node = self._root
+        for label in reversed(normalize_hostname(domain.domain).split(".")):
+            child = node.children.get(label)
+            if child is None:
+                child = node.children[label] = _Node()
+            node = child
+        # Android rejects duplicate domains, the first declaration is kept here.
+        if node.exact is None:
+            node.exact = effective
+        if domain.include_subdomains and node.subdomains is None:
+            node.subdomains = effective
+
+    def resolve(self, hostname):
+        node = self._root
+        match = self.fallback
+        for label in reversed(normalize_hostname(hostname).split(".")):
+            node = node.children.get(label)
+            if node is None:
+                return match
+            if node.subdomains is not None:
+                match = node.subdomains
+        return node.exact if node.exact is not None else match
+
+    def resolve_parent(self, hostname):
+        node = self._root
+        match = self.fallback
+        labels = normalize_hostname(hostname).split(".")
+        for label in reversed(labels[1:]):
+            node = node.children.get(label)
+            if node is None:
+                return match
+            if node.subdomains is not None:
+                match = node.subdomains
+        return match
+
+    def resolve_many(self, hostnames):
+        resolve = self.resolve
+        for hostname in hostnames:
+            hostname = hostname.strip()
+            if hostname:
+                yield hostname, resolve(hostname)
+
+    def resolve_file(self, path):
+        with open(path, "r", encoding="utf-8") as file:
+            yield from self.resolve_many(file)
+
+
+def describe(effective):
+    domain = effective.domain.domain if effective.domain is not None else "base-config"
+    pins = ",".join(pin.pin for pin in effective.pin_set.pins) if effective.pin_set is not None else "-"
+    anchors = ",".join(certificate.src for certificate in effective.trust_anchors.certificates) \
+        if effective.trust_anchors is not None else "system"
+    return f"{domain}\t{str(effective.cleartext_traffic_permitted).lower()}\t{pins}\t{anchors}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resolve hostnames to their effective network security config.")
+    parser.add_argument("config", help="network_security_config.xml")
+    parser.add_argument("hostnames", help="file with one hostname per line, - for stdin")
+    args = parser.parse_args(argv)
+
+    index = DomainIndex(load(args.config))
+    results = index.resolve_many(sys.stdin) if args.hostnames == "-" else index.resolve_file(args.hostnames)
+    for hostname, effective in results:
+        print(f"{hostname}\t{describe(effective)}")
+
+
+if __name__ == '__main__':
+    main()
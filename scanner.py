@@ -0,0 +1,236 @@
+import argparse
+import datetime
+import fnmatch
+import os
+import sys
+import time
+
+from loader import load, LoadError
+
+DEFAULT_PATTERN = "network_security_config*.xml"
+# Generated copies of the configs live in build outputs, version control and dependency directories are never
+# searched either.
+SKIPPED_DIRECTORIES = {".git", ".hg", ".svn", ".gradle", ".idea", "build", "node_modules"}
+CSV_FIELDS = ("path", "kind", "location", "domains", "detail")
+
+
+class Finding:
+
+    def __init__(self, path, kind, location, domains=(), detail=""):
+        self.path = path
+        self.kind = kind
+        self.location = location
+        self.domains = list(domains)
+        self.detail = detail
+
+    def to_dict(self):
+        return {
+            "path": self.path,
+            "kind": self.kind,
+            "location": self.location,
+            "domains": self.domains,
+            "detail": self.detail,
+        }
+
+
+class FileScan:
+
+    def __init__(self, path, findings=None, domains=0, size=0, error=None):
+        self.path = path
+        self.findings = findings or []
+        self.domains = domains
+        self.size = size
+        self.error = error
+
+
+class ScanReport:
+
+    def __init__(self, scans, discovery_seconds=0.0, scan_seconds=0.0, days=30, today=None):
+        self.scans = scans
+        self.discovery_seconds = discovery_seconds
+        self.scan_seconds = scan_seconds
+        self.days = days
+        self.today = today
+
+    @property
+    def findings(self):
+        return [finding for scan in self.scans for finding in scan.findings]
+
+    @property
+    def errors(self):
+        return {scan.path: scan.error for scan in self.scans if scan.error is not None}
+
+    def summary(self):
+        seconds = self.scan_seconds
+        files = len(self.scans)
+        size = sum(scan.size for scan in self.scans)
+        counts = {}
+        for finding in self.findings:
+            counts[finding.kind] = counts.get(finding.kind, 0) + 1
+        return {
+            "files": files,
+            "domains": sum(scan.domains for scan in self.scans),
+            "errors": len(self.errors),
+            "findings": counts,
+            "discovery_seconds": self.discovery_seconds,
+            "scan_seconds": seconds,
+            "files_per_second": files / seconds if seconds else 0.0,
+            "megabytes_per_second": size / 1_000_000 / seconds if seconds else 0.0,
+        }
+
+    def to_dict(self):
+        return {
+            "today": f"{self.today}",
+            "days": self.days,
+            "summary": self.summary(),
+            "findings": [finding.to_dict() for finding in self.findings],
+            "errors": self.errors,
+        }
+
+    def write_json(self, file):
+        import json
+
+        json.dump(self.to_dict(), file, indent=2)
+
+    def write_csv(self, file):
+        import csv
+
+        writer = csv.writer(file)
+        writer.writerow(CSV_FIELDS)
+        for finding in self.findings:
+            writer.writerow([finding.path, finding.kind, finding.location, " ".join(finding.domains), finding.detail])
+
+
+def discover(paths, pattern=DEFAULT_PATTERN):
+    found = []
+    pending = []
+    for path in paths:
+        if os.path.isdir(path):
+            pending.append(path)
+        else:
+            found.append(path)
+    # os.scandir hands out the entry types with the listing, so no extra stat call is made per file.
+    while pending:
+        directory = pending.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in SKIPPED_DIRECTORIES:
+                    pending.append(entry.path)
+            elif fnmatch.fnmatch(entry.name, pattern):
+                found.append(entry.path)
+    return sorted(found)
+
+
+def _certificate_findings(path, trust_anchors, location, domains):
+    return [Finding(path, "override-pins", location, domains, certificate.src)
+            for certificate in trust_anchors.certificates if certificate.override_pins]
+
+
+def scan_config(config, path, days=30, today=None):
+    # Pin-sets expiring within `days` (or already expired), cleartext traffic and overridePins trust anchors
+    # outside debug-overrides, located with the same paths as validation errors.
+    today = today or datetime.date.today()
+    findings = []
+    if config.cleartext_traffic_permitted:
+        findings.append(Finding(path, "cleartext", "network-security-config"))
+    if config.base_config is not None:
+        if config.base_config.cleartext_traffic:
+            findings.append(Finding(path, "cleartext", "network-security-config/base-config"))
+        findings.extend(_certificate_findings(path, config.base_config.trust_anchor,
+                                              "network-security-config/base-config", ()))
+
+    domains = 0
+    pending = [(domain_config, f"network-security-config/domain-config[{index}]")
+               for index, domain_config in reversed(list(enumerate(config.domain_configs)))]
+    while pending:
+        domain_config, location = pending.pop()
+        names = [domain.domain for domain in domain_config.expanded_domains()]
+        domains += len(names)
+        if domain_config.cleartext_traffic_permitted:
+            findings.append(Finding(path, "cleartext", location, names))
+        pin_set = domain_config.pin_set
+        if pin_set is not None and pin_set.pins and pin_set.expiration is not None:
+            try:
+                remaining = (datetime.date.fromisoformat(f"{pin_set.expiration}") - today).days
+            except ValueError:
+                findings.append(Finding(path, "invalid-expiration", f"{location}/pin-set", names,
+                                        f"{pin_set.expiration}"))
+            else:
+                if remaining < 0:
+                    findings.append(Finding(path, "expired-pin-set", f"{location}/pin-set", names,
+                                            f"expired {pin_set.expiration} ({-remaining} days ago)"))
+                elif remaining <= days:
+                    findings.append(Finding(path, "expiring-pin-set", f"{location}/pin-set", names,
+                                            f"expires {pin_set.expiration} (in {remaining} days)"))
+        if domain_config.trust_anchors is not None:
+            findings.extend(_certificate_findings(path, domain_config.trust_anchors, f"{location}/trust-anchors",
+                                                  names))
+        pending.extend((inner, f"{location}/domain-config[{index}]")
+                       for index, inner in reversed(list(enumerate(domain_config.domain_configs))))
+    return findings, domains
+
+
+def scan_file(path, days=30, today=None):
+    try:
+        size = os.path.getsize(path)
+        findings, domains = scan_config(load(path), path, days, today)
+    # Broken files are reported instead of failing the whole audit.
+    except (OSError, LoadError) as error:
+        return FileScan(path, error=f"{type(error).__name__}: {error}")
+    return FileScan(path, findings, domains, size)
+
+
+def scan(paths, days=30, today=None, workers=None, pattern=DEFAULT_PATTERN):
+    today = today or datetime.date.today()
+    start = time.perf_counter()
+    files = discover(paths, pattern)
+    discovered = time.perf_counter()
+    if workers == 1 or len(files) <= 1:
+        scans = [scan_file(path, days, today) for path in files]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            scans = list(executor.map(scan_file, files, [days] * len(files), [today] * len(files),
+                                      chunksize=max(1, len(files) // 64)))
+    return ScanReport(scans, discovered - start, time.perf_counter() - discovered, days, today)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Audit network security configs across a source tree for expiring "
+                                                 "pins, cleartext traffic and overridePins trust anchors.")
+    parser.add_argument("paths", nargs="+", help="directories to search or config files")
+    parser.add_argument("--days", type=int, default=30, help="report pin-sets expiring within this many days")
+    parser.add_argument("--pattern", default=DEFAULT_PATTERN, help="file name pattern of the configs")
+    parser.add_argument("-j", "--workers", type=int, help="number of worker processes (default: one per core)")
+    parser.add_argument("--today", type=datetime.date.fromisoformat, help="date to compare expirations against")
+    parser.add_argument("--json", help="write the report as JSON to this file ('-' for stdout)")
+    parser.add_argument("--csv", help="write the findings as CSV to this file ('-' for stdout)")
+    parser.add_argument("--strict", action="store_true", help="exit with status 1 when there are findings")
+    args = parser.parse_args(argv)
+
+    report = scan(args.paths, args.days, args.today, args.workers, args.pattern)
+    for option, write in ((args.json, report.write_json), (args.csv, report.write_csv)):
+        if option == "-":
+            write(sys.stdout)
+        elif option:
+            with open(option, "w", encoding="utf-8", newline="") as file:
+                write(file)
+
+    summary = report.summary()
+    counts = ", ".join(f"{count} {kind}" for kind, count in sorted(summary["findings"].items())) or "no findings"
+    print(f"Scanned {summary['files']} files ({summary['domains']} domains, {summary['errors']} unreadable): {counts}",
+          file=sys.stderr)
+    print(f"Discovery {summary['discovery_seconds']:.2f} s, scan {summary['scan_seconds']:.2f} s, "
+          f"{summary['files_per_second']:.0f} files/s, {summary['megabytes_per_second']:.1f} MB/s", file=sys.stderr)
+    for path, error in report.errors.items():
+        print(f"ERROR {path}: {error}", file=sys.stderr)
+    return 1 if report.errors or (args.strict and report.findings) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+import os
+from itertools import islice
+
+from instrumentation import phase
+
+# Tried in this order when no serializer is chosen, fastest first (python -m benchmarks.bench_serializers). The string
+# serializer needs nothing beyond the standard library, so etree and lxml are only used when asked for explicitly.
+AUTO_ORDER = ("string", "etree")
+ENVIRONMENT_VARIABLE = "NSC_SERIALIZER"
+# Fragments joined per write by the string serializer, far fewer calls into the stream than one write per fragment.
+CHUNK_FRAGMENTS = 4096
+
+
+class SerializerError(Exception):
+    pass
+
+
+class StringSerializer:
+    # Writes the fragments of the streaming writer straight to the stream, the only serializer that also writes
+    # compact output and that never holds a tree of the whole config.
+    name = "string"
+
+    def write(self, config, stream, compact=False):
+        write = stream.write
+        fragments = config.compact_fragments() if compact else config.fragments()
+        while True:
+            with phase("fragments", config):
+                chunk = "".join(islice(fragments, CHUNK_FRAGMENTS))
+            if not chunk:
+                return
+            with phase("stream.write", config):
+                write(chunk)
+
+
+class ElementTreeSerializer:
+    # The standard library ElementTree, which uses its C accelerator (_elementtree) whenever it is available.
+    name = "etree"
+
+    def __init__(self):
+        import xml.etree.ElementTree as Et
+
+        self._Et = Et
+        self.element = Et.Element
+        self.sub_element = Et.SubElement
+
+    def write(self, config, stream, compact=False):
+        if compact:
+            raise SerializerError("compact output is only written by the string serializer")
+        tree = self._Et.ElementTree(config.collect(serializer=self))
+        with phase("indent", config):
+            self._Et.indent(tree, space="\t")
+        with phase("tree.write", config):
+            tree.write(stream, encoding="unicode")
+
+
+class LxmlSerializer:
+    # lxml (libxml2) when it is installed. Elements are created one Python call at a time like with ElementTree,
+    # the tree is indented and serialized in C.
+    name = "lxml"
+
+    def __init__(self):
+        try:
+            from lxml import etree
+        except ImportError as error:
+            raise SerializerError("the lxml serializer needs lxml installed") from error
+        self._etree = etree
+        self.element = etree.Element
+        self.sub_element = etree.SubElement
+
+    def write(self, config, stream, compact=False):
+        if compact:
+            raise SerializerError("compact output is only written by the string serializer")
+        root = config.collect(serializer=self)
+        with phase("indent", config):
+            self._etree.indent(root, space="\t")
+        with phase("tree.write", config):
+            stream.write(self._etree.tostring(root, encoding="unicode"))
+
+
+SERIALIZERS = {serializer.name: serializer for serializer in (StringSerializer, ElementTreeSerializer, LxmlSerializer)}
+_instances = {}
+
+
+def get_serializer(serializer=None):
+    # An explicit serializer (name or instance) wins over NSC_SERIALIZER, which wins over the automatic choice.
+    if serializer is not None and not isinstance(serializer, str):
+        return serializer
+    name = serializer or os.environ.get(ENVIRONMENT_VARIABLE) or "auto"
+    instance = _instances.get(name)
+    if instance is not None:
+        return instance
+    if name == "auto":
+        for candidate in AUTO_ORDER:
+            try:
+                instance = get_serializer(candidate)
+            except SerializerError:
+                continue
+            break
+    elif name in SERIALIZERS:
+        instance = SERIALIZERS[name]()
+    else:
+        raise SerializerError(f"unknown serializer {name!r}, choose from auto, {', '.join(SERIALIZERS)}")
+    _instances[name] = instance
+    return instance
+
+
+def available_serializers():
+    names = []
+    for name in SERIALIZERS:
+        try:
+            get_serializer(name)
+        except SerializerError:
+            continue
+        names.append(name)
+    return names
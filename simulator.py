@@ -0,0 +1,301 @@
+import argparse
+import datetime
+import os
+import sys
+import time
+
+from loader import load, LoadError
+from pins import compute_pins, decode_pem_block, pem_blocks, spki_pin, PinError
+from resolver import DomainIndex
+
+CHAIN_EXTENSIONS = (".pem", ".crt", ".cer")
+CSV_FIELDS = ("domain", "status", "chains", "passed", "failed", "hosts", "failing_hosts", "outcomes")
+BATCH_SIZE = 256
+PIN_CACHE_LIMIT = 20_000
+
+# How a recorded chain fares: the first four let the connection through, a mismatch is rejected by Android.
+PINNED = "pinned"
+UNPINNED = "unpinned"
+EXPIRED = "pin-set-expired"
+OVERRIDDEN = "override-pins"
+MISMATCH = "pin-mismatch"
+
+_pin_cache = {}
+
+
+def discover_chains(corpus):
+    # corpus/<hostname>.pem holds one chain, corpus/<hostname>/<anything>.pem any number of chains of that host.
+    chains = []
+    pending = [(corpus, None)]
+    while pending:
+        directory, hostname = pending.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                pending.append((entry.path, hostname or entry.name))
+            else:
+                stem, extension = os.path.splitext(entry.name)
+                if extension.lower() in CHAIN_EXTENSIONS:
+                    chains.append((hostname or stem, entry.path))
+    return sorted(chains)
+
+
+def chain_pins(path):
+    # SPKI pins of a chain, leaf first. Intermediates and roots are shared by most chains, so every certificate is
+    # decoded and hashed once per process, keyed by its PEM body (or the whole DER file); the oldest entries are
+    # dropped once the cache is full.
+    with open(path, "rb") as file:
+        data = file.read()
+    pins = []
+    blocks = pem_blocks(data)
+    for block in blocks or (data,):
+        pin = _pin_cache.get(block)
+        if pin is None:
+            if len(_pin_cache) >= PIN_CACHE_LIMIT:
+                del _pin_cache[next(iter(_pin_cache))]
+            pin = _pin_cache[block] = spki_pin(decode_pem_block(block) if blocks else block)
+        pins.append(pin)
+    return pins
+
+
+def hash_batch(paths):
+    results = []
+    for path in paths:
+        try:
+            results.append((chain_pins(path), None))
+        # A broken capture is reported instead of failing the whole simulation.
+        except (OSError, PinError, ValueError) as error:
+            results.append((None, f"{type(error).__name__}: {error}"))
+    return results
+
+
+class PinPolicy:
+    # What Android checks for one effective pin-set and trust-anchors combination on the simulated date.
+
+    def __init__(self, pin_set, trust_anchors, today, raw_dir=None):
+        self.warnings = []
+        self.pins = frozenset(pin.pin for pin in pin_set.pins) if pin_set is not None else frozenset()
+        self.expired = False
+        if self.pins and pin_set.expiration is not None:
+            try:
+                # Android stops enforcing pins once the current time passes midnight at the start of that date.
+                self.expired = datetime.date.fromisoformat(f"{pin_set.expiration}") <= today
+            except ValueError:
+                self.warnings.append(f"invalid pin-set expiration {pin_set.expiration}, pins treated as enforced")
+        # Recorded chains are assumed to be trusted by the system store and the simulated device to have no user
+        # CAs, so overridePins on "system" lets every chain through and on "user" none. Certificate files and
+        # @raw resources let through chains containing one of their keys.
+        self.override_all = False
+        self.override_pins = set()
+        certificates = trust_anchors.certificates if trust_anchors is not None else ()
+        for certificate in certificates:
+            if not certificate.override_pins or certificate.src == "user":
+                continue
+            if certificate.src == "system":
+                self.override_all = True
+                continue
+            try:
+                self.override_pins.update(pin.pin for pin in compute_pins([certificate.src], raw_dir, workers=1))
+            except (OSError, PinError) as error:
+                self.warnings.append(f"overridePins anchor {certificate.src} ignored: {error}")
+
+    def check(self, pins):
+        if not self.pins:
+            return UNPINNED
+        if self.expired:
+            return EXPIRED
+        if not self.pins.isdisjoint(pins):
+            return PINNED
+        if self.override_all or not self.override_pins.isdisjoint(pins):
+            return OVERRIDDEN
+        return MISMATCH
+
+
+class DomainReport:
+
+    def __init__(self, domain):
+        self.domain = domain
+        self.outcomes = {}
+        self.hosts = set()
+        self.failing_hosts = set()
+
+    def add(self, hostname, outcome):
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        self.hosts.add(hostname)
+        if outcome == MISMATCH:
+            self.failing_hosts.add(hostname)
+
+    @property
+    def chains(self):
+        return sum(self.outcomes.values())
+
+    @property
+    def failed(self):
+        return self.outcomes.get(MISMATCH, 0)
+
+    @property
+    def status(self):
+        return "fail" if self.failed else "pass"
+
+    def to_dict(self):
+        return {
+            "domain": self.domain,
+            "status": self.status,
+            "chains": self.chains,
+            "passed": self.chains - self.failed,
+            "failed": self.failed,
+            "hosts": sorted(self.hosts),
+            "failing_hosts": sorted(self.failing_hosts),
+            "outcomes": dict(sorted(self.outcomes.items())),
+        }
+
+
+class SimulationReport:
+
+    def __init__(self, domains, errors, warnings, today, discovery_seconds=0.0, hash_seconds=0.0,
+                 check_seconds=0.0):
+        self.domains = domains
+        self.errors = errors
+        self.warnings = warnings
+        self.today = today
+        self.discovery_seconds = discovery_seconds
+        self.hash_seconds = hash_seconds
+        self.check_seconds = check_seconds
+
+    @property
+    def failing(self):
+        return [report for report in self.domains.values() if report.failed]
+
+    def summary(self):
+        chains = sum(report.chains for report in self.domains.values())
+        seconds = self.hash_seconds + self.check_seconds
+        return {
+            "chains": chains,
+            "domains": len(self.domains),
+            "failing_domains": len(self.failing),
+            "failed_chains": sum(report.failed for report in self.domains.values()),
+            "errors": len(self.errors),
+            "discovery_seconds": self.discovery_seconds,
+            "hash_seconds": self.hash_seconds,
+            "check_seconds": self.check_seconds,
+            "chains_per_second": chains / seconds if seconds else 0.0,
+        }
+
+    def to_dict(self):
+        return {
+            "today": f"{self.today}",
+            "summary": self.summary(),
+            "domains": [report.to_dict() for report in self.domains.values()],
+            "errors": self.errors,
+            "warnings": self.warnings,
+        }
+
+    def write_json(self, file):
+        import json
+
+        json.dump(self.to_dict(), file, indent=2)
+
+    def write_csv(self, file):
+        import csv
+
+        writer = csv.writer(file)
+        writer.writerow(CSV_FIELDS)
+        for report in self.domains.values():
+            row = report.to_dict()
+            writer.writerow([row["domain"], row["status"], row["chains"], row["passed"], row["failed"],
+                             " ".join(row["hosts"]), " ".join(row["failing_hosts"]),
+                             " ".join(f"{outcome}={count}" for outcome, count in row["outcomes"].items())])
+
+
+def hash_chains(paths, workers=None, batch_size=BATCH_SIZE):
+    # Files are hashed in batches, so a worker process gets hundreds of chains per task and keeps its own
+    # certificate cache warm across them.
+    batches = [paths[index:index + batch_size] for index in range(0, len(paths), batch_size)]
+    if workers == 1 or len(batches) <= 1:
+        return [result for batch in batches for result in hash_batch(batch)]
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        return [result for results in executor.map(hash_batch, batches) for result in results]
+
+
+def simulate(config, corpus, today=None, workers=None, raw_dir=None, batch_size=BATCH_SIZE):
+    today = today or datetime.date.today()
+    start = time.perf_counter()
+    chains = discover_chains(corpus)
+    discovered = time.perf_counter()
+    results = hash_chains([path for _, path in chains], workers, batch_size)
+    hashed = time.perf_counter()
+
+    index = DomainIndex(config)
+    policies = {}
+    domains = {}
+    errors = {}
+    warnings = []
+    for (hostname, path), (pins, error) in zip(chains, results):
+        if error is not None:
+            errors[path] = error
+            continue
+        effective = index.resolve(hostname)
+        key = (id(effective.pin_set), id(effective.trust_anchors))
+        policy = policies.get(key)
+        if policy is None:
+            policy = policies[key] = PinPolicy(effective.pin_set, effective.trust_anchors, today, raw_dir)
+            warnings.extend(policy.warnings)
+        domain = effective.domain.domain if effective.domain is not None else "base-config"
+        report = domains.get(domain)
+        if report is None:
+            report = domains[domain] = DomainReport(domain)
+        report.add(hostname, policy.check(pins))
+    domains = dict(sorted(domains.items(), key=lambda item: (item[1].status == "pass", item[0])))
+    return SimulationReport(domains, errors, warnings, today, discovered - start, hashed - discovered,
+                            time.perf_counter() - hashed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Predict pin failures by checking recorded certificate chains "
+                                                 "against a network security config.")
+    parser.add_argument("config", help="network_security_config.xml")
+    parser.add_argument("corpus", help="directory with <hostname>.pem chains or <hostname>/ directories of them")
+    parser.add_argument("--today", type=datetime.date.fromisoformat,
+                        help="date to simulate, e.g. the release date (default: today)")
+    parser.add_argument("--raw-dir", help="res/raw directory for @raw/... overridePins trust anchors")
+    parser.add_argument("-j", "--workers", type=int, help="number of worker processes (default: one per core)")
+    parser.add_argument("--json", help="write the report as JSON to this file ('-' for stdout)")
+    parser.add_argument("--csv", help="write the per-domain report as CSV to this file ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    try:
+        config = load(args.config)
+    except (OSError, LoadError) as error:
+        print(f"{args.config}: {error}", file=sys.stderr)
+        return 2
+    report = simulate(config, args.corpus, args.today, args.workers, args.raw_dir)
+    for option, write in ((args.json, report.write_json), (args.csv, report.write_csv)):
+        if option == "-":
+            write(sys.stdout)
+        elif option:
+            with open(option, "w", encoding="utf-8", newline="") as file:
+                write(file)
+
+    summary = report.summary()
+    for domain in report.failing:
+        print(f"FAIL {domain.domain}: {domain.failed}/{domain.chains} chains rejected "
+              f"({', '.join(sorted(domain.failing_hosts))})", file=sys.stderr)
+    print(f"Simulated {summary['chains']} chains on {report.today}: {summary['failing_domains']}/"
+          f"{summary['domains']} domains would reject traffic, {summary['errors']} unreadable chains",
+          file=sys.stderr)
+    print(f"Discovery {summary['discovery_seconds']:.2f} s, hashing {summary['hash_seconds']:.2f} s, "
+          f"checks {summary['check_seconds']:.2f} s, {summary['chains_per_second']:.0f} chains/s", file=sys.stderr)
+    for warning in report.warnings:
+        print(f"WARNING {warning}", file=sys.stderr)
+    for path, error in report.errors.items():
+        print(f"ERROR {path}: {error}", file=sys.stderr)
+    return 1 if report.failing or report.errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
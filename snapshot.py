@@ -0,0 +1,471 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from model import NetworkSecConfig, BaseConfig, Certificates, DomainConfig, Domain, PinSet, Pin, TrustAnchors, \
+    DebugOverrides, _fragments
+from resolver import EffectiveConfig, normalize_hostname, pin_set_key
+
+MAGIC = b"NSCSNAP\0"
+VERSION = 1
+
+# Header: magic, version, flags, base-config and debug-overrides trust anchors (index + 1, 0 when absent), the range
+# of top-level domain-configs in the children array, then (offset, length) of every section. Lengths count bytes for
+# the string data and 32 bit words for all other sections.
+SECTIONS = ("string_offsets", "string_data", "configs", "children", "domains", "index", "pin_sets", "pins",
+            "trust_anchors", "certificates")
+_HEADER = struct.Struct("<8sHHIIII" + "II" * len(SECTIONS))
+
+ROOT_CLEARTEXT = 1
+HAS_BASE_CONFIG = 2
+BASE_CLEARTEXT = 4
+HAS_DEBUG_OVERRIDES = 8
+
+# Records are fixed width arrays of unsigned 32 bit words, optional references are stored as index + 1:
+# configs: parent + 1, cleartext, first domain, domain count, pin-set + 1, trust anchors + 1, first child, child count
+# index: normalized hostname, domain, config, sorted by hostname and declaration order
+# pin_sets: first pin, pin count, expiration + 1
+# trust_anchors: first certificate, certificate count
+CONFIG_FIELDS = 8
+INDEX_FIELDS = 3
+PIN_SET_FIELDS = 3
+TRUST_ANCHORS_FIELDS = 2
+FLAG = 1 << 31  # includeSubdomains of domains, overridePins of certificates
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class _Builder:
+
+    def __init__(self):
+        self.strings = {}
+        self.configs = array("I")
+        self.children = array("I")
+        self.domains = array("I")
+        self.index = []
+        self.pin_sets = array("I")
+        self.pins = array("I")
+        self.trust_anchors = array("I")
+        self.certificates = array("I")
+
+    def string(self, value):
+        value = f"{value}"
+        index = self.strings.get(value)
+        if index is None:
+            if "\0" in value:
+                raise SnapshotError(f"{value!r} contains a NUL character")
+            index = self.strings[value] = len(self.strings)
+        return index
+
+    def add_trust_anchors(self, trust_anchors):
+        if trust_anchors is None:
+            return 0
+        self.trust_anchors.extend((len(self.certificates), len(trust_anchors.certificates)))
+        self.certificates.extend(self.string(certificate.src) | (FLAG if certificate.override_pins else 0)
+                                 for certificate in trust_anchors.certificates)
+        return len(self.trust_anchors) // TRUST_ANCHORS_FIELDS
+
+    def add_pin_set(self, pin_set):
+        if pin_set is None:
+            return 0
+        expiration = self.string(pin_set.expiration) + 1 if pin_set.expiration is not None else 0
+        self.pin_sets.extend((len(self.pins), len(pin_set.pins), expiration))
+        self.pins.extend(self.string(pin.pin) for pin in pin_set.pins)
+        return len(self.pin_sets) // PIN_SET_FIELDS
+
+    def add_configs(self, config):
+        # Domain-configs are stored in document order (pre-order). Each record points to the range of its children
+        # in the children array, which starts with the top-level domain-configs.
+        top_level = []
+        children = []
+        pending = [(domain_config, None) for domain_config in reversed(config.domain_configs)]
+        while pending:
+            domain_config, parent = pending.pop()
+            position = len(children)
+            children.append([])
+            (top_level if parent is None else children[parent]).append(position)
+            first_domain = len(self.domains)
+            for domain in domain_config.expanded_domains():
+                self.index.append((normalize_hostname(f"{domain.domain}"), len(self.domains), position))
+                self.domains.append(self.string(domain.domain) | (FLAG if domain.include_subdomains else 0))
+            self.configs.extend((0 if parent is None else parent + 1,
+                                 1 if domain_config.cleartext_traffic_permitted else 0, first_domain,
+                                 len(self.domains) - first_domain, self.add_pin_set(domain_config.pin_set),
+                                 self.add_trust_anchors(domain_config.trust_anchors), 0, 0))
+            pending.extend((inner, position) for inner in reversed(domain_config.domain_configs))
+
+        self.children.extend(top_level)
+        for position, inner_positions in enumerate(children):
+            self.configs[position * CONFIG_FIELDS + 6] = len(self.children)
+            self.configs[position * CONFIG_FIELDS + 7] = len(inner_positions)
+            self.children.extend(inner_positions)
+
+    def build(self, config):
+        flags = ROOT_CLEARTEXT if config.cleartext_traffic_permitted else 0
+        base_trust_anchors = debug_trust_anchors = 0
+        if config.base_config is not None:
+            flags |= HAS_BASE_CONFIG | (BASE_CLEARTEXT if config.base_config.cleartext_traffic else 0)
+            base_trust_anchors = self.add_trust_anchors(config.base_config.trust_anchor)
+        if config.debug_overrides is not None:
+            flags |= HAS_DEBUG_OVERRIDES
+            debug_trust_anchors = self.add_trust_anchors(config.debug_overrides.trust_anchor)
+        self.add_configs(config)
+
+        index = array("I")
+        for hostname, domain, position in sorted(self.index):
+            index.extend((self.string(hostname), domain, position))
+
+        encoded = [value.encode("utf-8") for value in self.strings]
+        string_data = b"\0".join(encoded)
+        string_offsets = array("I", [0])
+        for value in encoded:
+            string_offsets.append(string_offsets[-1] + len(value) + 1)
+
+        sections = {
+            "string_offsets": string_offsets,
+            "string_data": string_data + b"\0" * (-len(string_data) % 4),
+            "configs": self.configs,
+            "children": self.children,
+            "domains": self.domains,
+            "index": index,
+            "pin_sets": self.pin_sets,
+            "pins": self.pins,
+            "trust_anchors": self.trust_anchors,
+            "certificates": self.certificates,
+        }
+        body = []
+        table = []
+        offset = _HEADER.size
+        for name in SECTIONS:
+            section = sections[name]
+            if isinstance(section, array):
+                if sys.byteorder != "little":
+                    section = array("I", section)
+                    section.byteswap()
+                data = section.tobytes()
+                table.extend((offset, len(section)))
+            else:
+                data = section
+                table.extend((offset, len(string_data)))
+            body.append(data)
+            offset += len(data)
+        header = _HEADER.pack(MAGIC, VERSION, flags, base_trust_anchors, debug_trust_anchors, 0,
+                              len(config.domain_configs), *table)
+        return header + b"".join(body)
+
+
+def dumps(config):
+    return _Builder().build(config)
+
+
+def save(config, path):
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(dumps(config))
+    os.replace(temporary, path)
+
+
+def _words(buffer, offset, length):
+    view = buffer[offset:offset + length * 4]
+    if sys.byteorder == "little":
+        return view.cast("I")
+    words = array("I", bytes(view))
+    words.byteswap()
+    return words
+
+
+class Snapshot:
+
+    def __init__(self, buffer):
+        self._mmap = None
+        self._buffer = memoryview(buffer)
+        try:
+            fields = self._check_header()
+        except SnapshotError:
+            self._buffer.release()
+            raise
+        self.flags, self._base_trust_anchors, self._debug_trust_anchors, self._first_top_level, \
+            self._top_level_count = fields[2:7]
+        table = fields[7:]
+        sections = {}
+        for position, name in enumerate(SECTIONS):
+            offset, length = table[2 * position], table[2 * position + 1]
+            sections[name] = self._buffer[offset:offset + length] if name == "string_data" \
+                else _words(self._buffer, offset, length)
+        self._string_offsets = sections["string_offsets"]
+        self._string_data = sections["string_data"]
+        self._configs = sections["configs"]
+        self._children = sections["children"]
+        self._domains = sections["domains"]
+        self._index = sections["index"]
+        self._pin_sets = sections["pin_sets"]
+        self._pins = sections["pins"]
+        self._trust_anchors = sections["trust_anchors"]
+        self._certificates = sections["certificates"]
+        self._strings = None
+
+    def _check_header(self):
+        if len(self._buffer) < _HEADER.size:
+            raise SnapshotError("truncated snapshot")
+        fields = _HEADER.unpack_from(self._buffer)
+        magic, version = fields[:2]
+        if magic != MAGIC:
+            raise SnapshotError("not a network security config snapshot")
+        if version != VERSION:
+            raise SnapshotError(f"unsupported snapshot version {version}, expected {VERSION}")
+        table = fields[7:]
+        for position, name in enumerate(SECTIONS):
+            offset, length = table[2 * position], table[2 * position + 1]
+            size = length if name == "string_data" else length * 4
+            if offset + size > len(self._buffer):
+                raise SnapshotError(f"truncated snapshot, {name} section is incomplete")
+        return fields
+
+    @classmethod
+    def open(cls, path):
+        with open(path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            snapshot = cls(mapped)
+        except SnapshotError:
+            mapped.close()
+            raise
+        snapshot._mmap = mapped
+        return snapshot
+
+    def close(self):
+        for view in (self._string_offsets, self._string_data, self._configs, self._children, self._domains,
+                     self._index, self._pin_sets, self._pins, self._trust_anchors, self._certificates):
+            if isinstance(view, memoryview):
+                view.release()
+        self._buffer.release()
+        if self._mmap is not None:
+            self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def domain_config_count(self):
+        return len(self._configs) // CONFIG_FIELDS
+
+    @property
+    def domain_count(self):
+        return len(self._domains)
+
+    def string(self, index):
+        if self._strings is not None:
+            return self._strings[index]
+        return str(self._string_data[self._string_offsets[index]:self._string_offsets[index + 1] - 1], "utf-8")
+
+    def _load_strings(self):
+        # Decoding the whole table at once is far cheaper than one string at a time when every object is needed.
+        if self._strings is None:
+            size = self._string_offsets[-1] - 1 if len(self._string_offsets) > 1 else 0
+            self._strings = str(self._string_data[:size], "utf-8").split("\0")
+        return self._strings
+
+    def _trust_anchors_at(self, reference, string):
+        if not reference:
+            return None
+        position = (reference - 1) * TRUST_ANCHORS_FIELDS
+        first, count = self._trust_anchors[position], self._trust_anchors[position + 1]
+        trust_anchors = TrustAnchors()
+        for value in self._certificates[first:first + count]:
+            trust_anchors.add_certificate(Certificates(string(value & ~FLAG), bool(value & FLAG)))
+        return trust_anchors
+
+    def _pin_set_at(self, reference, string):
+        if not reference:
+            return None
+        position = (reference - 1) * PIN_SET_FIELDS
+        first, count, expiration = self._pin_sets[position:position + PIN_SET_FIELDS]
+        pin_set = PinSet(expiration=string(expiration - 1) if expiration else None)
+        pin_set.add_pins([Pin(string(value)) for value in self._pins[first:first + count]])
+        return pin_set
+
+    def _domain_config_at(self, position, string):
+        _, cleartext, first_domain, domain_count, pin_set, trust_anchors, _, _ = \
+            self._configs[position * CONFIG_FIELDS:(position + 1) * CONFIG_FIELDS]
+        domain_config = DomainConfig(bool(cleartext))
+        domain_config.add_domains([Domain(string(value & ~FLAG), bool(value & FLAG))
+                                   for value in self._domains[first_domain:first_domain + domain_count]])
+        if pin_set:
+            domain_config.add_pin_set(self._pin_set_at(pin_set, string))
+        if trust_anchors:
+            domain_config.add_trust_anchors(self._trust_anchors_at(trust_anchors, string))
+        return domain_config
+
+    def domain_config(self, position):
+        # Without its nested domain-configs.
+        return self._domain_config_at(position, self.string)
+
+    def children(self, position=None):
+        if position is None:
+            first, count = self._first_top_level, self._top_level_count
+        else:
+            first = self._configs[position * CONFIG_FIELDS + 6]
+            count = self._configs[position * CONFIG_FIELDS + 7]
+        return self._children[first:first + count].tolist()
+
+    def parent(self, position):
+        parent = self._configs[position * CONFIG_FIELDS]
+        return parent - 1 if parent else None
+
+    def _shell(self, string):
+        config = NetworkSecConfig(bool(self.flags & ROOT_CLEARTEXT))
+        if self.flags & HAS_BASE_CONFIG:
+            base_config = BaseConfig(bool(self.flags & BASE_CLEARTEXT))
+            base_config.trust_anchor = self._trust_anchors_at(self._base_trust_anchors, string)
+            config.add_base_config(base_config)
+        if self.flags & HAS_DEBUG_OVERRIDES:
+            debug_overrides = DebugOverrides()
+            debug_overrides.trust_anchor = self._trust_anchors_at(self._debug_trust_anchors, string)
+            config.add_debug_overrides(debug_overrides)
+        return config
+
+    def to_config(self):
+        string = self._load_strings().__getitem__
+        config = self._shell(string)
+        domain_configs = []
+        # Records are in document order, so every parent exists before its children are appended to it.
+        for position in range(self.domain_config_count):
+            domain_config = self._domain_config_at(position, string)
+            domain_configs.append(domain_config)
+            parent = self._configs[position * CONFIG_FIELDS]
+            (domain_configs[parent - 1] if parent else config).add_domain_config(domain_config)
+        return config
+
+    def write(self, file):
+        # Domain-configs are materialized one at a time while they are written, not as a whole model up front, which
+        # only the streaming serializer supports (tree serializers collect the whole model first).
+        config = self._shell(self.string)
+        config.domain_configs = [_DomainConfigView(self, position) for position in self.children()]
+        config.write(file, serializer="string")
+
+    def _lookup(self, hostname):
+        encoded = hostname.encode("utf-8")
+        index = self._index
+        low, high = 0, len(index) // INDEX_FIELDS
+        while low < high:
+            middle = (low + high) // 2
+            value = index[middle * INDEX_FIELDS]
+            if bytes(self._string_data[self._string_offsets[value]:self._string_offsets[value + 1] - 1]) < encoded:
+                low = middle + 1
+            else:
+                high = middle
+        exact = subdomains = None
+        while low * INDEX_FIELDS < len(index) and self.string(index[low * INDEX_FIELDS]) == hostname:
+            domain, position = index[low * INDEX_FIELDS + 1], index[low * INDEX_FIELDS + 2]
+            # Entries with the same hostname are sorted by declaration order, the first declaration wins.
+            if exact is None:
+                exact = (domain, position)
+            if subdomains is None and self._domains[domain] & FLAG:
+                subdomains = (domain, position)
+            low += 1
+        return exact, subdomains
+
+    def _base_effective_config(self):
+        if self.flags & HAS_BASE_CONFIG:
+            return EffectiveConfig(None, bool(self.flags & BASE_CLEARTEXT), None,
+                                   self._trust_anchors_at(self._base_trust_anchors, self.string))
+        return EffectiveConfig(None, bool(self.flags & ROOT_CLEARTEXT), None, None)
+
+    def _effective_config(self, domain, position):
+        domain_config = self.domain_config(position)
+        pin_set = domain_config.pin_set if pin_set_key(domain_config.pin_set) is not None else None
+        trust_anchors = domain_config.trust_anchors
+        ancestor = self.parent(position)
+        while ancestor is not None and (pin_set is None or trust_anchors is None):
+            inherited = self.domain_config(ancestor)
+            if pin_set is None and pin_set_key(inherited.pin_set) is not None:
+                pin_set = inherited.pin_set
+            if trust_anchors is None:
+                trust_anchors = inherited.trust_anchors
+            ancestor = self.parent(ancestor)
+        if trust_anchors is None:
+            trust_anchors = self._base_effective_config().trust_anchors
+        value = self._domains[domain]
+        return EffectiveConfig(domain_config, domain_config.cleartext_traffic_permitted, pin_set, trust_anchors,
+                               Domain(self.string(value & ~FLAG), bool(value & FLAG)))
+
+    def resolve(self, hostname):
+        # Same matching rules as resolver.DomainIndex, answered by binary search on the sorted hostname index.
+        labels = normalize_hostname(hostname).split(".")
+        exact, subdomains = self._lookup(".".join(labels))
+        if exact is not None:
+            return self._effective_config(*exact)
+        for start in range(1, len(labels)):
+            _, subdomains = self._lookup(".".join(labels[start:]))
+            if subdomains is not None:
+                return self._effective_config(*subdomains)
+        return self._base_effective_config()
+
+
+class _DomainConfigView:
+    # Stands in for a DomainConfig while a snapshot is written; attributes are decoded from the record on access.
+    __slots__ = ("snapshot", "position")
+
+    def __init__(self, snapshot, position):
+        self.snapshot = snapshot
+        self.position = position
+
+    @property
+    def cleartext_traffic_permitted(self):
+        return self.snapshot.domain_config(self.position).cleartext_traffic_permitted
+
+    @property
+    def domains(self):
+        return self.snapshot.domain_config(self.position).domains
+
+    @property
+    def pin_set(self):
+        return self.snapshot.domain_config(self.position).pin_set
+
+    @property
+    def trust_anchors(self):
+        return self.snapshot.domain_config(self.position).trust_anchors
+
+    @property
+    def domain_configs(self):
+        return [_DomainConfigView(self.snapshot, position) for position in self.snapshot.children(self.position)]
+
+    def domain_count(self):
+        return self.snapshot._configs[self.position * CONFIG_FIELDS + 3]
+
+    def fragments(self, level):
+        return _fragments(self, level)
+
+    def _parts(self):
+        tag, attrib, text, children = self.snapshot.domain_config(self.position)._parts()
+        children.extend(_DomainConfigView(self.snapshot, position)
+                        for position in self.snapshot.children(self.position))
+        return tag, attrib, text, children
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert network security configs to and from binary snapshots.")
+    parser.add_argument("source", help="network_security_config.xml or snapshot to read")
+    parser.add_argument("output", help="snapshot or XML file to write")
+    parser.add_argument("--to-xml", action="store_true", help="read a snapshot and write XML")
+    args = parser.parse_args(argv)
+
+    if args.to_xml:
+        with Snapshot.open(args.source) as snapshot:
+            snapshot.write(args.output)
+    else:
+        from loader import load
+
+        save(load(args.source), args.output)
+
+
+if __name__ == '__main__':
+    main()
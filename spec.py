@@ -0,0 +1,201 @@
+import os
+
+from instrumentation import phase
+from model import NetworkSecConfig, BaseConfig, Certificates, DomainConfig, Domain, DomainPattern, PinSet, Pin, \
+    TrustAnchors, DebugOverrides
+
+SPEC_EXTENSIONS = (".json", ".toml")
+
+
+class SpecError(Exception):
+    pass
+
+
+def load_spec(path):
+    extension = os.path.splitext(path)[1].lower()
+    try:
+        if extension == ".json":
+            import json
+
+            with open(path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        if extension == ".toml":
+            import tomllib
+
+            with open(path, "rb") as file:
+                return tomllib.load(file)
+    # json.JSONDecodeError and tomllib.TOMLDecodeError are both ValueErrors.
+    except ValueError as error:
+        raise SpecError(f"{path}: {error}") from error
+    raise SpecError(f"{path}: unsupported spec format, expected one of {', '.join(SPEC_EXTENSIONS)}")
+
+
+def find_specs(paths):
+    specs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, files in os.walk(path):
+                specs.extend(os.path.join(directory, file) for file in files
+                             if os.path.splitext(file)[1].lower() in SPEC_EXTENSIONS)
+        else:
+            specs.append(path)
+    return sorted(specs)
+
+
+def build_config(spec, base_dir=None):
+    with phase("build", spec):
+        return _build_config(spec, base_dir)
+
+
+def _build_config(spec, base_dir):
+    config = NetworkSecConfig(spec.get("cleartext_traffic_permitted", False))
+
+    if spec.get("base_config") is not None:
+        config.add_base_config(build_base_config(spec["base_config"]))
+
+    raw_dir = _spec_path(spec["raw_dir"], base_dir) if "raw_dir" in spec else None
+    for domain_config_spec in spec.get("domain_configs", []):
+        config.add_domain_config(build_domain_config(domain_config_spec, base_dir, raw_dir))
+
+    if spec.get("debug_overrides") is not None:
+        config.add_debug_overrides(build_debug_overrides(spec["debug_overrides"]))
+
+    return config
+
+
+def build_base_config(spec):
+    base_config = BaseConfig(spec.get("cleartext_traffic_permitted", False))
+    for certificate in spec.get("trust_anchors", []):
+        base_config.add_certificate(build_certificates(certificate))
+    return base_config
+
+
+def build_debug_overrides(spec):
+    overrides = DebugOverrides()
+    for certificate in spec.get("trust_anchors", []):
+        overrides.add_certificate(build_certificates(certificate))
+    return overrides
+
+
+def build_overlay(spec, base_dir=None, raw_dir=None):
+    from variants import Overlay
+
+    overlay = Overlay(spec.get("cleartext_traffic_permitted"))
+    if "base_config" in spec:
+        overlay.base_config = None if spec["base_config"] is None else build_base_config(spec["base_config"])
+    if "debug_overrides" in spec:
+        overlay.debug_overrides = None if spec["debug_overrides"] is None else \
+            build_debug_overrides(spec["debug_overrides"])
+
+    for domain_config_spec in spec.get("domain_configs", []):
+        if "match" not in domain_config_spec:
+            overlay.add_domain_config(build_domain_config(domain_config_spec, base_dir, raw_dir))
+        elif domain_config_spec.get("remove", False):
+            overlay.remove_domain_config(domain_config_spec["match"])
+        else:
+            # Only the listed parts are replaced, everything else stays shared with the base config.
+            patched = build_domain_config(domain_config_spec, base_dir, raw_dir)
+            changes = {name: getattr(patched, name) for name in ("cleartext_traffic_permitted", "domains",
+                                                                  "trust_anchors", "pin_set", "domain_configs")
+                       if name in domain_config_spec}
+            overlay.patch_domain_config(domain_config_spec["match"], **changes)
+    return overlay
+
+
+def build_variants(spec, base_dir=None):
+    # {variant name: config} for a spec with "variants", every variant sharing the unchanged subtrees of the base.
+    from variants import VariantError
+
+    config = build_config(spec, base_dir)
+    raw_dir = _spec_path(spec["raw_dir"], base_dir) if "raw_dir" in spec else None
+    variants = {}
+    for name, variant_spec in spec["variants"].items():
+        try:
+            variants[name] = build_overlay(variant_spec, base_dir, raw_dir).apply(config)
+        except VariantError as error:
+            raise SpecError(f"variant {name}: {error}") from error
+    return variants
+
+
+def build_domain_config(spec, base_dir=None, raw_dir=None):
+    domain_config = DomainConfig(spec.get("cleartext_traffic_permitted", False))
+
+    domain_config.add_domains(build_domain(domain) for domain in spec.get("domains", []))
+
+    if "trust_anchors" in spec:
+        trust_anchors = TrustAnchors()
+        for certificate in spec["trust_anchors"]:
+            trust_anchors.add_certificate(build_certificates(certificate))
+        domain_config.add_trust_anchors(trust_anchors)
+
+    pin_set_spec = spec.get("pin_set")
+    if pin_set_spec is not None:
+        pin_set = PinSet(expiration=pin_set_spec.get("expiration"))
+        pin_set.add_pins(Pin(pin) for pin in pin_set_spec.get("pins", []))
+        if "certificates" in pin_set_spec:
+            pin_set.add_pins(certificate_pins(pin_set_spec["certificates"], base_dir, raw_dir))
+        domain_config.add_pin_set(pin_set)
+
+    for inner_domain_config_spec in spec.get("domain_configs", []):
+        domain_config.add_domain_config(build_domain_config(inner_domain_config_spec, base_dir, raw_dir))
+
+    return domain_config
+
+
+def _spec_path(path, base_dir):
+    if base_dir is None or path.startswith("@raw/") or path in ("system", "user"):
+        return path
+    return os.path.join(base_dir, path)
+
+
+def certificate_pins(sources, base_dir=None, raw_dir=None):
+    from pins import compute_pins, PinError
+
+    try:
+        return compute_pins([_spec_path(source, base_dir) for source in sources], raw_dir, workers=1)
+    except (OSError, PinError) as error:
+        raise SpecError(f"{error}") from error
+
+
+def certificate_dependencies(spec, base_dir=None):
+    # Files and directories whose content goes into the pins of a spec, directories included so that added or
+    # removed certificates are noticed.
+    from pins import resolve_source, PinError
+
+    raw_dir = _spec_path(spec["raw_dir"], base_dir) if "raw_dir" in spec else None
+    dependencies = set()
+    pending = list(spec.get("domain_configs", []))
+    for variant_spec in spec.get("variants", {}).values():
+        pending.extend(variant_spec.get("domain_configs", []))
+    while pending:
+        domain_config_spec = pending.pop()
+        pending.extend(domain_config_spec.get("domain_configs", []))
+        for source in (domain_config_spec.get("pin_set") or {}).get("certificates", []):
+            source = _spec_path(source, base_dir)
+            if source.startswith("@raw/"):
+                if raw_dir is not None:
+                    dependencies.add(raw_dir)
+            elif os.path.isdir(source):
+                dependencies.add(source)
+            try:
+                dependencies.update(resolve_source(source, raw_dir))
+            except (OSError, PinError):
+                pass
+    return dependencies
+
+
+def build_domain(spec):
+    if isinstance(spec, str):
+        return Domain(spec, True)
+    if "pattern" in spec:
+        try:
+            return DomainPattern(spec["pattern"], spec.get("include_subdomains", True))
+        except ValueError as error:
+            raise SpecError(f"{error}") from error
+    return Domain(spec["name"], spec.get("include_subdomains", True))
+
+
+def build_certificates(spec):
+    if isinstance(spec, str):
+        return Certificates(spec)
+    return Certificates(spec["src"], spec.get("override_pins", False))
@@ -0,0 +1,114 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from batch import main, run_batch, print_report
+from spec import build_config
+
+SPEC = {
+    "cleartext_traffic_permitted": True,
+    "base_config": {"trust_anchors": ["system"]},
+    "domain_configs": [
+        {
+            "domains": ["example.com", {"name": "api.example.com", "include_subdomains": False}],
+            "pin_set": {"expiration": "2027-01-01", "pins": ["pindigest"]},
+            "trust_anchors": [{"src": "@raw/ca", "override_pins": True}],
+            "domain_configs": [{"cleartext_traffic_permitted": True, "domains": ["inner.example.com"]}],
+        }
+    ],
+    "debug_overrides": {"trust_anchors": ["user"]},
+}
+
+TOML_SPEC = '''
+output = "res/xml/network_security_config.xml"
+
+[[domain_configs]]
+domains = ["example.org"]
+'''
+
+
+class BatchTestCase(unittest.TestCase):
+
+    def test_config_built_from_spec(self):
+        config = build_config(SPEC)
+
+        self.assertTrue(config.cleartext_traffic_permitted)
+        self.assertEqual(config.base_config.trust_anchor.certificates[0].src, "system")
+        self.assertEqual(config.debug_overrides.trust_anchor.certificates[0].src, "user")
+
+        domain_config = config.domain_configs[0]
+        self.assertEqual([(domain.domain, domain.include_subdomains) for domain in domain_config.domains],
+                         [("example.com", True), ("api.example.com", False)])
+        self.assertEqual(domain_config.pin_set.expiration, "2027-01-01")
+        self.assertEqual(domain_config.pin_set.pins[0].pin, "pindigest")
+        self.assertTrue(domain_config.trust_anchors.certificates[0].override_pins)
+        self.assertTrue(domain_config.domain_configs[0].cleartext_traffic_permitted)
+
+    def test_batch_writes_all_specs(self):
+        with tempfile.TemporaryDirectory() as directory:
+            spec_dir = os.path.join(directory, "specs")
+            os.makedirs(os.path.join(spec_dir, "nested"))
+            for name in ("first", "second"):
+                with open(os.path.join(spec_dir, f"{name}.json"), "w") as file:
+                    json.dump(SPEC, file)
+            with open(os.path.join(spec_dir, "nested", "third.toml"), "w") as file:
+                file.write(TOML_SPEC)
+            with open(os.path.join(spec_dir, "broken.json"), "w") as file:
+                file.write("{")
+
+            output_dir = os.path.join(directory, "out")
+            results = run_batch([spec_dir], output_dir, workers=2)
+
+            self.assertEqual(len(results), 4)
+            failed = [result for result in results if result.error is not None]
+            self.assertEqual([os.path.basename(result.spec_path) for result in failed], ["broken.json"])
+            self.assertTrue(os.path.exists(os.path.join(output_dir, "first.xml")))
+            self.assertTrue(os.path.exists(os.path.join(output_dir, "second.xml")))
+            self.assertTrue(os.path.exists(os.path.join(spec_dir, "nested", "res", "xml",
+                                                        "network_security_config.xml")))
+
+            with open(os.path.join(output_dir, "first.xml"), "rb") as file:
+                stream = io.BytesIO()
+                build_config(SPEC).write(stream)
+                self.assertEqual(file.read(), stream.getvalue())
+
+            report = io.StringIO()
+            print_report(results, 1.0, report)
+            self.assertIn("Generated 3/4 configs (7 domains)", report.getvalue())
+
+    def test_report_follows_redirected_stdout(self):
+        with tempfile.TemporaryDirectory() as directory:
+            spec_path = os.path.join(directory, "app.json")
+            with open(spec_path, "w", encoding="utf-8") as file:
+                json.dump(SPEC, file)
+            stdout = io.StringIO()
+
+            with contextlib.redirect_stdout(stdout):
+                self.assertEqual(main([spec_path]), 0)
+
+        self.assertIn("Generated 1/1 configs (3 domains)", stdout.getvalue())
+
+    def test_pattern_domains_built_and_counted(self):
+        spec = {"domain_configs": [{"domains": ["example.com", {"pattern": "edge{1..3}.cdn.example.com",
+                                                                "include_subdomains": False}]}]}
+        domain_config = build_config(spec).domain_configs[0]
+
+        self.assertEqual([(domain.domain, domain.include_subdomains) for domain in domain_config.expanded_domains()],
+                         [("example.com", True), ("edge1.cdn.example.com", False), ("edge2.cdn.example.com", False),
+                          ("edge3.cdn.example.com", False)])
+
+        with tempfile.TemporaryDirectory() as directory:
+            spec_path = os.path.join(directory, "patterns.json")
+            with open(spec_path, "w") as file:
+                json.dump(spec, file)
+
+            results = run_batch([spec_path], os.path.join(directory, "out"), workers=1)
+
+            self.assertEqual([(result.error, result.domains) for result in results], [(None, 4)])
+
+
+if __name__ == '__main__':
+    unittest.main()
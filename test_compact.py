@@ -0,0 +1,99 @@
+import io
+import unittest
+
+from compact import size_report
+from config_diff import diff_configs
+from loader import load
+from model import *
+from benchmarks.synthetic import synthetic_config
+
+
+def sample_config():
+    config = NetworkSecConfig()
+    config.add_base_config(BaseConfig())
+    config.base_config.add_certificate(Certificates("system"))
+
+    domain_config = DomainConfig()
+    domain_config.add_domain(Domain("example.com", False))
+    pin_set = PinSet(expiration="2027-01-01")
+    pin_set.add_pin(Pin("pindigest"))
+    domain_config.add_pin_set(pin_set)
+    anchors = TrustAnchors()
+    anchors.add_certificate(Certificates("system"))
+    domain_config.add_trust_anchors(anchors)
+
+    inherited = DomainConfig()
+    inherited.add_domain(Domain("inner.example.com", True))
+    same_pins = PinSet(expiration="2027-01-01")
+    same_pins.add_pin(Pin("pindigest"))
+    inherited.add_pin_set(same_pins)
+    domain_config.add_domain_config(inherited)
+
+    cleartext = DomainConfig(True)
+    cleartext.add_domain(Domain("legacy.example.com", False))
+    still_cleartext = DomainConfig(True)
+    still_cleartext.add_domain(Domain("old.legacy.example.com", False))
+    cleartext.add_domain_config(still_cleartext)
+    domain_config.add_domain_config(cleartext)
+    config.add_domain_config(domain_config)
+    return config
+
+
+def compact(config):
+    stream = io.StringIO()
+    config.write(stream, compact=True)
+    return stream.getvalue()
+
+
+class CompactTestCase(unittest.TestCase):
+
+    def test_defaults_and_inherited_values_left_out(self):
+        self.assertEqual(compact(sample_config()), XML_DECLARATION + (
+            '<network-security-config><base-config><trust-anchors><certificates src="system"/></trust-anchors>'
+            '</base-config><domain-config cleartextTrafficPermitted="false"><domain>example.com</domain>'
+            '<pin-set expiration="2027-01-01">'
+            '<pin digest="SHA-256">pindigest</pin></pin-set><domain-config>'
+            '<domain includeSubdomains="true">inner.example.com</domain></domain-config>'
+            '<domain-config cleartextTrafficPermitted="true"><domain>legacy.example.com</domain><domain-config>'
+            '<domain>old.legacy.example.com</domain></domain-config></domain-config></domain-config>'
+            '</network-security-config>'))
+
+    def test_top_level_cleartext_written_unless_base_config_defines_it(self):
+        # Without cleartextTrafficPermitted="true" on base-config the platform default applies, which is true for
+        # targetSdkVersion 27 and lower, so an explicit "false" has to stay.
+        for base_config in (None, BaseConfig(), BaseConfig(True)):
+            config = NetworkSecConfig()
+            if base_config is not None:
+                config.add_base_config(base_config)
+            for cleartext in (False, True):
+                domain_config = DomainConfig(cleartext)
+                domain_config.add_domain(Domain(f"{cleartext}.example.com", False))
+                config.add_domain_config(domain_config)
+
+            output = compact(config)
+
+            self.assertIn('<domain-config cleartextTrafficPermitted="false">', output)
+            self.assertEqual('<domain-config cleartextTrafficPermitted="true">' in output,
+                             base_config is None or not base_config.cleartext_traffic)
+            self.assertFalse(diff_configs(config, load(io.StringIO(output))))
+
+    def test_compact_output_is_semantically_identical(self):
+        for config in (sample_config(), synthetic_config(2_000, 7, depth=4)):
+            reloaded = load(io.StringIO(compact(config)))
+
+            self.assertFalse(diff_configs(config, reloaded))
+
+    def test_size_report(self):
+        config = synthetic_config(1_000, 10)
+        stream = io.BytesIO()
+        config.write(stream)
+
+        report = size_report(config)
+
+        self.assertEqual(report.bytes_before, len(stream.getvalue()))
+        self.assertEqual(report.bytes_after, len(compact(config).encode("utf-8")))
+        self.assertGreater(report.bytes_saved, report.bytes_before // 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+
+from config_diff import diff_configs, format_diff
+from model import *
+
+
+def build_config(pins=("pindigest",), expiration=None, nested=True, extra_domain=None):
+    config = NetworkSecConfig()
+    base_config = BaseConfig()
+    base_config.add_certificate(Certificates("system"))
+    config.add_base_config(base_config)
+
+    domain_config = DomainConfig()
+    domain_config.add_domain(Domain("example.com", True))
+    pin_set = PinSet(expiration=expiration)
+    pin_set.add_pins(Pin(pin) for pin in pins)
+    domain_config.add_pin_set(pin_set)
+
+    legacy = DomainConfig(cleartext_traffic_permitted=True)
+    legacy.add_domain(Domain("legacy.example.com", False))
+    if nested:
+        domain_config.add_domain_config(legacy)
+    config.add_domain_config(domain_config)
+    if not nested:
+        legacy.add_pin_set(pin_set)
+        config.add_domain_config(legacy)
+
+    if extra_domain is not None:
+        extra = DomainConfig()
+        extra.add_domain(Domain(extra_domain, False))
+        config.add_domain_config(extra)
+    return config
+
+
+class ConfigDiffTestCase(unittest.TestCase):
+
+    def test_restructured_config_without_semantic_change(self):
+        diff = diff_configs(build_config(nested=True), build_config(nested=False))
+
+        self.assertFalse(diff)
+        self.assertEqual(format_diff(diff), "")
+
+    def test_added_and_removed_domains(self):
+        diff = diff_configs(build_config(extra_domain="old.example.org"), build_config(extra_domain="new.example.org"))
+
+        self.assertEqual(list(diff.added), ["new.example.org"])
+        self.assertEqual(list(diff.removed), ["old.example.org"])
+        self.assertEqual(diff.changed, {})
+
+    def test_pin_and_expiration_changes_reported_per_hostname(self):
+        diff = diff_configs(build_config(), build_config(pins=("pindigest", "backup"), expiration="2027-01-01"))
+
+        self.assertEqual(sorted(diff.changed), ["example.com", "legacy.example.com"])
+        changes = diff.changed["legacy.example.com"]
+        self.assertEqual(changes["pins"], {"before": ["pindigest"], "after": ["backup", "pindigest"]})
+        self.assertEqual(changes["expiration"], {"before": None, "after": "2027-01-01"})
+        self.assertIn("~ example.com expiration: None -> 2027-01-01", format_diff(diff))
+
+    def test_cleartext_and_trust_anchor_changes(self):
+        old = build_config()
+        new = build_config()
+        new.domain_configs[0].cleartext_traffic_permitted = True
+        new.base_config.add_certificate(Certificates("user", True))
+
+        diff = diff_configs(old, new)
+
+        self.assertEqual(diff.changed["example.com"]["cleartext_traffic_permitted"],
+                         {"before": False, "after": True})
+        self.assertIn("trust_anchors", diff.changed["example.com"])
+        self.assertIn("trust_anchors", diff.base_config)
+        self.assertEqual(diff.to_dict()["base_config"]["trust_anchors"]["after"],
+                         [{"src": "system", "override_pins": False}, {"src": "user", "override_pins": True}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+@unittest.skipIf(sys.version_info < (3, 12), "config_generator.py requires Python 3.12")
+class ConfigGeneratorTestCase(unittest.TestCase):
+
+    def test_no_color_wizard_writes_config_without_escape_codes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output_path = os.path.join(directory, "network_security_config.xml")
+            answers = ["n", "y", "n", "system user", "y", "n", "example.com", "y", "n", "n", "n", "n", "n", "n",
+                       output_path]
+            result = subprocess.run([sys.executable, "config_generator.py", "--no-color"], cwd=ROOT,
+                                    input="\n".join(answers) + "\n", capture_output=True, text=True)
+
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertNotIn("\033", result.stdout)
+            with open(output_path, encoding="utf-8") as file:
+                self.assertIn('<domain includeSubdomains="true">example.com</domain>', file.read())
+
+    def test_wizard_nests_deeper_than_the_recursion_limit(self):
+        depth = sys.getrecursionlimit() + 500
+        with tempfile.TemporaryDirectory() as directory:
+            output_path = os.path.join(directory, "network_security_config.xml")
+            answers = ["n", "n", "y"]
+            for level in range(depth):
+                answers += ["n", f"level{level}.example.com", "y", "n", "n", "n", "y" if level < depth - 1 else "n"]
+            answers += ["n"] * (depth - 1) + ["n", "n", output_path]
+            result = subprocess.run([sys.executable, "config_generator.py", "--no-color"], cwd=ROOT,
+                                    input="\n".join(answers) + "\n", capture_output=True, text=True)
+
+            self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+            with open(output_path, encoding="utf-8") as file:
+                self.assertEqual(file.read().count("</domain-config>"), depth)
+
+    def test_batch_does_not_import_colorama(self):
+        script = ("import runpy, sys; sys.argv = ['config_generator.py', 'batch', '--help']\n"
+                  "try:\n    runpy.run_path('config_generator.py', run_name='__main__')\n"
+                  "except SystemExit:\n    pass\n"
+                  "print('colorama' in sys.modules, file=sys.stderr)")
+        result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True)
+
+        self.assertEqual(result.stderr.split()[-1], "False")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from client import Client, DaemonError, main as client_main
+from daemon import GenerationService, create_server
+from spec import build_config
+
+SPEC = {
+    "base_config": {"trust_anchors": [{"src": "system"}]},
+    "domain_configs": [
+        {"domains": ["example.com", {"pattern": "edge{1..3}.example.com", "include_subdomains": False}],
+         "pin_set": {"expiration": "2027-01-01", "pins": ["pindigest"]}},
+    ],
+    "variants": {"debug": {"cleartext_traffic_permitted": True}},
+}
+
+
+def expected(spec):
+    stream = io.BytesIO()
+    build_config(spec).write(stream)
+    return stream.getvalue()
+
+
+class DaemonTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.directory, "daemon.sock")
+        self.service = GenerationService(cache_limit=1_000)
+        self.server = create_server(self.service, self.socket_path)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        shutil.rmtree(self.directory)
+
+    def test_generates_from_specs_and_spec_files(self):
+        spec_path = os.path.join(self.directory, "app.json")
+        with open(spec_path, "w", encoding="utf-8") as file:
+            json.dump(SPEC, file)
+
+        with Client(self.socket_path) as client:
+            self.assertEqual(client.generate(SPEC), expected(SPEC))
+            self.assertEqual(client.generate(spec_path=spec_path), expected(SPEC))
+            self.assertIn(b'cleartextTrafficPermitted="true"', client.generate(SPEC, variant="debug"))
+            self.assertIn(b"<domain>edge1.example.com</domain>", client.generate(SPEC, compact=True))
+            with self.assertRaisesRegex(DaemonError, "400: FileNotFoundError"):
+                client.generate(spec_path=os.path.join(self.directory, "missing.json"))
+
+            metrics = client.metrics()
+        self.assertEqual(metrics["requests"], 5)
+        self.assertEqual(metrics["errors"], 1)
+        self.assertGreater(metrics["fragment_cache"]["hits"], 0)
+        self.assertGreaterEqual(metrics["latency_ms"]["max"], metrics["latency_ms"]["p50"])
+
+    def test_concurrent_requests(self):
+        outputs = {}
+
+        def generate(index):
+            spec = dict(SPEC, domain_configs=[{"domains": [f"host{index}.example.com"]}])
+            with Client(self.socket_path) as client:
+                outputs[index] = client.generate(spec) == expected(spec)
+
+        threads = [threading.Thread(target=generate, args=(index,)) for index in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(outputs, {index: True for index in range(8)})
+        self.assertEqual(self.service.metrics.in_flight, 0)
+
+    def test_unexpected_errors_counted(self):
+        with mock.patch.object(self.service, "generate", side_effect=RecursionError("too deep")):
+            with self.assertRaises(RecursionError):
+                self.service.handle(b"{}")
+
+        self.assertEqual(self.service.metrics.in_flight, 0)
+        self.assertEqual(self.service.metrics.errors, 1)
+
+    def test_client_command_line(self):
+        spec_path = os.path.join(self.directory, "app.json")
+        output = os.path.join(self.directory, "app.xml")
+        with open(spec_path, "w", encoding="utf-8") as file:
+            json.dump(SPEC, file)
+
+        self.assertEqual(client_main([spec_path, "-o", output, "--socket", self.socket_path]), 0)
+        with open(output, "rb") as file:
+            self.assertEqual(file.read(), expected(SPEC))
+
+        missing = os.path.join(self.directory, "none.sock")
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            self.assertEqual(client_main([spec_path, "-o", output, "--socket", missing]), 1)
+        self.assertIn("no daemon running", stderr.getvalue())
+        os.remove(output)
+        self.assertEqual(client_main([spec_path, "-o", output, "--socket", missing, "--fallback"]), 0)
+        self.assertTrue(os.path.exists(output))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import asyncio
+import os
+import shutil
+import ssl
+import tempfile
+import unittest
+
+from harvester import harvest_hosts, parse_host, pin_domain_configs, suggested_pin_set, HarvestResult
+from model import *
+from test_pins import OPENSSL, make_certificate, expected_pin
+
+
+def client_context(cafile):
+    context = ssl.create_default_context(cafile=cafile)
+    # Test certificates are minimal, without the extensions strict verification asks for.
+    context.verify_flags &= ~getattr(ssl, "VERIFY_X509_STRICT", 0)
+    return context
+
+
+def ignore_aborted_handshakes(loop, context):
+    # The server side of a handshake the client rejected ends in a reset, which the test's debug-mode loop would log.
+    if not isinstance(context.get("exception"), ConnectionResetError):
+        loop.default_exception_handler(context)
+
+
+@unittest.skipIf(OPENSSL is None, "openssl is required to generate test certificates")
+class HarvesterTestCase(unittest.IsolatedAsyncioTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.ca = make_certificate(cls.directory, "ca", "/CN=Test CA")
+        cls.leaf = make_certificate(cls.directory, "leaf", "/CN=localhost", issuer=cls.ca)
+        cls.other_ca = make_certificate(cls.directory, "other_ca", "/CN=Other CA")
+        cls.chain = os.path.join(cls.directory, "chain.pem")
+        with open(cls.chain, "wb") as chain:
+            for path in (cls.leaf[1], cls.ca[1]):
+                with open(path, "rb") as file:
+                    chain.write(file.read())
+        # openssl runs outside the event loop, so no test step blocks it.
+        cls.leaf_pin = expected_pin(cls.leaf[1])
+        cls.ca_pin = expected_pin(cls.ca[1])
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    async def start_tls_server(self):
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(self.chain, self.leaf[0])
+        self.active = 0
+        self.peak = 0
+
+        async def handle(reader, writer):
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            await reader.read()
+            self.active -= 1
+            writer.close()
+            await writer.wait_closed()
+
+        server = await asyncio.start_server(handle, "localhost", 0, ssl=context)
+        self.addAsyncCleanup(self.stop, server)
+        return server.sockets[0].getsockname()[1]
+
+    async def stop(self, server, connections=()):
+        for writer in connections:
+            writer.close()
+            await writer.wait_closed()
+        server.close()
+        await server.wait_closed()
+
+    async def test_harvests_leaf_and_intermediate_pins_with_bounded_concurrency(self):
+        port = await self.start_tls_server()
+
+        results = await harvest_hosts([f"localhost:{port}"] * 8, concurrency=3,
+                                      ssl_context=client_context(self.ca[1]), timeout=5)
+
+        self.assertTrue(all(result.ok for result in results), [result.error for result in results])
+        self.assertEqual(results[0].pins, [self.leaf_pin, self.ca_pin])
+        self.assertEqual(results[0].attempts, 1)
+        self.assertLessEqual(self.peak, 3)
+
+    async def test_untrusted_certificate_is_not_retried(self):
+        port = await self.start_tls_server()
+        asyncio.get_running_loop().set_exception_handler(ignore_aborted_handshakes)
+
+        result, = await harvest_hosts([f"localhost:{port}"], ssl_context=client_context(self.other_ca[1]), retries=3,
+                                      retry_delay=0)
+
+        self.assertFalse(result.ok)
+        self.assertIn("certificate verification failed", result.error)
+        self.assertEqual(result.attempts, 1)
+
+    async def test_silent_server_times_out_after_retries(self):
+        connections = []
+        server = await asyncio.start_server(lambda reader, writer: connections.append(writer), "localhost", 0)
+        self.addAsyncCleanup(self.stop, server, connections)
+        port = server.sockets[0].getsockname()[1]
+
+        result, = await harvest_hosts([f"localhost:{port}"], ssl_context=client_context(self.ca[1]), timeout=0.2,
+                                      retries=1, retry_delay=0)
+
+        self.assertEqual(result.error, "timed out after 0.2 s")
+        self.assertEqual(result.attempts, 2)
+
+    async def test_pin_domain_configs_adds_suggested_pin_set(self):
+        port = await self.start_tls_server()
+        domain_config = DomainConfig()
+        domain_config.add_domain(Domain("localhost", True))
+
+        results = await asyncio.to_thread(pin_domain_configs, [domain_config], "2027-01-01", port=port,
+                                          ssl_context=client_context(self.ca[1]), timeout=5)
+
+        self.assertTrue(results[0].ok, results[0].error)
+        self.assertEqual(domain_config.pin_set.expiration, "2027-01-01")
+        self.assertEqual([pin.pin for pin in domain_config.pin_set.pins], [self.leaf_pin, self.ca_pin])
+
+
+class HarvestHelpersTestCase(unittest.TestCase):
+
+    def test_parse_host(self):
+        self.assertEqual(parse_host("example.com"), ("example.com", 443))
+        self.assertEqual(parse_host("example.com:8443"), ("example.com", 8443))
+        self.assertEqual(parse_host("[::1]:8443"), ("::1", 8443))
+        self.assertEqual(parse_host("::1", 993), ("::1", 993))
+
+    def test_suggested_pin_set_orders_leaves_before_backup_pins(self):
+        pin_set = suggested_pin_set([HarvestResult("a.example.com", pins=["leafA", "intermediate"]),
+                                     HarvestResult("b.example.com", pins=["leafB", "intermediate", "root"])])
+
+        self.assertEqual([pin.pin for pin in pin_set.pins], ["leafA", "leafB", "intermediate", "root"])
+
+
+if __name__ == '__main__':
+    unittest.main()
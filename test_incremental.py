@@ -0,0 +1,79 @@
+import io
+import os
+import tempfile
+import unittest
+
+from incremental import FragmentCache, serialize, write_incremental
+from model import *
+
+
+def build_config(pin="pindigest"):
+    config = NetworkSecConfig()
+    base_config = BaseConfig()
+    base_config.add_certificate(Certificates("system"))
+    config.add_base_config(base_config)
+    for index in range(3):
+        domain_config = DomainConfig()
+        domain_config.add_domain(Domain(f"host{index}.example.com", True))
+        pin_set = PinSet(expiration="2027-01-01")
+        pin_set.add_pin(Pin(pin if index == 1 else f"pindigest{index}"))
+        domain_config.add_pin_set(pin_set)
+        config.add_domain_config(domain_config)
+    overrides = DebugOverrides()
+    overrides.add_certificate(Certificates("user"))
+    config.add_debug_overrides(overrides)
+    return config
+
+
+class IncrementalTestCase(unittest.TestCase):
+
+    def test_content_hash_follows_content(self):
+        first, second = build_config(), build_config("otherdigest")
+
+        self.assertEqual(first.domain_configs[0].content_hash(), second.domain_configs[0].content_hash())
+        self.assertNotEqual(first.domain_configs[1].content_hash(), second.domain_configs[1].content_hash())
+        self.assertEqual(first.base_config.content_hash(), second.base_config.content_hash())
+        self.assertNotEqual(BaseConfig().content_hash(), DebugOverrides().content_hash())
+
+    def test_serialize_matches_write(self):
+        config = build_config()
+        stream = io.BytesIO()
+        config.write(stream)
+
+        self.assertEqual(serialize(config, FragmentCache()), stream.getvalue())
+
+    def test_only_changed_subtrees_rendered(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache_dir = os.path.join(directory, "cache")
+            output = os.path.join(directory, "network_security_config.xml")
+
+            cache = FragmentCache(cache_dir)
+            self.assertTrue(write_incremental(build_config(), output, cache))
+            self.assertEqual((cache.hits, cache.misses), (0, 5))
+
+            cache = FragmentCache(cache_dir)
+            os.utime(output, ns=(0, 0))
+            self.assertFalse(write_incremental(build_config(), output, cache))
+            self.assertEqual((cache.hits, cache.misses), (5, 0))
+            self.assertEqual(os.stat(output).st_mtime_ns, 0)
+
+            cache = FragmentCache(cache_dir)
+            changed = build_config("otherdigest")
+            self.assertTrue(write_incremental(changed, output, cache))
+            self.assertEqual((cache.hits, cache.misses), (4, 1))
+            with open(output, "rb") as file:
+                stream = io.BytesIO()
+                changed.write(stream)
+                self.assertEqual(file.read(), stream.getvalue())
+
+    def test_memory_bounded_by_limit(self):
+        cache = FragmentCache(limit=2)
+        for key in ("a", "b", "c"):
+            cache.put(key, key)
+
+        self.assertEqual(list(cache.fragments), ["b", "c"])
+        self.assertIsNone(cache.get("a"))
+
+
+if __name__ == '__main__':
+    unittest.main()
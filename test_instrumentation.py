@@ -0,0 +1,105 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from batch import main as batch_main
+from instrumentation import Profiler, add_hook, remove_hook, count_nodes, profile_pipeline
+from loader import load
+from model import *
+from serializers import available_serializers
+
+
+def sample_config():
+    config = NetworkSecConfig()
+    config.add_base_config(BaseConfig())
+    config.base_config.add_certificate(Certificates("system"))
+    domain_config = DomainConfig()
+    domain_config.add_domain(Domain("example.com", True))
+    pin_set = PinSet()
+    pin_set.add_pins([Pin("first"), Pin("second")])
+    domain_config.add_pin_set(pin_set)
+    inner = DomainConfig(True)
+    inner.add_domain(Domain("inner.example.com", False))
+    domain_config.add_domain_config(inner)
+    config.add_domain_config(domain_config)
+    return config
+
+
+class InstrumentationTestCase(unittest.TestCase):
+
+    def test_hooks_see_model_phases(self):
+        calls = []
+
+        @contextlib.contextmanager
+        def hook(name, subject):
+            calls.append(("start", name))
+            yield
+            calls.append(("end", name))
+
+        add_hook(hook)
+        try:
+            stream = io.BytesIO()
+            sample_config().write(stream)
+            stream.seek(0)
+            load(stream).collect()
+        finally:
+            remove_hook(hook)
+        sample_config().write(io.BytesIO())
+
+        self.assertEqual(calls, [("start", "write"), ("start", "fragments"), ("end", "fragments"),
+                                 ("start", "stream.write"), ("end", "stream.write"), ("start", "fragments"),
+                                 ("end", "fragments"), ("end", "write"), ("start", "load"), ("end", "load"),
+                                 ("start", "collect"), ("end", "collect")])
+
+    def test_serializers_report_their_steps(self):
+        expected = {"string": ["fragments", "stream.write"], "etree": ["collect", "indent", "tree.write"],
+                    "lxml": ["collect", "indent", "tree.write"]}
+        for serializer in available_serializers():
+            with Profiler(memory=False) as profiler:
+                sample_config().write(io.BytesIO(), serializer=serializer)
+
+            self.assertEqual(list(profiler.phases), expected[serializer] + ["write"])
+
+    def test_count_nodes(self):
+        self.assertEqual(count_nodes(sample_config()), {
+            "domain-config": 1, "nested domain-config": 1, "domain": 2, "domain pattern": 0, "pin-set": 1, "pin": 2,
+            "trust-anchors": 1, "certificates": 1,
+        })
+
+    def test_profiler_records_time_and_memory_per_phase(self):
+        stream = io.BytesIO()
+        sample_config().write(stream)
+        stream.seek(0)
+
+        profile = profile_pipeline(stream)
+
+        self.assertEqual(list(profile["phases"]),
+                         ["load", "collect", "indent", "tree.write", "write", "fragments", "stream.write"])
+        for name, timing in profile["phases"].items():
+            self.assertEqual(timing["calls"], {"write": 2, "fragments": 2}.get(name, 1))
+            self.assertGreater(timing["seconds"], 0)
+        self.assertGreater(profile["phases"]["load"]["peak_bytes"], 0)
+        self.assertEqual(profile["nodes"]["domain"], 2)
+
+    def test_batch_profile_written_as_json(self):
+        with tempfile.TemporaryDirectory() as directory:
+            spec_path = os.path.join(directory, "app.json")
+            with open(spec_path, "w", encoding="utf-8") as file:
+                json.dump({"domain_configs": [{"domains": ["example.com"], "pin_set": {"pins": ["digest"]}}]}, file)
+            profile_path = os.path.join(directory, "profile.json")
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual(batch_main([spec_path, "--profile", profile_path]), 0)
+
+            with open(profile_path, "r", encoding="utf-8") as file:
+                profile = json.load(file)
+        self.assertEqual(sorted(profile["total"]["phases"]), ["build", "fragments", "stream.write", "write"])
+        self.assertEqual(profile["specs"][spec_path]["nodes"]["pin"], 1)
+        self.assertEqual(Profiler().to_dict(), {"phases": {}, "nodes": {}})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import io
+import unittest
+
+from loader import load, LoadError
+from model import *
+
+
+def serialized(config):
+    stream = io.BytesIO()
+    config.write(stream)
+    return stream.getvalue()
+
+
+class LoaderTestCase(unittest.TestCase):
+
+    def test_load_round_trips(self):
+        config = NetworkSecConfig(True)
+        base_config = BaseConfig(cleartext_traffic_permitted=True)
+        base_config.add_certificate(Certificates("system"))
+        config.add_base_config(base_config)
+
+        domain_config = DomainConfig()
+        domain_config.add_domain(Domain("example.com", True))
+        pin_set = PinSet(expiration="2026-11-10")
+        pin_set.add_pin(Pin("pindigest"))
+        pin_set.add_pin(Pin("pindigest2"))
+        domain_config.add_pin_set(pin_set)
+        trust_anchors = TrustAnchors()
+        trust_anchors.add_certificate(Certificates("@raw/ca", override_pins=True))
+        domain_config.add_trust_anchors(trust_anchors)
+
+        inner_domain_config = DomainConfig(cleartext_traffic_permitted=True)
+        inner_domain_config.add_domain(Domain("inner.example.com", False))
+        innermost_domain_config = DomainConfig()
+        innermost_domain_config.add_domain(Domain("deep.inner.example.com", False))
+        inner_domain_config.add_domain_config(innermost_domain_config)
+        domain_config.add_domain_config(inner_domain_config)
+        config.add_domain_config(domain_config)
+
+        debug_overrides = DebugOverrides()
+        debug_overrides.add_certificate(Certificates("user", override_pins=True))
+        config.add_debug_overrides(debug_overrides)
+
+        loaded = load(io.BytesIO(serialized(config)))
+
+        self.assertEqual(serialized(loaded), serialized(config))
+        self.assertEqual(Et.tostring(loaded.collect()), Et.tostring(config.collect()))
+
+        loaded_domain_config = loaded.domain_configs[0]
+        self.assertEqual(loaded_domain_config.pin_set.expiration, "2026-11-10")
+        self.assertEqual([pin.pin for pin in loaded_domain_config.pin_set.pins], ["pindigest", "pindigest2"])
+        self.assertTrue(loaded_domain_config.trust_anchors.certificates[0].override_pins)
+        self.assertEqual(loaded_domain_config.domain_configs[0].domain_configs[0].domains[0].domain,
+                         "deep.inner.example.com")
+        self.assertTrue(loaded.debug_overrides.trust_anchor.certificates[0].override_pins)
+
+    def test_load_applies_android_defaults(self):
+        loaded = load(io.StringIO(
+            "<network-security-config>"
+            "<domain-config><domain> example.com </domain><pin-set><pin digest=\"SHA-256\">abc</pin></pin-set>"
+            "</domain-config>"
+            "</network-security-config>"))
+
+        domain_config = loaded.domain_configs[0]
+        self.assertFalse(loaded.cleartext_traffic_permitted)
+        self.assertFalse(domain_config.cleartext_traffic_permitted)
+        self.assertEqual(domain_config.domains[0].domain, "example.com")
+        self.assertFalse(domain_config.domains[0].include_subdomains)
+        self.assertIsNone(domain_config.pin_set.expiration)
+
+    def test_load_inherits_base_config_declared_last(self):
+        loaded = load(io.StringIO(
+            "<network-security-config>"
+            "<domain-config><domain>example.com</domain>"
+            "<domain-config><domain>inner.example.com</domain></domain-config>"
+            "<domain-config cleartextTrafficPermitted=\"false\"><domain>secure.example.com</domain>"
+            "<domain-config><domain>api.secure.example.com</domain></domain-config></domain-config>"
+            "</domain-config>"
+            "<base-config cleartextTrafficPermitted=\"true\" />"
+            "</network-security-config>"))
+
+        domain_config = loaded.domain_configs[0]
+        self.assertTrue(domain_config.cleartext_traffic_permitted)
+        self.assertTrue(domain_config.domain_configs[0].cleartext_traffic_permitted)
+        self.assertFalse(domain_config.domain_configs[1].cleartext_traffic_permitted)
+        self.assertFalse(domain_config.domain_configs[1].domain_configs[0].cleartext_traffic_permitted)
+
+    def test_load_rejects_misplaced_elements(self):
+        with self.assertRaises(LoadError):
+            load(io.StringIO("<network-security-config><pin>abc</pin></network-security-config>"))
+        with self.assertRaises(LoadError):
+            load(io.StringIO("<network-security-config>"))
+
+
+if __name__ == '__main__':
+    unittest.main()
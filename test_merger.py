@@ -0,0 +1,135 @@
+import io
+import unittest
+
+from loader import load
+from merger import merge_configs, earliest_expiration
+from model import *
+from resolver import DomainIndex
+
+
+def domain_config(hostname, cleartext=False, pins=(), expiration=None, anchors=(), include_subdomains=True):
+    config = DomainConfig(cleartext)
+    config.add_domain(Domain(hostname, include_subdomains))
+    if pins:
+        pin_set = PinSet(expiration=expiration)
+        pin_set.add_pins(Pin(pin) for pin in pins)
+        config.add_pin_set(pin_set)
+    if anchors:
+        trust_anchors = TrustAnchors()
+        for src, override_pins in anchors:
+            trust_anchors.add_certificate(Certificates(src, override_pins))
+        config.add_trust_anchors(trust_anchors)
+    return config
+
+
+def config_of(*domain_configs, cleartext=False):
+    config = NetworkSecConfig(cleartext)
+    for item in domain_configs:
+        config.add_domain_config(item)
+    return config
+
+
+class MergerTestCase(unittest.TestCase):
+
+    def test_disjoint_configs_are_concatenated(self):
+        merged, report = merge_configs([("app", config_of(domain_config("app.example.com"))),
+                                        ("sdk", config_of(domain_config("sdk.example.com", pins=["a"])))])
+
+        self.assertEqual([config.domains[0].domain for config in merged.domain_configs],
+                         ["app.example.com", "sdk.example.com"])
+        self.assertEqual(report.conflicts, [])
+        self.assertEqual(report.domains, 2)
+
+    def test_pin_sets_merged_with_earliest_expiration(self):
+        merged, report = merge_configs([
+            ("app", config_of(domain_config("api.example.com", pins=["a", "b"], expiration="2027-06-01"))),
+            ("sdk", config_of(domain_config("api.example.com", pins=["b", "c"], expiration="2026-12-31"))),
+        ])
+
+        pin_set = merged.domain_configs[0].pin_set
+        self.assertEqual([pin.pin for pin in pin_set.pins], ["a", "b", "c"])
+        self.assertEqual(pin_set.expiration, "2026-12-31")
+        self.assertEqual(len(merged.domain_configs), 1)
+        self.assertEqual(report.merged_domains, 1)
+        self.assertEqual(earliest_expiration(None, "2026-01-01"), "2026-01-01")
+
+    def test_merged_pins_do_not_widen_other_hostnames(self):
+        app = domain_config("api.example.com", pins=["a"])
+        app.add_domain(Domain("www.example.com", True))
+        app.add_domain(Domain("cdn.example.com", True))
+        merged, report = merge_configs([
+            ("app", config_of(app)),
+            ("sdk", config_of(domain_config("cdn.example.com", pins=["b"], anchors=[("@raw/sdk_ca", False)]))),
+        ])
+
+        index = DomainIndex(merged)
+        for hostname, pins in (("api.example.com", ["a"]), ("www.example.com", ["a"]), ("cdn.example.com", ["a", "b"])):
+            effective = index.resolve(hostname)
+            self.assertEqual([pin.pin for pin in effective.pin_set.pins], pins, hostname)
+        self.assertIsNone(index.resolve("api.example.com").trust_anchors)
+        self.assertEqual([domain.domain for domain in merged.domain_configs[0].domains],
+                         ["api.example.com", "www.example.com"])
+        self.assertEqual(report.conflicts, [])
+
+    def test_merged_pins_kept_when_nested_configs_inherit_them(self):
+        app = domain_config("api.example.com", pins=["a"])
+        app.add_domain_config(domain_config("v1.api.example.com"))
+        merged, report = merge_configs([("app", config_of(app)),
+                                        ("sdk", config_of(domain_config("api.example.com", pins=["b"])))])
+
+        self.assertEqual([pin.pin for pin in merged.domain_configs[0].pin_set.pins], ["a"])
+        self.assertEqual([(conflict.kind, conflict.kept, conflict.discarded) for conflict in report.conflicts],
+                         [("pin-set", ["a"], ["b"])])
+
+    def test_trust_anchors_are_united_and_conflicts_reported(self):
+        merged, report = merge_configs([
+            ("app", config_of(domain_config("api.example.com", anchors=[("@raw/ca", False)]))),
+            ("sdk", config_of(domain_config("API.example.com", cleartext=True,
+                                            anchors=[("@raw/ca", True), ("system", False)],
+                                            include_subdomains=False))),
+        ])
+
+        anchors = merged.domain_configs[0].trust_anchors.certificates
+        self.assertEqual([(certificate.src, certificate.override_pins) for certificate in anchors],
+                         [("@raw/ca", False), ("system", False)])
+        self.assertFalse(merged.domain_configs[0].cleartext_traffic_permitted)
+        self.assertEqual(sorted(conflict.kind for conflict in report.conflicts),
+                         ["cleartextTrafficPermitted", "includeSubdomains", "overridePins"])
+        conflict = report.conflicts[0]
+        self.assertEqual((conflict.kept_by, conflict.discarded_by), ("app", "sdk"))
+
+    def test_nested_configs_and_base_config_merged(self):
+        parent = domain_config("example.com")
+        parent.add_domain_config(domain_config("inner.example.com", cleartext=True))
+        app = config_of(parent)
+        app.add_base_config(BaseConfig())
+        app.base_config.add_certificate(Certificates("system"))
+        sdk = config_of(domain_config("other.example.org"), cleartext=True)
+        sdk.add_base_config(BaseConfig())
+        sdk.base_config.add_certificate(Certificates("user"))
+        sdk.add_debug_overrides(DebugOverrides())
+        sdk.debug_overrides.add_certificate(Certificates("user"))
+
+        merged, report = merge_configs([("app", app), ("sdk", sdk)])
+
+        self.assertEqual(merged.domain_configs[0].domain_configs[0].domains[0].domain, "inner.example.com")
+        self.assertEqual([certificate.src for certificate in merged.base_config.trust_anchor.certificates],
+                         ["system", "user"])
+        self.assertIsNotNone(merged.debug_overrides)
+        self.assertEqual([conflict.where for conflict in report.conflicts], ["network-security-config"])
+        stream = io.BytesIO()
+        merged.write(stream)
+        stream.seek(0)
+        self.assertEqual(len(load(stream).domain_configs), 2)
+
+    def test_inputs_are_not_modified(self):
+        app = config_of(domain_config("api.example.com", pins=["a"]))
+        sdk = config_of(domain_config("api.example.com", pins=["b"]))
+
+        merge_configs([("app", app), ("sdk", sdk)])
+
+        self.assertEqual([pin.pin for pin in app.domain_configs[0].pin_set.pins], ["a"])
+
+
+if __name__ == '__main__':
+    unittest.main()
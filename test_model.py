@@ -1,7 +1,56 @@
+import io
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
 import unittest
 
+from benchmarks.synthetic import synthetic_config
 from model import *
 
+DEEP_NESTING = 10_001
+
+
+def build_sample_config():
+    config = NetworkSecConfig(True)
+
+    base_config = BaseConfig()
+    base_config.add_certificate(Certificates("system"))
+    config.add_base_config(base_config)
+
+    domain_config = DomainConfig()
+    domain_config.add_domain(Domain("www.example.com", True))
+    domain_config.add_domain(Domain("a&b<c>.example.com", False))
+    pin_set = PinSet(expiration="2026-11-10")
+    pin_set.add_pin(Pin("pindigest"))
+    pin_set.add_pin(Pin("pindigest2"))
+    domain_config.add_pin_set(pin_set)
+    trust_anchors = TrustAnchors()
+    trust_anchors.add_certificate(Certificates("@raw/ca", override_pins=True))
+    domain_config.add_trust_anchors(trust_anchors)
+
+    inner_domain_config = DomainConfig(cleartext_traffic_permitted=True)
+    inner_domain_config.add_domain(Domain("inner.example.com", False))
+    inner_domain_config.add_pin_set(PinSet())
+    domain_config.add_domain_config(inner_domain_config)
+    domain_config.add_domain_config(DomainConfig())
+    config.add_domain_config(domain_config)
+
+    debug_overrides = DebugOverrides()
+    debug_overrides.add_certificate(Certificates("user"))
+    config.add_debug_overrides(debug_overrides)
+    config.add_debug_overrides(DebugOverrides())
+    return config
+
+
+def tree_output(config):
+    tree = Et.ElementTree(config.collect())
+    Et.indent(tree, space='\t')
+    stream = io.BytesIO()
+    tree.write(stream, encoding="utf-8", xml_declaration=True)
+    return stream.getvalue()
+
 
 class MyTestCase(unittest.TestCase):
 
@@ -238,6 +287,134 @@ class MyTestCase(unittest.TestCase):
         self.assertEqual(len(network_config_element.findall("base-config")), 1)
         self.assertEqual(len(network_config_element.findall("domain-config")), 1)
 
+    def test_streamed_output_matches_tree_output(self):
+        config = build_sample_config()
+
+        stream = io.BytesIO()
+        config.write(stream)
+
+        self.assertEqual(stream.getvalue(), tree_output(config))
+
+    def test_streamed_output_matches_tree_output_for_empty_config(self):
+        config = NetworkSecConfig()
+
+        stream = io.StringIO()
+        config.write(stream)
+
+        self.assertEqual(stream.getvalue().encode("utf-8"), tree_output(config))
+
+    def test_streamed_output_written_to_file(self):
+        config = build_sample_config()
+
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, "network_security_config.xml")
+            config.write(file_path)
+            with open(file_path, "rb") as file:
+                self.assertEqual(file.read(), tree_output(config))
+
+    def test_model_classes_are_compact(self):
+        for instance in (NetworkSecConfig(), BaseConfig(), DebugOverrides(), DomainConfig(), PinSet(),
+                         Domain("www.example.com", True), TrustAnchors(), Certificates("user"), Pin("pindigest")):
+            self.assertFalse(hasattr(instance, "__dict__"), type(instance).__name__)
+
+    def test_identical_pins_and_certificates_are_shared(self):
+        self.assertIs(Pin("pindigest"), Pin("pindigest"))
+        self.assertIsNot(Pin("pindigest"), Pin("pindigest2"))
+        self.assertIs(Certificates("@raw/ca", True), Certificates("@raw/ca", override_pins=True))
+        self.assertIsNot(Certificates("@raw/ca", True), Certificates("@raw/ca"))
+
+        pin = Pin("pindigest")
+        self.assertIs(pickle.loads(pickle.dumps(pin)), pin)
+        certificates = Certificates("system", True)
+        self.assertIs(pickle.loads(pickle.dumps(certificates)), certificates)
+
+    def test_bulk_adds(self):
+        domain_config = DomainConfig()
+        domain_config.add_domains(Domain(f"host{index}.example.com", False) for index in range(3))
+        pin_set = PinSet()
+        pin_set.add_pins([Pin("pindigest"), Pin("pindigest2")])
+
+        self.assertEqual([domain.domain for domain in domain_config.domains],
+                         ["host0.example.com", "host1.example.com", "host2.example.com"])
+        self.assertEqual([pin.pin for pin in pin_set.pins], ["pindigest", "pindigest2"])
+
+    def test_import_does_not_load_serialization_modules(self):
+        script = ("import sys, model; model.NetworkSecConfig().add_domain_config(model.DomainConfig()); "
+                  "print('xml.etree.ElementTree' in sys.modules, 'hashlib' in sys.modules)")
+        output = subprocess.run([sys.executable, "-c", script], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.split(), ["False", "False"])
+
+    def test_deeply_nested_config_is_written(self):
+        config = NetworkSecConfig()
+        parent = config
+        for index in range(DEEP_NESTING):
+            domain_config = DomainConfig()
+            domain_config.add_domain(Domain(f"level{index}.example.com", False))
+            parent.add_domain_config(domain_config)
+            parent = domain_config
+
+        stream = io.BytesIO()
+        config.write(stream)
+        lines = stream.getvalue().split(b"\n")
+
+        self.assertEqual(len(lines), 2 + 3 * DEEP_NESTING + 1)
+        self.assertEqual(lines[2 * DEEP_NESTING + 1], b"\t" * (DEEP_NESTING + 1) +
+                         f'<domain includeSubdomains="false">level{DEEP_NESTING - 1}.example.com</domain>'.encode())
+        self.assertEqual(lines[2 * DEEP_NESTING + 2], b"\t" * DEEP_NESTING + b"</domain-config>")
+        self.assertEqual(lines[-1], b"</network-security-config>")
+
+    def test_deeply_nested_config_is_collected_and_hashed(self):
+        config = synthetic_config(DEEP_NESTING, domains_per_config=1, depth=DEEP_NESTING)
+
+        root = config.collect()
+        first_hash = config.domain_configs[0].content_hash()
+
+        elements = list(root.iter("domain-config"))
+        self.assertEqual(len(elements), DEEP_NESTING)
+        self.assertEqual(elements[-1].find("domain").text,
+                         f"host{DEEP_NESTING - 1}.example{(DEEP_NESTING - 1) % 97}.com")
+        deepest = config.domain_configs[0]
+        while deepest.domain_configs:
+            deepest = deepest.domain_configs[0]
+        deepest.add_domain(Domain("changed.example.com", False))
+        self.assertNotEqual(config.domain_configs[0].content_hash(), first_hash)
+
+    def test_domain_patterns_expand_lazily(self):
+        pattern = DomainPattern("edge{1..3}.{eu,us}.cdn{08..10}.example.com", False)
+
+        self.assertEqual(len(pattern), 18)
+        self.assertEqual(list(pattern.expand())[:4], ["edge1.eu.cdn08.example.com", "edge1.eu.cdn09.example.com",
+                                                      "edge1.eu.cdn10.example.com", "edge1.us.cdn08.example.com"])
+        self.assertEqual(list(DomainPattern("shard{3..1}.example.com").expand()),
+                         ["shard3.example.com", "shard2.example.com", "shard1.example.com"])
+        self.assertEqual(list(DomainPattern("plain.example.com").expand()), ["plain.example.com"])
+        self.assertFalse(hasattr(pattern, "__dict__"))
+        with self.assertRaises(ValueError):
+            DomainPattern("edge{1-3}.example.com")
+
+    def test_domain_patterns_written_like_explicit_domains(self):
+        config = build_sample_config()
+        explicit = build_sample_config()
+        domain_config = config.domain_configs[0]
+        domain_config.domains.insert(1, DomainPattern("edge{1..120}.cdn.example.com", False))
+        domain_config.domain_configs[0].add_domain(DomainPattern("{eu,us}.example.com"))
+        explicit.domain_configs[0].domains[1:1] = [Domain(f"edge{index}.cdn.example.com", False)
+                                                   for index in range(1, 121)]
+        explicit.domain_configs[0].domain_configs[0].add_domains([Domain("eu.example.com", True),
+                                                                   Domain("us.example.com", True)])
+
+        for compact in (False, True):
+            stream, expected = io.StringIO(), io.StringIO()
+            config.write(stream, compact)
+            explicit.write(expected, compact)
+            self.assertEqual(stream.getvalue(), expected.getvalue())
+        self.assertEqual(tree_output(config), tree_output(explicit))
+        self.assertEqual(domain_config.domain_count(), 122)
+        self.assertEqual([domain.domain for domain in domain_config.expanded_domains()][:2],
+                         ["www.example.com", "edge1.cdn.example.com"])
+        self.assertNotEqual(domain_config.content_hash(), explicit.domain_configs[0].content_hash())
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+
+from model import *
+from optimizer import all_domain_configs, optimize
+from resolver import DomainIndex
+
+HOSTNAMES = ["example.com", "www.example.com", "api.example.com", "v1.api.example.com", "legacy.example.com",
+             "cdn.example.org", "example.org", "static.example.net", "other.com"]
+
+
+def pinned_domain_config(*domains, cleartext_traffic_permitted=False, pin="pindigest"):
+    domain_config = DomainConfig(cleartext_traffic_permitted)
+    for domain, include_subdomains in domains:
+        domain_config.add_domain(Domain(domain, include_subdomains))
+    pin_set = PinSet()
+    pin_set.add_pin(Pin(pin))
+    domain_config.add_pin_set(pin_set)
+    return domain_config
+
+
+def effective_keys(config):
+    index = DomainIndex(config)
+    return [index.resolve(hostname).key() for hostname in HOSTNAMES]
+
+
+class OptimizerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.config = NetworkSecConfig()
+        outer = pinned_domain_config(("example.com", True), ("api.example.com", True))
+        outer.add_domain_config(pinned_domain_config(("legacy.example.com", False), cleartext_traffic_permitted=True))
+        self.config.add_domain_config(outer)
+        self.config.add_domain_config(pinned_domain_config(("www.example.com", False)))
+        self.config.add_domain_config(pinned_domain_config(("example.org", True)))
+        self.config.add_domain_config(pinned_domain_config(("cdn.example.org", False)))
+        self.config.add_domain_config(pinned_domain_config(("example.net", True), pin="otherdigest"))
+
+    def test_optimize_preserves_behavior(self):
+        before = effective_keys(self.config)
+
+        optimize(self.config)
+
+        self.assertEqual(effective_keys(self.config), before)
+
+    def test_optimize_removes_covered_domains_and_merges_configs(self):
+        report = optimize(self.config)
+
+        self.assertEqual(report.domains_removed, 3)
+        self.assertEqual(report.domain_configs_removed, 2)
+        self.assertEqual(report.domain_configs_merged, 0)
+        self.assertLess(report.bytes_after, report.bytes_before)
+
+        domains = sorted(domain.domain for domain_config in self.config.domain_configs
+                         for domain in domain_config.domains)
+        self.assertEqual(domains, ["example.com", "example.net", "example.org"])
+
+    def test_optimize_merges_identical_domain_configs(self):
+        config = NetworkSecConfig()
+        config.add_domain_config(pinned_domain_config(("a.com", True)))
+        config.add_domain_config(pinned_domain_config(("b.com", False)))
+        config.add_domain_config(pinned_domain_config(("c.com", True), cleartext_traffic_permitted=True))
+
+        report = optimize(config)
+
+        self.assertEqual(report.domain_configs_merged, 1)
+        self.assertEqual(len(config.domain_configs), 2)
+        self.assertEqual([domain.domain for domain in config.domain_configs[0].domains], ["a.com", "b.com"])
+
+    def test_domain_config_with_nested_configs_keeps_a_domain(self):
+        config = NetworkSecConfig()
+        outer = pinned_domain_config(("example.com", True))
+        # api.example.com alone is redundant, but its domain-config still carries a nested one.
+        inner = pinned_domain_config(("api.example.com", True))
+        inner.add_domain_config(pinned_domain_config(("v1.api.example.com", False), cleartext_traffic_permitted=True))
+        outer.add_domain_config(inner)
+        config.add_domain_config(outer)
+        before = effective_keys(config)
+
+        report = optimize(config)
+
+        self.assertEqual(report.domains_removed, 0)
+        self.assertEqual([domain_config.domains != [] for domain_config in all_domain_configs(config)],
+                         [True, True, True])
+        self.assertEqual(effective_keys(config), before)
+
+    def test_domain_left_to_platform_defaults_is_kept(self):
+        # Without cleartextTrafficPermitted="true" on base-config the platform default applies, which allows
+        # cleartext up to targetSdkVersion 27, so an explicit DomainConfig(False) is not redundant.
+        for base_config, removed in ((None, 0), (BaseConfig(), 0), (BaseConfig(True), 1)):
+            config = NetworkSecConfig()
+            if base_config is not None:
+                config.add_base_config(base_config)
+            domain_config = DomainConfig(base_config is not None and base_config.cleartext_traffic)
+            domain_config.add_domain(Domain("example.com", True))
+            config.add_domain_config(domain_config)
+
+            report = optimize(config)
+
+            self.assertEqual(report.domains_removed, removed)
+            self.assertEqual(len(config.domain_configs), 1 - removed)
+
+
+if __name__ == '__main__':
+    unittest.main()
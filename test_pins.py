@@ -0,0 +1,158 @@
+import base64
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+
+import pins
+from pins import compute_pins, compute_pin_set, spki_pin, certificates_in, PinCache, PinError
+
+OPENSSL = shutil.which("openssl")
+
+
+def make_certificate(directory, name, subject="/CN=example.com", issuer=None):
+    key = os.path.join(directory, f"{name}.key")
+    certificate = os.path.join(directory, f"{name}.pem")
+    command = [OPENSSL, "req", "-new", "-newkey", "ec", "-pkeyopt", "ec_paramgen_curve:prime256v1", "-nodes",
+               "-keyout", key, "-out", certificate, "-subj", subject, "-days", "30"]
+    if issuer is None:
+        command.insert(2, "-x509")
+        subprocess.run(command, check=True, capture_output=True)
+    else:
+        request = os.path.join(directory, f"{name}.csr")
+        command[command.index("-out") + 1] = request
+        subprocess.run(command, check=True, capture_output=True)
+        issuer_key, issuer_certificate = issuer
+        subprocess.run([OPENSSL, "x509", "-req", "-in", request, "-CA", issuer_certificate, "-CAkey", issuer_key,
+                        "-CAcreateserial", "-out", certificate, "-days", "30"], check=True, capture_output=True)
+    return key, certificate
+
+
+def expected_pin(certificate):
+    public_key = subprocess.run([OPENSSL, "x509", "-in", certificate, "-pubkey", "-noout"], check=True,
+                                capture_output=True).stdout
+    der = subprocess.run([OPENSSL, "pkey", "-pubin", "-outform", "der"], input=public_key, check=True,
+                         capture_output=True).stdout
+    return base64.b64encode(hashlib.sha256(der).digest()).decode("ascii")
+
+
+@unittest.skipIf(OPENSSL is None, "openssl is required to generate test certificates")
+class PinsTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.certificates = os.path.join(cls.directory, "certs")
+        os.makedirs(cls.certificates)
+        cls.ca = make_certificate(cls.certificates, "ca", "/CN=Test CA")
+        cls.leaf = make_certificate(cls.certificates, "leaf", issuer=cls.ca)
+
+        cls.raw_dir = os.path.join(cls.directory, "res", "raw")
+        os.makedirs(cls.raw_dir)
+        with open(cls.leaf[1], "rb") as file:
+            data = file.read()
+        with open(os.path.join(cls.raw_dir, "my_ca.der"), "wb") as file:
+            file.write(certificates_in(data)[0])
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    def test_spki_pin_matches_openssl(self):
+        with open(self.ca[1], "rb") as file:
+            certificate = certificates_in(file.read())[0]
+
+        self.assertEqual(spki_pin(certificate), expected_pin(self.ca[1]))
+
+    def test_compute_pins_from_directories_and_raw_resources(self):
+        pins = compute_pins([self.certificates, "@raw/my_ca", "system"], raw_dir=self.raw_dir, workers=2)
+
+        self.assertEqual([pin.pin for pin in pins], [expected_pin(self.ca[1]), expected_pin(self.leaf[1])])
+
+        pin_set = compute_pin_set(["@raw/my_ca"], expiration="2027-01-01", raw_dir=self.raw_dir)
+        self.assertEqual(pin_set.expiration, "2027-01-01")
+        self.assertEqual([pin.pin for pin in pin_set.pins], [expected_pin(self.leaf[1])])
+
+    def test_cache_reused_until_file_changes(self):
+        cache_dir = os.path.join(self.directory, "cache")
+        path = os.path.join(self.directory, "cached.pem")
+        shutil.copy(self.ca[1], path)
+
+        compute_pins([path], cache_dir=cache_dir)
+        cache = PinCache(cache_dir)
+        self.assertEqual(cache.lookup(path), [expected_pin(self.ca[1])])
+
+        shutil.copy(self.leaf[1], path)
+        os.utime(path, ns=(0, 0))
+        self.assertIsNone(cache.lookup(path))
+        self.assertEqual([pin.pin for pin in compute_pins([path], cache_dir=cache_dir)],
+                         [expected_pin(self.leaf[1])])
+
+    def test_cache_keyed_by_content(self):
+        cache_dir = os.path.join(self.directory, "content_cache")
+        path = os.path.join(self.directory, "replaced.pem")
+        copy = os.path.join(self.directory, "copy.pem")
+        shutil.copy(self.ca[1], path)
+        shutil.copy(self.ca[1], copy)
+        compute_pins([path], cache_dir=cache_dir)
+        stat = os.stat(path)
+
+        # Same path, size and modification time, different content.
+        with open(path, "r+b") as file:
+            file.write(b"\n" * stat.st_size)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        cache = PinCache(cache_dir)
+        self.assertIsNone(cache.lookup(path))
+        self.assertEqual(cache.lookup(copy), [expected_pin(self.ca[1])])
+        self.assertEqual(os.listdir(cache_dir), ["pins.json"])
+
+    def test_memory_cache_bounded(self):
+        cache = PinCache(limit=2)
+        for digest in ("first", "second", "third"):
+            cache.store(digest, [digest])
+
+        self.assertEqual(list(cache.pins), ["second", "third"])
+        self.assertEqual(pins._memory_cache.limit, pins.MEMORY_CACHE_LIMIT)
+
+    def test_memory_cache_shared_by_threads(self):
+        cache = PinCache(limit=8)
+        errors = []
+
+        def store(thread):
+            try:
+                for index in range(20_000):
+                    cache.store(f"{thread}-{index}", [])
+                    cache.get(f"{thread}-{index - 1}")
+            except Exception as error:
+                errors.append(error)
+
+        # Switching threads as often as possible makes two evictions of the same entry likely without the lock.
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            threads = [threading.Thread(target=store, args=(thread,)) for thread in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(cache.pins), 8)
+
+    def test_invalid_certificate_rejected(self):
+        path = os.path.join(self.directory, "invalid.der")
+        with open(path, "wb") as file:
+            file.write(b"\x30\x05\x01")
+
+        with self.assertRaises(PinError):
+            compute_pins([path])
+
+
+if __name__ == '__main__':
+    unittest.main()
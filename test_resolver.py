@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+
+from model import *
+from resolver import DomainIndex
+
+
+class ResolverTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.config = NetworkSecConfig()
+        self.base_config = BaseConfig(cleartext_traffic_permitted=True)
+        self.base_config.add_certificate(Certificates("system"))
+        self.config.add_base_config(self.base_config)
+
+        self.outer = DomainConfig()
+        self.outer.add_domain(Domain("example.com", True))
+        self.pin_set = PinSet()
+        self.pin_set.add_pin(Pin("pindigest"))
+        self.outer.add_pin_set(self.pin_set)
+
+        self.inner = DomainConfig(cleartext_traffic_permitted=True)
+        self.inner.add_domain(Domain("legacy.example.com", False))
+        self.inner_trust_anchors = TrustAnchors()
+        self.inner_trust_anchors.add_certificate(Certificates("@raw/legacy_ca"))
+        self.inner.add_trust_anchors(self.inner_trust_anchors)
+        self.outer.add_domain_config(self.inner)
+
+        self.exact = DomainConfig()
+        self.exact.add_domain(Domain("api.other.com", False))
+        self.config.add_domain_config(self.outer)
+        self.config.add_domain_config(self.exact)
+
+        self.index = DomainIndex(self.config)
+
+    def test_most_specific_domain_wins(self):
+        effective = self.index.resolve("legacy.example.com")
+
+        self.assertIs(effective.domain_config, self.inner)
+        self.assertTrue(effective.cleartext_traffic_permitted)
+        self.assertIs(effective.pin_set, self.pin_set)
+        self.assertIs(effective.trust_anchors, self.inner_trust_anchors)
+
+    def test_include_subdomains_honored(self):
+        self.assertIs(self.index.resolve("example.com").domain_config, self.outer)
+        self.assertIs(self.index.resolve("A.B.Example.COM.").domain_config, self.outer)
+        self.assertIs(self.index.resolve("sub.legacy.example.com").domain_config, self.outer)
+
+        self.assertIs(self.index.resolve("api.other.com").domain_config, self.exact)
+        self.assertIsNone(self.index.resolve("v2.api.other.com").domain_config)
+
+    def test_nested_config_inherits_from_parent_and_base(self):
+        effective = self.index.resolve("www.example.com")
+
+        self.assertFalse(effective.cleartext_traffic_permitted)
+        self.assertIs(effective.pin_set, self.pin_set)
+        self.assertIs(effective.trust_anchors, self.base_config.trust_anchor)
+
+    def test_base_config_is_fallback(self):
+        effective = self.index.resolve("unknown.org")
+
+        self.assertIsNone(effective.domain_config)
+        self.assertTrue(effective.cleartext_traffic_permitted)
+        self.assertIsNone(effective.pin_set)
+        self.assertIs(effective.trust_anchors, self.base_config.trust_anchor)
+
+    def test_domain_patterns_resolved(self):
+        self.exact.add_domain(DomainPattern("edge{1..2000}.cdn.other.com", False))
+        index = DomainIndex(self.config)
+
+        self.assertIs(index.resolve("edge1999.cdn.other.com").domain_config, self.exact)
+        self.assertIsNone(index.resolve("edge2001.cdn.other.com").domain_config)
+
+    def test_resolve_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "hosts.txt")
+            with open(path, "w") as file:
+                file.write("www.example.com\n\nlegacy.example.com\nunknown.org\n")
+
+            results = list(self.index.resolve_file(path))
+
+        self.assertEqual([hostname for hostname, _ in results],
+                         ["www.example.com", "legacy.example.com", "unknown.org"])
+        self.assertEqual([effective.domain_config for _, effective in results], [self.outer, self.inner, None])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import csv
+import datetime
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from model import *
+from scanner import discover, scan, scan_config
+
+TODAY = datetime.date(2026, 1, 1)
+
+
+def sample_config():
+    config = NetworkSecConfig()
+    config.add_base_config(BaseConfig())
+    config.base_config.add_certificate(Certificates("@raw/corp_ca", override_pins=True))
+
+    expiring = DomainConfig()
+    expiring.add_domain(Domain("api.example.com", True))
+    pin_set = PinSet(expiration="2026-01-20")
+    pin_set.add_pin(Pin("pindigest"))
+    expiring.add_pin_set(pin_set)
+
+    cleartext = DomainConfig(cleartext_traffic_permitted=True)
+    cleartext.add_domain(Domain("legacy.example.com", False))
+    later = PinSet(expiration="2027-01-01")
+    later.add_pin(Pin("otherdigest"))
+    cleartext.add_pin_set(later)
+    expiring.add_domain_config(cleartext)
+    config.add_domain_config(expiring)
+
+    config.add_debug_overrides(DebugOverrides())
+    config.debug_overrides.add_certificate(Certificates("user", override_pins=True))
+    return config
+
+
+class ScannerTestCase(unittest.TestCase):
+
+    def test_findings_follow_model_semantics(self):
+        findings, domains = scan_config(sample_config(), "config.xml", days=30, today=TODAY)
+
+        self.assertEqual(domains, 2)
+        self.assertEqual([(finding.kind, finding.location) for finding in findings], [
+            ("override-pins", "network-security-config/base-config"),
+            ("expiring-pin-set", "network-security-config/domain-config[0]/pin-set"),
+            ("cleartext", "network-security-config/domain-config[0]/domain-config[0]"),
+        ])
+        self.assertEqual(findings[1].domains, ["api.example.com"])
+        self.assertEqual(findings[1].detail, "expires 2026-01-20 (in 19 days)")
+
+    def test_scan_discovers_and_aggregates_in_parallel(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for module in ("app", "sdk", "build"):
+                xml = os.path.join(directory, module, "src", "main", "res", "xml")
+                os.makedirs(xml)
+                sample_config().write(os.path.join(xml, "network_security_config.xml"))
+            with open(os.path.join(directory, "sdk", "network_security_config_broken.xml"), "w") as file:
+                file.write("<network-security-config>")
+
+            self.assertEqual(len(discover([directory])), 3)
+            report = scan([directory], days=30, today=TODAY, workers=2)
+
+            summary = report.summary()
+            self.assertEqual(summary["files"], 3)
+            self.assertEqual(summary["findings"], {"override-pins": 2, "expiring-pin-set": 2, "cleartext": 2})
+            self.assertEqual(list(report.errors), [os.path.join(directory, "sdk", "network_security_config_broken.xml")])
+
+            stream = io.StringIO()
+            report.write_json(stream)
+            self.assertEqual(len(json.loads(stream.getvalue())["findings"]), 6)
+            stream = io.StringIO()
+            report.write_csv(stream)
+            rows = list(csv.DictReader(io.StringIO(stream.getvalue())))
+            self.assertEqual(rows[1]["domains"], "api.example.com")
+
+
+if __name__ == '__main__':
+    unittest.main()
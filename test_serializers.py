@@ -0,0 +1,75 @@
+import io
+import os
+import sys
+import unittest
+from unittest import mock
+
+from benchmarks.synthetic import synthetic_config
+from model import *
+from serializers import ENVIRONMENT_VARIABLE, LxmlSerializer, SerializerError, available_serializers, get_serializer
+from test_model import build_sample_config
+
+
+def written(config, serializer):
+    stream = io.BytesIO()
+    config.write(stream, serializer=serializer)
+    return stream.getvalue()
+
+
+def sample_configs():
+    patterns = build_sample_config()
+    patterns.domain_configs[0].add_domain(DomainPattern("edge{1..20}.{eu,us}.example.com", False))
+    return [build_sample_config(), NetworkSecConfig(), patterns, synthetic_config(2_000, 7, depth=4)]
+
+
+class SerializersTestCase(unittest.TestCase):
+
+    def test_etree_output_identical_to_string_output(self):
+        for config in sample_configs():
+            self.assertEqual(written(config, "etree"), written(config, "string"))
+
+    @unittest.skipUnless("lxml" in available_serializers(), "lxml is not installed")
+    def test_lxml_output_equivalent_to_string_output(self):
+        for config in sample_configs():
+            expected = written(config, "string")
+            output = written(config, "lxml")
+
+            # lxml writes empty elements without the space before "/>", nothing else differs.
+            self.assertEqual(output, expected.replace(b" />", b"/>"))
+            self.assertEqual(Et.canonicalize(output.decode("utf-8")), Et.canonicalize(expected.decode("utf-8")))
+
+    @unittest.skipUnless("lxml" in available_serializers(), "lxml is not installed")
+    def test_collect_into_lxml_tree(self):
+        from lxml import etree
+
+        root = build_sample_config().collect(serializer="lxml")
+
+        self.assertTrue(etree.iselement(root))
+        self.assertEqual(etree.tostring(root), Et.tostring(build_sample_config().collect()).replace(b" />", b"/>"))
+
+    def test_automatic_choice_and_overrides(self):
+        with mock.patch.dict(os.environ, {ENVIRONMENT_VARIABLE: "etree"}):
+            self.assertEqual(get_serializer().name, "etree")
+            self.assertEqual(get_serializer("string").name, "string")
+        with mock.patch.dict(os.environ):
+            os.environ.pop(ENVIRONMENT_VARIABLE, None)
+            self.assertEqual(get_serializer().name, "string")
+        serializer = get_serializer("etree")
+        self.assertIs(get_serializer(serializer), serializer)
+        with self.assertRaises(SerializerError):
+            get_serializer("minidom")
+
+    def test_missing_lxml_reported(self):
+        with mock.patch.dict(sys.modules, {"lxml": None}):
+            with self.assertRaises(SerializerError):
+                LxmlSerializer()
+
+    def test_compact_and_trees_only_where_supported(self):
+        with self.assertRaises(SerializerError):
+            build_sample_config().write(io.StringIO(), compact=True, serializer="etree")
+        with self.assertRaises(SerializerError):
+            build_sample_config().collect(serializer="string")
+
+
+if __name__ == '__main__':
+    unittest.main()
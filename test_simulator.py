@@ -0,0 +1,137 @@
+import datetime
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import simulator
+from model import *
+from simulator import simulate, MISMATCH, OVERRIDDEN, EXPIRED, PINNED, UNPINNED
+from test_pins import OPENSSL, make_certificate, expected_pin
+
+TODAY = datetime.date(2026, 6, 1)
+
+
+def read(path):
+    with open(path, "rb") as file:
+        return file.read()
+
+
+@unittest.skipIf(OPENSSL is None, "openssl is required to generate test certificates")
+class SimulatorTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        certificates = os.path.join(cls.directory, "certificates")
+        os.makedirs(certificates)
+        cls.ca = make_certificate(certificates, "ca", "/CN=Pinned CA")
+        cls.rogue = make_certificate(certificates, "rogue", "/CN=Rogue CA")
+        cls.corp = make_certificate(certificates, "corp", "/CN=Corp Proxy CA")
+        leaf = make_certificate(certificates, "leaf", "/CN=api.example.com", cls.ca)
+        rogue_leaf = make_certificate(certificates, "rogue_leaf", "/CN=cdn.api.example.com", cls.rogue)
+        corp_leaf = make_certificate(certificates, "corp_leaf", "/CN=corp.example.com", cls.corp)
+
+        cls.raw_dir = os.path.join(cls.directory, "raw")
+        os.makedirs(cls.raw_dir)
+        shutil.copy(cls.corp[1], os.path.join(cls.raw_dir, "corp_ca.pem"))
+
+        cls.corpus = os.path.join(cls.directory, "corpus")
+        chains = {
+            "api.example.com/first.pem": (leaf, cls.ca),
+            "api.example.com/second.pem": (leaf, cls.ca),
+            "cdn.api.example.com.pem": (rogue_leaf, cls.rogue),
+            "legacy.example.com.pem": (rogue_leaf, cls.rogue),
+            "corp.example.com.pem": (corp_leaf, cls.corp),
+            "other.example.org.pem": (rogue_leaf, cls.rogue),
+        }
+        for name, chain in chains.items():
+            path = os.path.join(cls.corpus, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as file:
+                file.write(b"".join(read(certificate) for _, certificate in chain))
+        with open(os.path.join(cls.corpus, "broken.example.com.pem"), "wb") as file:
+            file.write(b"-----BEGIN CERTIFICATE-----\nAAAA\n-----END CERTIFICATE-----\n")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    def build_config(self):
+        config = NetworkSecConfig()
+        config.add_base_config(BaseConfig())
+        config.base_config.add_certificate(Certificates("system"))
+
+        pinned = DomainConfig()
+        pinned.add_domain(Domain("api.example.com", True))
+        pin_set = PinSet(expiration="2027-01-01")
+        pin_set.add_pin(Pin(expected_pin(self.ca[1])))
+        pinned.add_pin_set(pin_set)
+        config.add_domain_config(pinned)
+
+        legacy = DomainConfig()
+        legacy.add_domain(Domain("legacy.example.com", False))
+        expired = PinSet(expiration="2026-01-01")
+        expired.add_pin(Pin(expected_pin(self.ca[1])))
+        legacy.add_pin_set(expired)
+        config.add_domain_config(legacy)
+
+        corp = DomainConfig()
+        corp.add_domain(Domain("corp.example.com", False))
+        corp.add_pin_set(pin_set)
+        anchors = TrustAnchors()
+        anchors.add_certificate(Certificates("@raw/corp_ca", override_pins=True))
+        corp.add_trust_anchors(anchors)
+        config.add_domain_config(corp)
+        return config
+
+    def test_chains_checked_against_effective_config(self):
+        report = simulate(self.build_config(), self.corpus, TODAY, workers=2, raw_dir=self.raw_dir, batch_size=2)
+
+        outcomes = {domain: report.domains[domain].outcomes for domain in report.domains}
+        self.assertEqual(outcomes, {
+            "api.example.com": {PINNED: 2, MISMATCH: 1},
+            "base-config": {UNPINNED: 1},
+            "corp.example.com": {OVERRIDDEN: 1},
+            "legacy.example.com": {EXPIRED: 1},
+        })
+        self.assertEqual([domain.domain for domain in report.failing], ["api.example.com"])
+        self.assertEqual(report.domains["api.example.com"].failing_hosts, {"cdn.api.example.com"})
+        self.assertEqual(list(report.errors), [os.path.join(self.corpus, "broken.example.com.pem")])
+        self.assertEqual(report.warnings, [])
+
+        summary = report.summary()
+        self.assertEqual((summary["chains"], summary["failing_domains"], summary["failed_chains"]), (6, 1, 1))
+        stream = io.StringIO()
+        report.write_json(stream)
+        self.assertEqual(json.loads(stream.getvalue())["domains"][0]["status"], "fail")
+
+    def test_before_expiration_pins_enforced(self):
+        report = simulate(self.build_config(), self.corpus, datetime.date(2025, 12, 1), workers=1)
+
+        self.assertEqual(report.domains["legacy.example.com"].outcomes, {MISMATCH: 1})
+        # Without the res/raw directory the overridePins anchor cannot be read and does not apply.
+        self.assertEqual(report.domains["corp.example.com"].outcomes, {MISMATCH: 1})
+        self.assertEqual(len(report.warnings), 1)
+
+    def test_pins_not_enforced_on_expiration_date(self):
+        for today, outcome in ((datetime.date(2025, 12, 31), MISMATCH), (datetime.date(2026, 1, 1), EXPIRED)):
+            report = simulate(self.build_config(), self.corpus, today, workers=1)
+
+            self.assertEqual(report.domains["legacy.example.com"].outcomes, {outcome: 1})
+
+    def test_certificates_hashed_once(self):
+        simulator._pin_cache.clear()
+        path = os.path.join(self.corpus, "api.example.com", "first.pem")
+
+        pins = simulator.chain_pins(path)
+        self.assertEqual(pins, [expected_pin(certificate) for certificate in
+                                (os.path.join(self.directory, "certificates", "leaf.pem"), self.ca[1])])
+        simulator.chain_pins(os.path.join(self.corpus, "api.example.com", "second.pem"))
+        self.assertEqual(len(simulator._pin_cache), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
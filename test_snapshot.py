@@ -0,0 +1,104 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from benchmarks.synthetic import synthetic_config
+from instrumentation import Profiler, count_nodes
+from model import *
+from serializers import ENVIRONMENT_VARIABLE, available_serializers
+from resolver import DomainIndex, describe
+from snapshot import Snapshot, SnapshotError, dumps, save, VERSION
+from test_model import build_sample_config
+
+
+def xml(config):
+    stream = io.StringIO()
+    config.write(stream)
+    return stream.getvalue()
+
+
+class SnapshotTestCase(unittest.TestCase):
+
+    def test_snapshot_round_trips_the_model(self):
+        for config in (build_sample_config(), NetworkSecConfig(), synthetic_config(500, 7, depth=4)):
+            snapshot = Snapshot(dumps(config))
+
+            self.assertEqual(xml(snapshot.to_config()), xml(config))
+            stream = io.StringIO()
+            snapshot.write(stream)
+            self.assertEqual(stream.getvalue(), xml(config))
+
+    def test_snapshot_written_under_every_serializer(self):
+        config = synthetic_config(200, 7, depth=3)
+        snapshot = Snapshot(dumps(config))
+        expected = xml(config)
+        for serializer in available_serializers():
+            with mock.patch.dict(os.environ, {ENVIRONMENT_VARIABLE: serializer}):
+                stream = io.StringIO()
+                snapshot.write(stream)
+
+                self.assertEqual(stream.getvalue(), expected, serializer)
+
+    def test_snapshot_write_profiled(self):
+        config = synthetic_config(50, 3, depth=3)
+        with Profiler(memory=False) as profiler:
+            Snapshot(dumps(config)).write(io.BytesIO())
+
+        self.assertEqual(profiler.nodes, count_nodes(config))
+        self.assertEqual(profiler.phases["write"]["calls"], 1)
+
+    def test_snapshot_is_memory_mapped_from_file(self):
+        config = synthetic_config(1000, 10)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "config.snapshot")
+            save(config, path)
+            self.assertLess(os.path.getsize(path), len(xml(config).encode("utf-8")))
+
+            with Snapshot.open(path) as snapshot:
+                self.assertEqual(snapshot.domain_config_count, 100)
+                self.assertEqual(snapshot.domain_count, 1000)
+                self.assertEqual(snapshot.domain_config(3).domains[0].domain, "host30.example30.com")
+                self.assertEqual(snapshot.children(), list(range(100)))
+                output = os.path.join(directory, "network_security_config.xml")
+                snapshot.write(output)
+            with open(output, encoding="utf-8") as file:
+                self.assertEqual(file.read(), xml(config))
+
+    def test_resolve_matches_domain_index(self):
+        config = synthetic_config(300, 6, depth=3)
+        duplicate = DomainConfig(cleartext_traffic_permitted=True)
+        duplicate.add_domain(Domain("HOST7.example7.com", True))
+        config.add_domain_config(duplicate)
+        index = DomainIndex(config)
+        snapshot = Snapshot(dumps(config))
+
+        for hostname in ("host0.example0.com", "a.host0.example0.com", "a.host1.example1.com", "host7.example7.com",
+                         "x.host7.example7.com", "host299.example8.com.", "unknown.example.org", ""):
+            expected = index.resolve(hostname)
+            effective = snapshot.resolve(hostname)
+            self.assertEqual(effective.key(), expected.key(), hostname)
+            self.assertEqual(describe(effective), describe(expected), hostname)
+
+    def test_invalid_snapshots_are_rejected(self):
+        data = dumps(build_sample_config())
+
+        with self.assertRaisesRegex(SnapshotError, "not a network security config snapshot"):
+            Snapshot(b"<?xml" + data[5:])
+        with self.assertRaisesRegex(SnapshotError, f"unsupported snapshot version {VERSION + 1}"):
+            Snapshot(data[:8] + (VERSION + 1).to_bytes(2, "little") + data[10:])
+        with self.assertRaisesRegex(SnapshotError, "truncated"):
+            Snapshot(data[:-4])
+
+        config = NetworkSecConfig()
+        domain_config = DomainConfig()
+        domain_config.add_domain(Domain("bad\0.example.com", False))
+        config.add_domain_config(domain_config)
+        with self.assertRaisesRegex(SnapshotError, "NUL"):
+            dumps(config)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from benchmarks.suite import compare, main
+
+ARGS = ["--domains", "200", "--domains-per-config", "20", "--repeat", "1"]
+
+
+def results(**seconds):
+    return {"phases": {name: {"seconds": value, "peak_bytes": 0} for name, value in seconds.items()}}
+
+
+class SuiteTestCase(unittest.TestCase):
+
+    def test_within_threshold_passes(self):
+        self.assertEqual(compare(results(build=1.05, write=0.5), results(build=1.0, write=0.6), 10.0), [])
+
+    def test_over_threshold_reported(self):
+        regressions = compare(results(build=1.2, write=0.5), results(build=1.0, write=0.5), 10.0)
+
+        self.assertEqual([(name, before, after) for name, before, after, _ in regressions], [("build", 1.0, 1.2)])
+        self.assertAlmostEqual(regressions[0][3], 20.0)
+
+    def test_phase_missing_from_baseline_skipped(self):
+        self.assertEqual(compare(results(build=2.0, stream=5.0), results(build=2.0), 10.0), [])
+        self.assertEqual(compare(results(build=2.0), {}, 10.0), [])
+
+    def test_exit_status_against_baseline(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "results.json")
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual(main(ARGS + ["-o", output]), 0)
+            with open(output, "r", encoding="utf-8") as file:
+                recorded = json.load(file)
+
+            for scale, status in ((1000.0, 0), (1e-6, 1)):
+                baseline = dict(recorded, phases={name: dict(timing, seconds=timing["seconds"] * scale)
+                                                  for name, timing in recorded["phases"].items()})
+                baseline_path = os.path.join(directory, "baseline.json")
+                with open(baseline_path, "w", encoding="utf-8") as file:
+                    json.dump(baseline, file)
+                stderr = io.StringIO()
+
+                with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(stderr):
+                    self.assertEqual(main(ARGS + ["--baseline", baseline_path]), status)
+
+                self.assertEqual("REGRESSION" in stderr.getvalue(), bool(status))
+
+
+if __name__ == '__main__':
+    unittest.main()
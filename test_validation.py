@@ -0,0 +1,130 @@
+import unittest
+
+from benchmarks.synthetic import synthetic_config, synthetic_pin
+from model import *
+from validation import Validator, ValidationError
+
+PIN = synthetic_pin(0)
+BACKUP_PIN = synthetic_pin(1)
+
+
+def pinned_domain_config(*domains, pins=(PIN, BACKUP_PIN), expiration="2027-01-01"):
+    domain_config = DomainConfig()
+    domain_config.add_domains(Domain(domain, True) for domain in domains)
+    pin_set = PinSet(expiration=expiration)
+    pin_set.add_pins(Pin(pin) for pin in pins)
+    domain_config.add_pin_set(pin_set)
+    return domain_config
+
+
+class ValidationTestCase(unittest.TestCase):
+
+    def test_valid_config_passes(self):
+        config = NetworkSecConfig()
+        base_config = BaseConfig()
+        base_config.add_certificate(Certificates("system"))
+        config.add_base_config(base_config)
+        domain_config = pinned_domain_config("example.com", "API.example.com")
+        trust_anchors = TrustAnchors()
+        trust_anchors.add_certificate(Certificates("@raw/my_ca", override_pins=True))
+        domain_config.add_trust_anchors(trust_anchors)
+        domain_config.add_domain_config(pinned_domain_config("legacy_host.example.org"))
+        config.add_domain_config(domain_config)
+
+        validator = Validator()
+        root = config.collect(validator)
+
+        self.assertEqual(validator.errors, [])
+        self.assertEqual(validator.warnings, [])
+        self.assertEqual(len(root.findall("domain-config")), 1)
+        validator.raise_for_errors()
+
+    def test_all_errors_reported_with_paths(self):
+        config = NetworkSecConfig()
+        config.add_domain_config(pinned_domain_config("example.com", "bad..example.com", "-bad.example.com",
+                                                      pins=(PIN, "notapin", PIN[:-2] + "B="),
+                                                      expiration="10-11-2026"))
+        inner = pinned_domain_config("EXAMPLE.com")
+        trust_anchors = TrustAnchors()
+        trust_anchors.add_certificate(Certificates("/sdcard/ca.pem"))
+        inner.add_trust_anchors(trust_anchors)
+        config.domain_configs[0].add_domain_config(inner)
+        config.add_domain_config(DomainConfig())
+
+        validator = Validator()
+        config.collect(validator)
+
+        self.assertEqual([str(error).split(":")[0] for error in validator.errors], [
+            "network-security-config/domain-config[1]",
+            "network-security-config/domain-config[0]/domain[1]",
+            "network-security-config/domain-config[0]/domain[2]",
+            "network-security-config/domain-config[0]/domain-config[0]/domain[0]",
+            "network-security-config/domain-config[0]/pin-set",
+            "network-security-config/domain-config[0]/pin-set/pin[1]",
+            "network-security-config/domain-config[0]/pin-set/pin[2]",
+            "network-security-config/domain-config[0]/domain-config[0]/trust-anchors/certificates[0]",
+        ])
+        self.assertIn("first declared at network-security-config/domain-config[0]/domain[0]",
+                      validator.errors[3].message)
+        with self.assertRaises(ValidationError) as context:
+            validator.raise_for_errors()
+        self.assertEqual(len(context.exception.errors), 8)
+
+    def test_empty_first_and_last_domains_rejected(self):
+        for domains in (("", "example.com", "example.org"), ("example.com", "example.org", "")):
+            config = NetworkSecConfig()
+            config.add_domain_config(pinned_domain_config(*domains))
+
+            validator = Validator()
+            config.collect(validator)
+
+            self.assertEqual([str(error).split(":")[0] for error in validator.errors],
+                             [f"network-security-config/domain-config[0]/domain[{domains.index('')}]"])
+
+    def test_label_length_and_pattern_expansions_checked(self):
+        domain_config = pinned_domain_config(f"{'a' * 63}.{'b' * 63}.example.com", f"{'a' * 64}.example.com")
+        domain_config.add_domain(DomainPattern("host{0..4999}.example.com"))
+        domain_config.add_domain(Domain("bad-.example.com", True))
+        config = NetworkSecConfig()
+        config.add_domain_config(domain_config)
+
+        validator = Validator()
+        config.collect(validator)
+
+        self.assertEqual([str(error).split(":")[0] for error in validator.errors], [
+            "network-security-config/domain-config[0]/domain[1]",
+            "network-security-config/domain-config[0]/domain[5002]",
+        ])
+
+    def test_pin_set_without_backup_pin_warns(self):
+        config = NetworkSecConfig()
+        config.add_domain_config(pinned_domain_config("a.example.com", pins=(PIN,)))
+        config.add_domain_config(pinned_domain_config("b.example.com", pins=(PIN, PIN)))
+        config.add_domain_config(pinned_domain_config("c.example.com"))
+
+        validator = Validator()
+        config.collect(validator)
+
+        self.assertEqual(validator.errors, [])
+        self.assertEqual([warning.path for warning in validator.warnings],
+                         ["network-security-config/domain-config[0]/pin-set",
+                          "network-security-config/domain-config[1]/pin-set"])
+
+    def test_deeply_nested_config_reports_full_path(self):
+        depth = 12_000
+        config = synthetic_config(depth, domains_per_config=1, depth=depth)
+        deepest = config.domain_configs[0]
+        while deepest.domain_configs:
+            deepest = deepest.domain_configs[0]
+        deepest.add_domain(Domain("host0.example0.com", False))
+
+        validator = Validator()
+        config.collect(validator)
+
+        error, = validator.errors
+        self.assertEqual(error.path, "network-security-config" + "/domain-config[0]" * depth + "/domain[1]")
+        self.assertIn("first declared at network-security-config/domain-config[0]/domain[0]", error.message)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from batch import run_batch
+from incremental import FragmentCache
+from model import *
+from spec import build_variants
+from variants import Overlay, SharedRenderer, VariantError, write_variants
+
+SPEC = {
+    "base_config": {"trust_anchors": ["system"]},
+    "domain_configs": [
+        {"domains": ["example.com"], "pin_set": {"pins": ["pindigest"]},
+         "domain_configs": [{"domains": ["inner.example.com"]}]},
+        {"domains": ["api.example.com"]},
+    ],
+    "variants": {
+        "release": {},
+        "staging": {"domain_configs": [{"match": "inner.example.com", "cleartext_traffic_permitted": True},
+                                       {"domains": ["staging.example.com"]}]},
+        "debug": {"cleartext_traffic_permitted": True, "debug_overrides": {"trust_anchors": ["user"]},
+                  "domain_configs": [{"match": "api.example.com", "remove": True}]},
+    },
+}
+
+
+def written(config):
+    stream = io.StringIO()
+    config.write(stream)
+    return stream.getvalue()
+
+
+class VariantsTestCase(unittest.TestCase):
+
+    def test_unchanged_subtrees_are_shared(self):
+        variants = build_variants(SPEC)
+        release, staging, debug = variants["release"], variants["staging"], variants["debug"]
+
+        self.assertIs(staging.base_config, release.base_config)
+        self.assertIs(staging.domain_configs[1], release.domain_configs[1])
+        self.assertIsNot(staging.domain_configs[0], release.domain_configs[0])
+        self.assertIs(staging.domain_configs[0].pin_set, release.domain_configs[0].pin_set)
+        self.assertTrue(staging.domain_configs[0].domain_configs[0].cleartext_traffic_permitted)
+        self.assertFalse(release.domain_configs[0].domain_configs[0].cleartext_traffic_permitted)
+        self.assertEqual(len(debug.domain_configs), 1)
+        self.assertIs(debug.domain_configs[0], release.domain_configs[0])
+        self.assertIsNotNone(debug.debug_overrides)
+        self.assertIsNone(release.debug_overrides)
+
+    def test_shared_rendering_matches_separate_writes(self):
+        variants = build_variants(SPEC)
+        with tempfile.TemporaryDirectory() as directory:
+            renderer = SharedRenderer(FragmentCache())
+            outputs = {os.path.join(directory, f"{name}.xml"): config for name, config in variants.items()}
+
+            self.assertEqual(sorted(write_variants(outputs, renderer)), sorted(outputs))
+            for path, config in outputs.items():
+                with open(path, "r", encoding="utf-8") as file:
+                    self.assertEqual(file.read(), written(config))
+        self.assertGreater(renderer.hits, 0)
+
+    def test_deeply_nested_patch_shares_unchanged_children(self):
+        config = NetworkSecConfig()
+        container = config.domain_configs
+        for depth in range(4):
+            for sibling in ("a", "b"):
+                domain_config = DomainConfig()
+                domain_config.add_domain(Domain(f"{sibling}{depth}.example.com", False))
+                container.append(domain_config)
+            container = container[0].domain_configs
+        overlay = Overlay()
+        overlay.patch_domain_config("a3.example.com", cleartext_traffic_permitted=True)
+        variant = overlay.apply(config)
+        renderer = SharedRenderer()
+
+        self.assertEqual("".join(config.fragments(render=renderer.render)), "".join(config.fragments()))
+        self.assertEqual(renderer.misses, 8)
+        renderer.hits = renderer.misses = 0
+        self.assertEqual("".join(variant.fragments(render=renderer.render)), "".join(variant.fragments()))
+        # Only the three copied parents and the patched domain-config are rendered again, one unchanged sibling is
+        # reused on every level.
+        self.assertEqual((renderer.misses, renderer.hits), (4, 4))
+
+    def test_unknown_match_rejected(self):
+        overlay = Overlay()
+        overlay.patch_domain_config("missing.example.com", cleartext_traffic_permitted=True)
+
+        with self.assertRaises(VariantError):
+            overlay.apply(NetworkSecConfig())
+
+    def test_batch_writes_every_variant(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "app.json"), "w", encoding="utf-8") as file:
+                json.dump(SPEC, file)
+
+            results = run_batch([directory], os.path.join(directory, "out"), workers=1)
+
+            self.assertIsNone(results[0].error)
+            self.assertEqual(sorted(os.listdir(os.path.join(directory, "out"))),
+                             ["app-debug.xml", "app-release.xml", "app-staging.xml"])
+
+
+if __name__ == '__main__':
+    unittest.main()
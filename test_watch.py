@@ -0,0 +1,125 @@
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from test_pins import OPENSSL, make_certificate, expected_pin
+from watch import Watcher
+
+
+def write_spec(path, spec):
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(spec, file)
+    # Make sure the change is visible even on file systems with coarse modification times.
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def read(path):
+    with open(path, "r", encoding="utf-8") as file:
+        return file.read()
+
+
+class WatchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.specs = os.path.join(self.directory, "specs")
+        self.output = os.path.join(self.directory, "out")
+        os.makedirs(self.specs)
+        write_spec(os.path.join(self.specs, "app.json"), {"domain_configs": [{"domains": ["app.example.com"]}]})
+        write_spec(os.path.join(self.specs, "web.json"), {"domain_configs": [{"domains": ["web.example.com"]}]})
+        self.watcher = Watcher([self.specs], self.output, debounce=0.05, out=io.StringIO())
+        self.watcher.start()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def settle(self, now=100.0):
+        self.assertIsNone(self.watcher.poll(now))
+        return self.watcher.poll(now + 1)
+
+    def test_default_output_is_the_current_stdout(self):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            Watcher([self.specs], self.output).start()
+
+        self.assertIn("Watching 2 specs", stdout.getvalue())
+
+    def test_initial_build_writes_every_spec(self):
+        self.assertEqual(sorted(os.listdir(self.output)), ["app.xml", "web.xml"])
+        self.assertIsNone(self.watcher.poll(100.0))
+
+    def test_only_affected_spec_rebuilt(self):
+        write_spec(os.path.join(self.specs, "app.json"), {"domain_configs": [{"domains": ["other.example.com"]}]})
+
+        results = self.settle()
+
+        self.assertEqual([result.spec_path for result in results], [os.path.join(self.specs, "app.json")])
+        self.assertIn("other.example.com", read(os.path.join(self.output, "app.xml")))
+        self.assertEqual(len(self.watcher.latencies), 1)
+
+    def test_burst_of_changes_rebuilt_once(self):
+        for domain in ("a.example.com", "b.example.com", "c.example.com"):
+            write_spec(os.path.join(self.specs, "app.json"), {"domain_configs": [{"domains": [domain]}]})
+            self.assertIsNone(self.watcher.poll(100.0))
+        write_spec(os.path.join(self.specs, "new.json"), {"domain_configs": [{"domains": ["new.example.com"]}]})
+        self.assertIsNone(self.watcher.poll(100.01))
+        self.assertIsNone(self.watcher.poll(100.02))
+
+        results = self.watcher.poll(100.1)
+
+        self.assertEqual(sorted(os.path.basename(result.spec_path) for result in results), ["app.json", "new.json"])
+        self.assertIn("c.example.com", read(os.path.join(self.output, "app.xml")))
+        self.assertEqual(len(self.watcher.latencies), 1)
+
+    def test_latency_measured_on_the_injected_clock(self):
+        write_spec(os.path.join(self.specs, "app.json"), {"domain_configs": [{"domains": ["a.example.com"]}]})
+        self.assertIsNone(self.watcher.poll(0.0))
+        write_spec(os.path.join(self.specs, "app.json"), {"domain_configs": [{"domains": ["b.example.com"]}]})
+        self.assertIsNone(self.watcher.poll(0.5))
+
+        self.assertEqual(len(self.watcher.poll(1.0)), 1)
+
+        self.assertGreaterEqual(self.watcher.latencies[0], 1.0)
+        self.assertLess(self.watcher.latencies[0], 1.5)
+
+
+@unittest.skipIf(OPENSSL is None, "openssl is required to generate test certificates")
+class WatchCertificatesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.certificates = os.path.join(self.directory, "certs")
+        os.makedirs(self.certificates)
+        self.ca = make_certificate(self.certificates, "ca", "/CN=Test CA")
+        write_spec(os.path.join(self.directory, "pinned.json"),
+                   {"domain_configs": [{"domains": ["example.com"], "pin_set": {"certificates": ["certs"]}}]})
+        write_spec(os.path.join(self.directory, "plain.json"), {"domain_configs": [{"domains": ["example.org"]}]})
+        self.watcher = Watcher([self.directory], out=io.StringIO())
+        self.watcher.start()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_certificate_added_to_directory_rebuilds_dependent_spec(self):
+        self.assertIn(expected_pin(self.ca[1]), read(os.path.join(self.directory, "pinned.xml")))
+        os.makedirs(os.path.join(self.certificates, "backup"))
+        self.assertIsNone(self.watcher.poll(100.0))
+        self.assertEqual(len(self.watcher.poll(101.0)), 1)
+
+        backup = make_certificate(os.path.join(self.certificates, "backup"), "backup", "/CN=Backup CA")
+        self.assertIsNone(self.watcher.poll(200.0))
+        results = self.watcher.poll(201.0)
+
+        self.assertEqual([os.path.basename(result.spec_path) for result in results], ["pinned.json"])
+        content = read(os.path.join(self.directory, "pinned.xml"))
+        self.assertIn(expected_pin(self.ca[1]), content)
+        self.assertIn(expected_pin(backup[1]), content)
+
+
+if __name__ == '__main__':
+    unittest.main()
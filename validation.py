@@ -0,0 +1,207 @@
+import datetime
+import re
+import string
+from itertools import islice
+
+_HOSTNAME = re.compile(r"(?!-)[a-z0-9_-]{1,63}(?<!-)(?:\.(?!-)[a-z0-9_-]{1,63}(?<!-))*")
+_MALFORMED_HOSTNAME_PARTS = ("..", "\n\n", ".\n", "\n.", "-.", ".-", "-\n", "\n-")
+_PIN = re.compile(r"[A-Za-z0-9+/]{42}[AEIMQUYcgkosw048]=")
+_EXPIRATION = re.compile(r"\d{4}-\d{2}-\d{2}")
+_RAW_RESOURCE = re.compile(r"@raw/[a-z0-9_]+")
+_HOSTNAME_CHARACTERS = (string.ascii_lowercase + string.digits + "-_.\n").encode("ascii")
+_BASE64_CHARACTERS = (string.ascii_letters + string.digits + "+/=").encode("ascii")
+# The last character before the padding of a base64 encoded 32 byte digest only carries 4 bits.
+_LAST_PIN_CHARACTERS = b"AEIMQUYcgkosw048"
+PLATFORM_SOURCES = ("system", "user")
+_DOMAIN_CHUNK = 4096
+
+
+def _valid_hostnames(joined, count):
+    return (joined.isascii()
+            and joined.count("\n") == count - 1
+            and not joined.encode("ascii").translate(None, _HOSTNAME_CHARACTERS)
+            and joined[:1] not in ".-\n" and joined[-1:] not in ".-\n"
+            and not any(part in joined for part in _MALFORMED_HOSTNAME_PARTS))
+
+
+def _valid_pins(pins):
+    try:
+        joined = "".join(pins)
+    except TypeError:
+        return False
+    return (joined.isascii()
+            and len(joined) == 44 * len(pins)
+            and joined.count("=") == len(pins)
+            and joined[43::44] == "=" * len(pins)
+            and not joined.encode("ascii").translate(None, _BASE64_CHARACTERS)
+            and not joined[42::44].encode("ascii").translate(None, _LAST_PIN_CHARACTERS))
+
+
+def _valid_expiration(expiration):
+    if not _EXPIRATION.fullmatch(f"{expiration}"):
+        return False
+    try:
+        datetime.date.fromisoformat(f"{expiration}")
+    except ValueError:
+        return False
+    return True
+
+
+def _valid_source(src):
+    src = f"{src}"
+    return src in PLATFORM_SOURCES or _RAW_RESOURCE.fullmatch(src) is not None
+
+
+def format_path(path):
+    # collect() passes nested paths as (parent path, segment) pairs, joined only when an issue is reported.
+    segments = []
+    while isinstance(path, tuple):
+        path, segment = path
+        segments.append(segment)
+    segments.append(path)
+    return "/".join(reversed(segments))
+
+
+class ValidationIssue:
+
+    def __init__(self, path, message):
+        self.path = path
+        self.message = message
+
+    def __str__(self):
+        return f"{self.path}: {self.message}"
+
+
+class ValidationError(Exception):
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f"{len(errors)} validation error(s):\n" + "\n".join(str(error) for error in errors))
+
+
+class Validator:
+
+    def __init__(self):
+        self.errors = []
+        self.warnings = []
+        self._reset()
+
+    def _reset(self):
+        self._domain_configs = []
+        self._domain_config_paths = []
+        self._pin_sets = []
+        self._pin_set_paths = []
+        self._trust_anchors = []
+        self._trust_anchors_paths = []
+
+    def error(self, path, message):
+        self.errors.append(ValidationIssue(format_path(path), message))
+
+    def warning(self, path, message):
+        self.warnings.append(ValidationIssue(format_path(path), message))
+
+    # Nodes are only recorded while collect() walks the model; finish() then checks every value of a kind in bulk
+    # and inspects individual nodes only when a bulk check fails. Parallel lists avoid allocating a record per node.
+    def check_domain_config(self, domain_config, path):
+        self._domain_configs.append(domain_config)
+        self._domain_config_paths.append(path)
+
+    def check_pin_set(self, pin_set, path):
+        self._pin_sets.append(pin_set)
+        self._pin_set_paths.append(path)
+
+    def check_trust_anchors(self, trust_anchors, path):
+        self._trust_anchors.append(trust_anchors)
+        self._trust_anchors_paths.append(path)
+
+    def finish(self):
+        self._finish_domains()
+        self._finish_pin_sets()
+        self._finish_trust_anchors()
+        self._reset()
+
+    def raise_for_errors(self):
+        self.finish()
+        if self.errors:
+            raise ValidationError(self.errors)
+
+    def _finish_domains(self):
+        domain_configs = self._domain_configs
+        paths = self._domain_config_paths
+        for domain_config, path in zip(domain_configs, paths):
+            if not domain_config.domains:
+                self.error(path, "domain-config has no domain")
+
+        # Pattern expansions are checked a chunk at a time instead of being materialized, only the set of hostnames
+        # for the duplicate check grows with the number of domains.
+        hostnames = set()
+        count = 0
+        for domain_config, path in zip(domain_configs, paths):
+            domains = domain_config.expanded_domains()
+            first = 0
+            while True:
+                chunk = list(islice(domains, _DOMAIN_CHUNK))
+                if not chunk:
+                    break
+                names = [domain.domain for domain in chunk]
+                try:
+                    joined = "\n".join(names).lower()
+                except TypeError:
+                    joined = "\n".join([f"{name}" for name in names]).lower()
+                names = joined.split("\n")
+                longest = max(map(len, names))
+                # Labels are only split out when a hostname is long enough to hold one over 63 characters.
+                if (not _valid_hostnames(joined, len(chunk)) or longest > 253
+                        or longest > 63 and max(map(len, joined.replace("\n", ".").split("."))) > 63):
+                    for index, domain in enumerate(chunk, first):
+                        hostname = f"{domain.domain}".lower()
+                        if len(hostname) > 253 or not _HOSTNAME.fullmatch(hostname):
+                            self.error((path, f"domain[{index}]"), f"malformed domain {domain.domain!r}")
+                hostnames.update(names)
+                count += len(chunk)
+                first += len(chunk)
+
+        if len(hostnames) != count:
+            seen = {}
+            for domain_config, path in zip(domain_configs, paths):
+                for index, domain in enumerate(domain_config.expanded_domains()):
+                    hostname = f"{domain.domain}".lower()
+                    if hostname in seen:
+                        first = format_path(seen[hostname])
+                        self.error((path, f"domain[{index}]"),
+                                   f"duplicate domain {domain.domain!r}, first declared at {first}")
+                    else:
+                        seen[hostname] = (path, f"domain[{index}]")
+
+    def _finish_pin_sets(self):
+        pin_sets = self._pin_sets
+        for pin_set, path in zip(pin_sets, self._pin_set_paths):
+            pins = pin_set.pins
+            # Identical pins are shared instances, so a pin-set without a backup is one whose pins all equal the first.
+            if len(pins) < 2 or pins.count(pins[0]) == len(pins):
+                self.warning(path, "pin-set has no backup pin")
+
+        expirations = {pin_set.expiration for pin_set in pin_sets}
+        expirations.discard(None)
+        invalid = {expiration for expiration in expirations if not _valid_expiration(expiration)}
+        if invalid:
+            for pin_set, path in zip(pin_sets, self._pin_set_paths):
+                if pin_set.expiration in invalid:
+                    self.error(path, f"expiration {pin_set.expiration!r} is not a yyyy-MM-dd date")
+
+        if not _valid_pins([pin.pin for pin_set in pin_sets for pin in pin_set.pins]):
+            for pin_set, path in zip(pin_sets, self._pin_set_paths):
+                for index, pin in enumerate(pin_set.pins):
+                    if not isinstance(pin.pin, str) or not _PIN.fullmatch(pin.pin):
+                        self.error((path, f"pin[{index}]"), f"pin {pin.pin!r} is not a base64 encoded SHA-256 digest")
+
+    def _finish_trust_anchors(self):
+        certificates = {certificate for trust_anchors in self._trust_anchors
+                        for certificate in trust_anchors.certificates}
+        if all(_valid_source(certificate.src) for certificate in certificates):
+            return
+        for trust_anchors, path in zip(self._trust_anchors, self._trust_anchors_paths):
+            for index, certificate in enumerate(trust_anchors.certificates):
+                if not _valid_source(certificate.src):
+                    self.error((path, f"certificates[{index}]"),
+                               f"certificates src {certificate.src!r} is not \"system\", \"user\" or \"@raw/...\"")
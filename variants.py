@@ -0,0 +1,135 @@
+import copy
+
+from incremental import serialize, serialize_compact, write_if_changed
+from model import DomainConfig, NetworkSecConfig
+
+KEEP = object()
+# Nesting depth down to which SharedRenderer renders inner domain-configs through itself, deeper subtrees are
+# serialized whole by the stack walker so that rendering never recurses without bound.
+SHARED_DEPTH = 32
+
+
+class VariantError(Exception):
+    pass
+
+
+def find_domain_config(domain_configs, hostname):
+    # Index path to the first domain-config (depth first, in document order) that lists `hostname` itself.
+    pending = [((index,), domain_config) for index, domain_config in reversed(list(enumerate(domain_configs)))]
+    while pending:
+        path, domain_config = pending.pop()
+        if any(domain.domain == hostname for domain in domain_config.expanded_domains()):
+            return path
+        pending.extend((path + (index,), inner)
+                       for index, inner in reversed(list(enumerate(domain_config.domain_configs))))
+    return None
+
+
+class Overlay:
+    # The differences of one build variant from a base config. Applying it copies only the root and the
+    # domain-configs on the way to patched ones, every other subtree is the base's own object.
+
+    def __init__(self, cleartext_traffic_permitted=None, base_config=KEEP, debug_overrides=KEEP):
+        self.cleartext_traffic_permitted = cleartext_traffic_permitted
+        self.base_config = base_config
+        self.debug_overrides = debug_overrides
+        self.patches = []
+        self.added = []
+
+    def patch_domain_config(self, hostname, **changes):
+        self.patches.append((hostname, changes))
+
+    def remove_domain_config(self, hostname):
+        self.patches.append((hostname, None))
+
+    def add_domain_config(self, domain_config):
+        self.added.append(domain_config)
+
+    def apply(self, config):
+        variant = NetworkSecConfig(config.cleartext_traffic_permitted if self.cleartext_traffic_permitted is None
+                                   else self.cleartext_traffic_permitted)
+        variant.base_config = config.base_config if self.base_config is KEEP else self.base_config
+        variant.domain_configs = list(config.domain_configs)
+        variant.debug_overrides = config.debug_overrides if self.debug_overrides is KEEP else self.debug_overrides
+
+        for hostname, changes in self.patches:
+            path = find_domain_config(variant.domain_configs, hostname)
+            if path is None:
+                raise VariantError(f"no domain-config for {hostname}")
+            container = variant.domain_configs
+            for index in path[:-1]:
+                parent = copy.copy(container[index])
+                parent.domain_configs = list(parent.domain_configs)
+                container[index] = parent
+                container = parent.domain_configs
+            if changes is None:
+                del container[path[-1]]
+                continue
+            domain_config = copy.copy(container[path[-1]])
+            for name, value in changes.items():
+                if name not in type(domain_config).__slots__:
+                    raise VariantError(f"{hostname}: domain-config has no {name}")
+                setattr(domain_config, name, value)
+            container[path[-1]] = domain_config
+
+        variant.domain_configs.extend(self.added)
+        return variant
+
+
+class SharedRenderer:
+    # Render hook for NetworkSecConfig.fragments that serializes every node object once per indentation level, so
+    # subtrees shared between variants are not serialized again. Inner domain-configs go through the hook as well:
+    # Overlay.apply copies the parents of a patched domain-config, but their unchanged children stay shared. An
+    # incremental.FragmentCache can be passed to reuse fragments across runs as well.
+
+    def __init__(self, cache=None):
+        self.cache = cache
+        self.fragments = {}
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, node, level):
+        key = (id(node), level)
+        entry = self.fragments.get(key)
+        if entry is None:
+            self.misses += 1
+            fragments = (self._fragments(node, level) if self.cache is None
+                         else self.cache.render(node, level, self._fragments))
+            # The node is kept with its fragment so that its id cannot be reused by another object.
+            entry = self.fragments[key] = (node, "".join(fragments))
+        else:
+            self.hits += 1
+        if entry[1]:
+            yield entry[1]
+
+    def _fragments(self, node, level):
+        if node.__class__ is not DomainConfig or not node.domain_configs or level >= SHARED_DEPTH:
+            yield from node.fragments(level)
+            return
+        # The domain-config's own elements are rendered without its inner domain-configs, which always come last,
+        # and those are spliced in before the closing tag.
+        shell = copy.copy(node)
+        shell.domain_configs = []
+        head = "".join(shell.fragments(level))
+        if head.endswith(" />"):
+            head, tail = head[:-3] + ">", "\n" + "\t" * level + "</domain-config>"
+        else:
+            cut = head.rindex("\n")
+            head, tail = head[:cut], head[cut:]
+        yield head
+        indent = "\n" + "\t" * (level + 1)
+        for inner in node.domain_configs:
+            yield indent
+            yield from self.render(inner, level + 1)
+        yield tail
+
+
+def build_variants(config, overlays):
+    return {name: overlay.apply(config) for name, overlay in overlays.items()}
+
+
+def write_variants(variants, renderer=None, compact=False):
+    # variants maps output paths to configs. Returns the paths whose content changed.
+    renderer = renderer or SharedRenderer()
+    return [path for path, config in variants.items()
+            if write_if_changed(path, serialize_compact(config) if compact else serialize(config, renderer))]
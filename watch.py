@@ -0,0 +1,150 @@
+import argparse
+import os
+import sys
+import time
+
+from batch import generate, format_result
+from spec import load_spec, find_specs, certificate_dependencies, SpecError
+
+
+def signature(path):
+    # Directories are compared by the modification times of all their subdirectories, which change whenever an
+    # entry is added, removed or renamed. Files are compared by modification time and size.
+    try:
+        if os.path.isdir(path):
+            return tuple((directory, os.stat(directory).st_mtime_ns) for directory, _, _ in os.walk(path))
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def spec_dependencies(spec_path):
+    try:
+        return certificate_dependencies(load_spec(spec_path), os.path.dirname(spec_path))
+    except (OSError, AttributeError, TypeError, SpecError):
+        return set()
+
+
+class Watcher:
+
+    def __init__(self, paths, output_dir=None, cache_dir=None, interval=0.02, debounce=0.05, budget_ms=100.0,
+                 out=None):
+        self.paths = paths
+        self.output_dir = output_dir
+        self.cache_dir = cache_dir
+        self.interval = interval
+        self.debounce = debounce
+        self.budget_ms = budget_ms
+        self.out = sys.stdout if out is None else out
+        self.specs = []
+        self.dependencies = {}
+        self.signatures = {}
+        self.pending = set()
+        self.first_change = None
+        self.last_change = None
+        self.latencies = []
+
+    def watched(self):
+        watched = set(self.specs)
+        for spec_path in self.specs:
+            watched.update(self.dependencies.get(spec_path, ()))
+        return watched
+
+    def check(self):
+        self.specs = find_specs(self.paths)
+        current = {path: signature(path) for path in self.watched()}
+        changed = {path for path in current.keys() | self.signatures.keys()
+                   if current.get(path) != self.signatures.get(path)}
+        self.signatures = current
+        return changed
+
+    def affected(self, changed):
+        return [spec_path for spec_path in self.specs
+                if spec_path in changed or not changed.isdisjoint(self.dependencies.get(spec_path, ()))]
+
+    def rebuild(self, specs):
+        results = []
+        for spec_path in specs:
+            results.append(generate(spec_path, self.output_dir, self.cache_dir))
+            dependencies = spec_dependencies(spec_path)
+            for path in dependencies - self.dependencies.get(spec_path, set()):
+                self.signatures[path] = signature(path)
+            self.dependencies[spec_path] = dependencies
+        return results
+
+    def start(self):
+        self.check()
+        results = self.rebuild(self.specs)
+        for result in results:
+            print(format_result(result), file=self.out)
+        print(f"Watching {len(self.specs)} specs and {len(self.watched()) - len(self.specs)} certificate paths",
+              file=self.out)
+        return results
+
+    def poll(self, now=None):
+        # Changes are collected until nothing changed for `debounce` seconds, so that editors saving several files
+        # or a certificate directory being replaced result in one rebuild.
+        now = time.perf_counter() if now is None else now
+        changed = self.check()
+        if changed:
+            self.pending |= changed
+            if self.first_change is None:
+                self.first_change = now
+            self.last_change = now
+            return None
+        if not self.pending or now - self.last_change < self.debounce:
+            return None
+
+        specs = self.affected(self.pending)
+        started = time.perf_counter()
+        results = self.rebuild(specs)
+        # The rebuild is timed as a duration, so the latency stays on the clock `now` comes from.
+        latency = now - self.first_change + time.perf_counter() - started
+        self.latencies.append(latency)
+        self.pending = set()
+        self.first_change = self.last_change = None
+        self.report(results, latency)
+        return results
+
+    def report(self, results, latency):
+        for result in results:
+            print(format_result(result), file=self.out)
+        over_budget = " OVER BUDGET" if latency * 1000 > self.budget_ms else ""
+        print(f"Rebuilt {len(results)}/{len(self.specs)} configs {latency * 1000:.1f} ms after the change"
+              f"{over_budget}", file=self.out)
+
+    def run(self):
+        self.start()
+        while True:
+            time.sleep(self.interval)
+            self.poll()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Regenerate network security configs whenever their spec files or "
+                                                 "certificates change.")
+    parser.add_argument("specs", nargs="+", help="spec files or directories containing them")
+    parser.add_argument("-o", "--output-dir", help="directory for configs whose spec does not set \"output\"")
+    parser.add_argument("--cache-dir", help="shared fragment cache directory, enables incremental regeneration")
+    parser.add_argument("--interval", type=float, default=0.02, help="seconds between checks for changes")
+    parser.add_argument("--debounce", type=float, default=0.05,
+                        help="seconds without further changes before rebuilding")
+    parser.add_argument("--budget-ms", type=float, default=100.0,
+                        help="flag rebuilds finishing later than this after the change")
+    args = parser.parse_args(argv)
+
+    watcher = Watcher(args.specs, args.output_dir, args.cache_dir, args.interval, args.debounce, args.budget_ms)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    if watcher.latencies:
+        latencies = sorted(watcher.latencies)
+        print(f"{len(latencies)} rebuilds, median latency {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+              f"worst {latencies[-1] * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())